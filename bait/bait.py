@@ -7,19 +7,105 @@ performing better than the previous sequential one.
 # lib for MAIN
 import logging
 import numpy as np
-from matplotlib.pyplot import show
+from time import perf_counter
 # lib for BAIT
+# *** NB: `bait_plot` (matplotlib) and `obspy.signal` (that imports
+#         matplotlib.pyplot as well) are imported on-demand only
 from bait import bait_errors as BE
-from bait import bait_plot as BP
 from bait import bait_customtests as BCT
-from obspy.signal.trigger import pk_baer
+from bait import bait_kernels as KRN
+from bait.bait_window import TraceWindow
+from bait.bait_instrument import createTimer
+from bait.bait_picks import PickStore, PICK_KEYS
 # lib for Errors
 from obspy.core.trace import Trace
 from obspy.core.stream import Stream
+from obspy.core.compatibility import round_away
 
 logger = logging.getLogger(__name__)
 
 
+# ------------------------------------------------------ Lazy imports
+
+def _pk_baer(*args, **kwargs):
+    """
+    On-demand wrapper of `obspy.signal.trigger.pk_baer`.
+    Importing `obspy.signal` loads matplotlib.pyplot as well, this way
+    the cost is paid only by who actually picks.
+    """
+    from obspy.signal.trigger import pk_baer
+    return pk_baer(*args, **kwargs)
+
+
+# ------------------------------------------------------ AIC
+
+def _AICcf_reference(td):
+    """
+    Reference (original) implementation of the AIC carachteristic
+    function. It is O(n^2) and it is kept only to validate the
+    faster `_AICcf` implementation (see `BaIt.AIC` mode="reference").
+
+    td must be a  `numpy.ndarray`
+
+    RETURN: idx, AIC
+    """
+    # ----------------  Creation of the carachteristic function
+    # AIC(k)=k*log(variance(x[1,k]))+(n-k+1)*log(variance(x[k+1,n]))
+    AIC = np.array([])
+    for ii in range(1, len(td)):
+        with np.errstate(divide='raise'):
+            try:
+                var1 = np.log(np.var(td[0:ii]))
+            except FloatingPointError:  # if var==0 --> log is -inf
+                var1 = 0.00
+            #
+            try:
+                var2 = np.log(np.var(td[ii:]))
+            except FloatingPointError:  # if var==0 --> log is -inf
+                var2 = 0.00
+        #
+        val1 = ii*var1
+        val2 = (len(td)-ii-1)*var2
+        AIC = np.append(AIC, (val1+val2))
+    # ---------------- New idx search (avoid window's boarders)
+    # (ascending order min->max) OK!
+    idx = sorted(range(len(AIC)), key=lambda k: AIC[k])[0]
+
+    # --- OLD (here for reference)
+    # idxLst = sorted(range(len(AIC)), key=lambda k: AIC[k])
+    # if idxLst[0]+1 not in (1, len(AIC)):
+    #     idx = idxLst[0]+1
+    # else:
+    #     idx = idxLst[1]+1
+
+    # --- REALLY OLD  idx search (here for reference)
+    # idx_old=int(np.where(AIC==np.min(AIC))[0])+1
+    # ****   +1 order to make multiplications
+    # **** didn't take into account to minimum at the border of
+    # **** the searching window
+    return idx, AIC
+
+
+def _AICcf(td):
+    """
+    Linear-time version of the AIC carachteristic function.
+    The variances of the left and right portions of the window are
+    obtained from the prefix sums of x and x**2 (the data are centered
+    first, to limit the cancellation errors). As in the reference
+    implementation, a variance equal to 0 (i.e. log --> -inf)
+    contributes with 0 to the AIC value.
+
+    td must be a  `numpy.ndarray`
+
+    RETURN: idx, AIC
+    """
+    npts = len(td)
+    if npts < 2:
+        # same behavior of the reference implementation (empty CF)
+        raise IndexError("AIC window must contain at least 2 samples")
+    return KRN.aic(td)       # numba/numpy backend (bait_kernels)
+
+
 # ------------------------------------------------------ BAIT
 
 class BaIt(object):
@@ -36,6 +122,43 @@ class BaIt(object):
     raw option, the processed will be used instead, without throwing
     any errors
 
+    *** NB picker_mode="single" (default) let each iteration continue
+    on a view of the same (cached) float32 data, starting from the
+    previous pick. picker_mode="legacy" copies and trims the working
+    trace at each iteration (same picks, here for reference).
+
+    *** NB instrument=True (or a callable `callback(stage, seconds)`,
+    or a shared `bait_instrument.StageTimer`) records wall time and
+    calls of each stage ('CatchEmAll', 'picker', 'pk_baer',
+    'evaluatePick_BK', each test name, 'AIC', '_setworktrace').
+    Results are available in `self.timings` after the run.
+
+    *** NB v2.6.0: the results are stored in `self.picks`, a compact
+    `bait_picks.PickStore` of `PickRecord` (sample indexes, verdicts,
+    tests outputs; `self.picks.toarray()` for a structured array).
+    `self.baitdict` is kept as a read-only, dict-like view of it.
+    With keep_aiccf=False the AIC CFs are not stored (memory).
+
+    *** NB cf_cache: optional dict shared among several BaIt objects
+    (i.e. the components of `bait_3c.BaIt3C`) to store/reuse the CFs.
+
+    *** NB test_evaluation="full" (default) runs all the validation
+    tests on every pick (alphabetical order, full diagnostics).
+    With "shortcircuit" the tests are ordered by measured cost and
+    rejection rate (`bait_customtests.TestStats`) and the evaluation
+    stops at the first rejection: the skipped tests are stored as
+    None in `evaluatePick_tests`. Same verdicts, less work.
+    The statistics are those of `test_stats` (a TestStats, to be
+    shared explicitly among BaIt objects), or of a private TestStats
+    of the object if None. With "full", the tests are measured only
+    if `test_stats` is given.
+
+    *** NB precision="float32" keeps the CF, the data seen by the
+    evaluation tests (the same float32 array of the picker) and the
+    stored AIC CFs in float32: half the memory and the memory traffic.
+    The AIC prefix sums are still accumulated in float64. Picks may
+    differ slightly from the default "float64" (see README).
+
     """
     def __init__(self,
                  stream,
@@ -47,26 +170,48 @@ class BaIt(object):
                  test_pickvalidation={},
                  test_postvalidation={},
                  pickAIC=None,
-                 pickAIC_conf={}):
+                 pickAIC_conf={},
+                 picker_mode="single",
+                 instrument=None,
+                 keep_aiccf=True,
+                 cf_cache=None,
+                 test_evaluation="full",
+                 test_stats=None,
+                 precision="float64"):
+        self.timer = createTimer(instrument)    # None --> disabled
         self.st = stream
         self.straw = stream_raw
         self.wc = channel
         self.wt = None                          # workingtrace
         self._setworktrace(channel, "PROC")
+        self._cf = None                         # cached CF (read-only)
+        self._cf_key = None
+        self._cfcache = cf_cache                # shared CF cache (dict)
+        self._bkdata = None                     # cached BK input (float32)
+        self._bkdata_key = None
+        if precision not in ("float64", "float32"):
+            raise BE.InvalidParameter("PRECISION must be either FLOAT64 or "
+                                      "FLOAT32!")
+        self.precision = np.dtype(precision)
+        self._wt32 = None                       # float32 tests trace
         self.maxit = max_iter
+        self.picker_mode = picker_mode
         self.opbk_main = opbk_main
         self.opbk_aux = opbk_aux
         #
         self.pick_test = test_pickvalidation
+        if test_evaluation not in ("full", "shortcircuit"):
+            raise BE.InvalidParameter("test_evaluation must be either FULL "
+                                      "or SHORTCIRCUIT!")
+        self.test_evaluation = test_evaluation
+        if test_stats is None and test_evaluation == "shortcircuit":
+            test_stats = BCT.TestStats()        # private to this object
+        self.test_stats = test_stats            # None --> not measured
         self.post_test = test_postvalidation
-        self.baitdict = {}
-        self.baitdict_keys = ('pickUTC',
-                              'bk_info',
-                              'pickUTC_AIC',
-                              'AICcf',
-                              'iteration',
-                              'evaluatePick',
-                              'evaluatePick_tests')
+        self.picks = PickStore(self.wt.stats.starttime,
+                               self.wt.stats.sampling_rate,
+                               keep_aiccf=keep_aiccf)
+        self.baitdict_keys = PICK_KEYS
         self.baitdict_post = {}
         self.baitdict_post_keys = ('validPicks',
                                    'evaluatePickPost_tests')
@@ -75,6 +220,17 @@ class BaIt(object):
         self.pickAIC = pickAIC
         self.pickAIC_conf = pickAIC_conf
 
+    @property
+    def pick_test(self):
+        """ The evaluation tests dict {name: [parameters]} """
+        return self._pick_test
+
+    @pick_test.setter
+    def pick_test(self, ndict):
+        # tests are checked and bound here (fail early), not at each pick
+        self._tests = BCT.resolveTests(ndict)
+        self._pick_test = ndict
+
     def _sec2sample(self, value, df):
         """
         Utility method to define convert USER input parameter (seconds)
@@ -89,15 +245,11 @@ class BaIt(object):
         return int(round(value * df))
 
     def _createbaitdictkey(self, addkey):
-        """ Method to take care about the creation of new dict keys """
-        # self.baitdict[str(addkey)] = {_kk: None for _kk in self.baitdict_keys}
-        self.baitdict[str(addkey)] = {_kk: (None if _kk not in (
-                                                    'evaluatePick_tests'
-                                     ) else {}) for _kk in self.baitdict_keys}
-        #
-        if self.pick_test:
-            for _kk in self.pick_test.keys():
-                self.baitdict[str(addkey)]["evaluatePick_tests"][_kk] = None
+        """ Method to take care about the creation of new pick records """
+        _names = tuple(self.pick_test.keys()) if self.pick_test else ()
+        if _names != self.picks.testnames:
+            self.picks.testnames = _names     # shared by the new records
+        return self.picks.record(addkey)
 
     def _createbaitdictkey_POST(self):
         """ Store the final, complete evaluation step in class """
@@ -111,22 +263,28 @@ class BaIt(object):
         Is called by `picker` method.
 
         *** This method take care to initialize missing iteraion
-            dict keys in self.baitdict
+            records in self.picks
 
         """
-        if str(stkey) not in self.baitdict.keys():
-            self._createbaitdictkey(str(stkey))
+        if stkey in self.picks:
+            rec = self.picks[stkey]
+        else:
+            rec = self._createbaitdictkey(stkey)
         #
         for _kk, _vv in kwargs.items():
             if _kk not in self.baitdict_keys:
                 raise BE.MissingKey()
-            self.baitdict[str(stkey)][_kk] = _vv
+            if _kk == "AICcf" and not self.picks.keep_aiccf:
+                continue
+            setattr(rec, _kk, _vv)
 
     def _setworktrace(self, channel, procraw):
         """
         Private method to change pointer of working trace for picker.
         Use obspy.Stream.select function
         """
+        if self.timer is not None:
+            _t0 = self.timer.clock()
         if procraw.lower() not in ('raw', 'proc'):
             self.wt = None
             self.wc = None
@@ -140,6 +298,86 @@ class BaIt(object):
         #
         self.wt = selstream.select(channel=channel)[0]
         self.wc = channel
+        if self.timer is not None:
+            self.timer.record("_setworktrace", self.timer.clock() - _t0)
+
+    def _getcf(self):
+        """
+        Return the carachteristic function (obspy.Trace) of the PROC
+        working trace. The CF is created only once and cached, it will be
+        re-created only when the PROC working trace changes (i.e. new
+        trace object, new data array or different header timing).
+
+        *** NB: the returned CF data are READ-ONLY, make a copy if you
+                need to modify them.
+        *** NB: in-place edits of the trace data are not detected: the
+                CF is reset at the start of each `CatchEmAll` run. A
+                shared `cf_cache` assumes the data are never edited.
+        """
+        self._setworktrace(self.wc, "PROC")  # CF always on PROC trace
+        _key = (id(self.wt), id(self.wt.data), self.wt.stats.npts,
+                 self.wt.stats.starttime.ns, self.wt.stats.sampling_rate,
+                 self.precision.char)
+        if self._cf is None or self._cf_key != _key:
+            # shared cache values are (trace, cf): the reference keeps
+            # the trace alive, so its id can't be reused by another one
+            _hit = (self._cfcache.get(_key)
+                    if self._cfcache is not None else None)
+            if _hit is not None and _hit[0] is self.wt:
+                cf = _hit[1]
+            else:
+                logger.debug("Creating CF for %s" % self.wt.id)
+                if self.precision == np.float64:
+                    cf = BCT._createCF(self.wt.data)
+                else:
+                    cf = BCT._createCF(self._getbkdata(),
+                                       dtype=self.precision)
+                cf = Trace(data=cf, header=self.wt.stats)
+                cf.data.flags.writeable = False
+                if self._cfcache is not None:
+                    self._cfcache[_key] = (self.wt, cf)
+            self._cf, self._cf_key = cf, _key
+        return self._cf
+
+    def _getbkdata(self):
+        """
+        Return the PROC working trace data as contiguous float32 array
+        (the input type of the obspy `pk_baer` routine). The array is
+        converted only once and cached, so each iteration of the picker
+        can work on a view of it, without copying or trimming the trace.
+
+        *** NB: the key is the trace/array identity: in-place edits of
+                the data are not detected. The cache is therefore reset
+                at the start of each `CatchEmAll` run.
+        """
+        self._setworktrace(self.wc, "PROC")  # baer picker needs always proc
+        _key = (id(self.wt), id(self.wt.data), self.wt.stats.npts)
+        if self._bkdata is None or self._bkdata_key != _key:
+            self._bkdata = np.ascontiguousarray(self.wt.data, np.float32)
+            self._bkdata_key = _key
+        return self._bkdata
+
+    def _getworktrace(self):
+        """
+        Return the PROC working trace of the evaluation tests: the trace
+        itself (precision="float64") or a trace sharing the cached
+        float32 data of the picker (precision="float32", no other copy).
+        """
+        self._setworktrace(self.wc, "PROC")
+        if self.precision == np.float64:
+            return self.wt
+        _data = self._getbkdata()
+        if self._wt32 is None or self._wt32.data is not _data:
+            self._wt32 = Trace(data=_data, header=self.wt.stats)
+        return self._wt32
+
+    def _utc2sample(self, utc):
+        """
+        Return the index of the working trace sample nearest to `utc`.
+        Same rounding of obspy `Trace.trim(nearest_sample=True)`.
+        """
+        return int(round_away((utc - self.wt.stats.starttime) *
+                              self.wt.stats.sampling_rate))
 
     def _setpicktestdict(self, ndict):
         """ Adjusting the evaluation pick tests dict """
@@ -152,6 +390,18 @@ class BaIt(object):
     def _getbaitdict(self):
         return self.baitdict
 
+    @property
+    def baitdict(self):
+        """ Compatibility (read-only) view of `self.picks` """
+        return self.picks
+
+    @property
+    def timings(self):
+        """ Per-stage timings dict (None if instrumentation disabled) """
+        if self.timer is None:
+            return None
+        return self.timer.summary()
+
     def CatchEmAll(self):
         """
         Main algorithm that calls the picker and tests.
@@ -161,32 +411,50 @@ class BaIt(object):
         # *** nextline is a switch --> if at least one pick is accepted,
         #                              is changed to True
         VALIDPICKS = False
+        self._tests = BCT.resolveTests(self._pick_test)   # in-place edits
+        # the picker input and the CF are cached only within a run: the
+        # trace data may have been edited in place since the last one
+        self._bkdata, self._bkdata_key, self._wt32 = None, None, None
+        self._cf, self._cf_key = None, None
+        timer = self.timer
+        if timer is not None:
+            _t0 = timer.clock()
         for ITERATION in range(1, self.maxit + 1):
             # The pick (if present), it stored by the picker function
             #
+            if timer is not None:
+                _ts = timer.clock()
             if ITERATION == 1:
                 self.picker(ITERATION, **self.opbk_main)
             else:
                 self.picker(ITERATION, **self.opbk_aux)
+            if timer is not None:
+                timer.record("picker", timer.clock() - _ts)
             #
-            if self.baitdict[str(ITERATION)]['pickUTC']:
+            rec = self.picks[ITERATION]
+            if rec.pick_ns is not None:
                 # pick found -> evaluate
                 if self.pick_test:
                     # Check if PICK_BK is valid
-                    self.baitdict[str(ITERATION)]['evaluatePick'] = (
-                        self.evaluatePick_BK(str(ITERATION))
-                    )
+                    if timer is not None:
+                        _ts = timer.clock()
+                    rec.evaluatePick = self.evaluatePick_BK(ITERATION)
+                    if timer is not None:
+                        timer.record("evaluatePick_BK", timer.clock() - _ts)
                     logger.debug("PickAccepted: %s - Results: %s" % (
-                        self.baitdict[str(ITERATION)]['evaluatePick'],
-                        self.baitdict[str(ITERATION)]['evaluatePick_tests']))
+                        rec.evaluatePick, rec.evaluatePick_tests))
 
-                if self.baitdict[str(ITERATION)]['evaluatePick']:
+                if rec.evaluatePick:
                     VALIDPICKS = True
                     # If pick is valid and user wants AIC --> call AIC picker
                     if self.pickAIC:
+                        if timer is not None:
+                            _ts = timer.clock()
                         aicpick, aicfun, aicidx = self.AIC(
-                          aroundpick=self.baitdict[str(ITERATION)]['pickUTC'],
+                          aroundpick=rec.pickUTC,
                           **self.pickAIC_conf)
+                        if timer is not None:
+                            timer.record("AIC", timer.clock() - _ts)
                         self._storepick(ITERATION,
                                         pickUTC_AIC=aicpick,
                                         AICcf=aicfun)
@@ -194,6 +462,8 @@ class BaIt(object):
             else:     # no pick -> exit the loop
                 logger.error(('~~~ No pick @ Iteration %d') % (ITERATION))
                 break
+        if timer is not None:
+            timer.record("CatchEmAll", timer.clock() - _t0)
         # Post - Picking
         if not VALIDPICKS:
             logger.error("*** No valid pick found")
@@ -215,16 +485,31 @@ class BaIt(object):
         if not isinstance(self.wt, Trace):
             raise BE.BadInstance()
         # -------------------------------------------------------- Cut Trace
-        tr = self.wt.copy()
-        if it > 1:
-            tr = tr.trim(self.baitdict[str(it-1)]["pickUTC"],
-                         self.wt.stats.endtime)
+        if self.picker_mode.lower() == "legacy":
+            tr = self.wt.copy()
+            if it > 1:
+                tr = tr.trim(self.picks[it-1].pickUTC,
+                             self.wt.stats.endtime)
+            bkdata, bkstart = tr.data, tr.stats.starttime
+        elif self.picker_mode.lower() == "single":
+            # v2.6.0: no copy/trim --> continue on a view of the cached
+            #         float32 data, starting from the previous pick sample
+            #         (same sample selected by the legacy trim)
+            bkdata, bkstart = self._getbkdata(), self.wt.stats.starttime
+            if it > 1:
+                _idx = self._utc2sample(self.picks[it-1].pickUTC)
+                if _idx > 0:
+                    bkdata = bkdata[_idx:]
+                    bkstart = bkstart + _idx * self.wt.stats.delta
+        else:
+            raise BE.InvalidParameter("PICKER_MODE parameter must be either "
+                                      "SINGLE or LEGACY!")
 
         # ------------------------------------------------- v.1.1 sample2sec
         # Input from BaIt_Config in SECONDS and convert here in SAMPLES
         # Python3 round(float)==int // Python2 round(float)==float -->
         #                            int(round(... to have compatibility
-        df = tr.stats.sampling_rate
+        df = self.wt.stats.sampling_rate
         preset_len_NEW = self._sec2sample(preset_len, df)
         # tupevent: should be the inverse of high-pass
         #           freq or low freq in bandpass
@@ -234,21 +519,24 @@ class BaIt(object):
         # p_dur: time-interval in which MAX AMP is evaluated
         p_dur_NEW = self._sec2sample(p_dur, df)
         # ----------------------------------------------------------- Picker
-        PickSample, PhaseInfo, _CF = pk_baer(tr.data, df, tdownmax_NEW,
-                                             tupevent_NEW, thr1, thr2,
-                                             preset_len_NEW, p_dur_NEW,
-                                             return_cf=True)
+        if self.timer is not None:
+            _t0 = self.timer.clock()
+        PickSample, PhaseInfo = _pk_baer(bkdata, df, tdownmax_NEW,
+                                         tupevent_NEW, thr1, thr2,
+                                         preset_len_NEW, p_dur_NEW)
+        if self.timer is not None:
+            self.timer.record("pk_baer", self.timer.clock() - _t0)
         # convert pick from samples
         # to seconds (Absolute from first sample)
         PickTime = PickSample/df
         PhaseInfo = str(PhaseInfo).strip()
-        logger.debug("%s - %s" % (tr.stats.starttime+PickTime, PhaseInfo))
+        logger.debug("%s - %s" % (bkstart+PickTime, PhaseInfo))
         # ------------------------------------------------------------- Save
         if PhaseInfo != '':  # Valid Pick
             # first is keydict, second is it info
             self._storepick(it,
                             iteration=it,
-                            pickUTC=tr.stats.starttime+PickTime,
+                            pickUTC=bkstart+PickTime,
                             bk_info=PhaseInfo)
         else:
             # first is keydict, second is it info
@@ -261,7 +549,8 @@ class BaIt(object):
             useraw=False,
             aroundpick=None,
             wintrim_noise=1.0,
-            wintrim_sign=1.0):
+            wintrim_sign=1.0,
+            mode="fast"):
         """
         This method is defining an AIC picker
         to detect the right on-phase timing of a phase
@@ -271,6 +560,9 @@ class BaIt(object):
 
         IN:
             aroundpick: Must be an UTCDAteTime object. or set None/False
+            mode: "fast" (default) uses the linear-time AIC based on
+                  prefix sums, "reference" the original O(n^2) loop.
+                  Both return the same CF (within round-off) and index.
 
         OUT:
             pickTime_UTC, AIC, idx
@@ -285,51 +577,13 @@ class BaIt(object):
 
         """
 
-        # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%% Inner Methods
-        def AICcf(td, win=None):
-            """
-            This method will return the index of the minimum AIC
-            carachteristic function.
-
-            td must be a  `numpy.ndarray`
-            """
-            # ----------------  Creation of the carachteristic function
-            # AIC(k)=k*log(variance(x[1,k]))+(n-k+1)*log(variance(x[k+1,n]))
-            AIC = np.array([])
-            for ii in range(1, len(td)):
-                with np.errstate(divide='raise'):
-                    try:
-                        var1 = np.log(np.var(td[0:ii]))
-                    except FloatingPointError:  # if var==0 --> log is -inf
-                        var1 = 0.00
-                    #
-                    try:
-                        var2 = np.log(np.var(td[ii:]))
-                    except FloatingPointError:  # if var==0 --> log is -inf
-                        var2 = 0.00
-                #
-                val1 = ii*var1
-                val2 = (len(td)-ii-1)*var2
-                AIC = np.append(AIC, (val1+val2))
-            # ---------------- New idx search (avoid window's boarders)
-            # (ascending order min->max) OK!
-            idx = sorted(range(len(AIC)), key=lambda k: AIC[k])[0]
-
-            # --- OLD (here for reference)
-            # idxLst = sorted(range(len(AIC)), key=lambda k: AIC[k])
-            # if idxLst[0]+1 not in (1, len(AIC)):
-            #     idx = idxLst[0]+1
-            # else:
-            #     idx = idxLst[1]+1
-
-            # --- REALLY OLD  idx search (here for reference)
-            # idx_old=int(np.where(AIC==np.min(AIC))[0])+1
-            # ****   +1 order to make multiplications
-            # **** didn't take into account to minimum at the border of
-            # **** the searching window
-            return idx, AIC
-
-        # %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%% MainAIC
+        if mode.lower() == "fast":
+            AICcf = _AICcf
+        elif mode.lower() == "reference":
+            AICcf = _AICcf_reference
+        else:
+            raise BE.InvalidParameter("MODE parameter must be either "
+                                      "FAST or REFERENCE!")
 
         # --- Select trace 22022019 --> v2.1.6
         if useraw:
@@ -342,19 +596,21 @@ class BaIt(object):
                          type(self.wt))
             raise TypeError
 
-        # Select TraceSlice:
-        tr = self.wt.copy()
+        # Select TraceSlice (read-only view, no copy):
+        tr = TraceWindow(self.wt)
         if aroundpick:
-            tr.trim(aroundpick - wintrim_noise,
-                    aroundpick + wintrim_sign,
-                    nearest_sample=True)
+            tr = tr.slice(aroundpick - wintrim_noise,
+                          aroundpick + wintrim_sign)
             td = tr.data
         else:
             # Entire stream
             td = tr.data
 
         # Get only the minimum of The CF
+        # (always computed in float64: prefix sums, see `_AICcf`)
         idx, aicfun = AICcf(td)
+        if self.precision != np.float64:
+            aicfun = aicfun.astype(self.precision)
         # -------------------- OUT
         # time= NUMsamples/df OR NUMsamples*dt
         logger.debug("AIC sample: %r" % idx)
@@ -393,7 +649,9 @@ class BaIt(object):
             EVENTID,STATION,ITERATION,PICK,PAR_1,TEST_1,TEST_2
         """
         testResults = []
-        self._setworktrace(self.wc, "PROC")  # ALWAYS PROCESSED
+        rec = self.picks[pkey]
+        cf = TraceWindow(self._getcf())      # shared among tests
+        wt = TraceWindow(self._getworktrace())  # ALWAYS PROCESSED
         # ------------------------------------------- logging
         # LOG_ID.write(
         #     ('%s' + CMN.FSout + '%s' + CMN.FSout + '%d' + CMN.FSout +'%s' +
@@ -404,25 +662,32 @@ class BaIt(object):
   # InTrace.stats['BaIt_DICT'][str(it)]['baerpick'].strftime(CMN.GMTout_FMT))))
 
         # ------------------- Perform TESTS + Append to LOG info needed
-        # *** NB always give a copy of input trace to the TEST!
+        # *** NB v2.6.0: the TESTS receive read-only windows (no copies)
+        #         of the working trace and of the cached CF!
         # *** NB "InTrace.copy(),it,CMN,LOG_ID" should be mandatory for
         #         every TEST!
-        if self.pick_test:
+        if self._tests:
             logger.info("Pick Evaluation: %s" % str(pkey))
-            # sorting in alphabetical order the testfunctions
-            sortedkeys = sorted(self.pick_test, key=str.lower)
-            for _kk in sortedkeys:
-                try:
-                    testFunction = getattr(BCT, _kk)
-                except AttributeError:
-                    raise BE.MissingAttribute()
-                #
-                (verdict, testout) = testFunction(self.wt.copy(),
-                                                  self.baitdict[str(pkey)],
-                                                  *self.pick_test[_kk])
+            # tests already resolved (alphabetical order) by the registry
+            full = self.test_evaluation == "full"
+            tests = self._tests if full else self.test_stats.order(
+                                                            self._tests)
+            measure = self.test_stats is not None or self.timer is not None
+            for (_kk, testFunction, _) in tests:
+                if not measure:
+                    (verdict, testout) = testFunction(wt, rec, cf)
+                else:
+                    _t0 = perf_counter()
+                    (verdict, testout) = testFunction(wt, rec, cf)
+                    _dt = perf_counter() - _t0
+                    if self.test_stats is not None:
+                        self.test_stats.update(_kk, _dt, verdict)
+                    if self.timer is not None:
+                        self.timer.record(_kk, _dt)
                 testResults.append(verdict)
-                self.baitdict[str(pkey)]["evaluatePick_tests"][_kk] = (verdict,
-                                                                       testout)
+                rec.settest(_kk, verdict, testout)
+                if not verdict and not full:
+                    break       # the others are left to None
 
         # ------------------------------- TestResult CHECK + LOG + exit
         if testResults:
@@ -468,11 +733,8 @@ class BaIt(object):
                 it's afterall an 'iterative BAER' ;)
         """
         out_list = []
-        all_true = list(sorted({key: _pd
-                                for key, _pd in self.baitdict.items()
-                                if _pd['evaluatePick']}.items(),
-                               key=(lambda x: int(x[0])))
-                        )
+        # v2.6.0: records are already sorted, no dict rebuild
+        all_true = self.picks.valid()
         true_count = len(all_true)
         #
         if not all_true:
@@ -541,13 +803,14 @@ class BaIt(object):
             try:
                 if compact_format:
                     if _pp.lower() == "bk":
-                        out_list.append((all_true[_xx][1]['pickUTC'],
-                                         all_true[_xx][1]['bk_info']))
+                        out_list.append((all_true[_xx].pickUTC,
+                                         all_true[_xx].bk_info))
                     elif _pp.lower() == "aic":
-                        out_list.append((all_true[_xx][1]['pickUTC_AIC'],
-                                         all_true[_xx][1]['bk_info']))
+                        out_list.append((all_true[_xx].pickUTC_AIC,
+                                         all_true[_xx].bk_info))
                 else:
-                    out_list.append(all_true[_xx])
+                    out_list.append((str(all_true[_xx].iteration),
+                                     all_true[_xx]))
             except IndexError:
                 # MB: if here means that no more VALID pick are present
                 logger.warning(("Requested index is out of bound! IDX: %d" +
@@ -563,10 +826,9 @@ class BaIt(object):
          - fig handle
          - ax tuples (more than one possible)
         """
-        # Create CF always on PROC trace
-        self._setworktrace(self.wc, "PROC")
-        cf = self.wt.copy()
-        cf.data = BCT._createCF(cf.data)
+        from bait import bait_plot as BP
+        # Create CF always on PROC trace (cached)
+        cf = self._getcf()
 
         # select time series
         if plotraw:
@@ -580,16 +842,16 @@ class BaIt(object):
     def plotTests(self, idx, name="SignalAmp", plotraw=False, **kwargs):
         """
         Wrapper method that calls plotting routine for each tests
-        the user specified.
+        the user specified. With name="all" the three figures are
+        shown only if `show=True` is given.
 
         Returns:
          - fig handle
          - ax tuples (more than one possible)
         """
-        # Create CF always on PROC trace
-        self._setworktrace(self.wc, "PROC")
-        cf = self.wt.copy()
-        cf.data = BCT._createCF(cf.data)
+        from bait import bait_plot as BP
+        # Create CF always on PROC trace (cached)
+        cf = self._getcf()
 
         # select time series
         if plotraw:
@@ -611,19 +873,24 @@ class BaIt(object):
                                          *self.pick_test['LowFreqTrend'],
                                          **kwargs)
         elif name.lower() in ("all", "ensemble"):
-            kwargs['show'] = False
+            # v2.6.0: show only on request (headless/batch use).
+            #         FIG can be a sequence of 3 figures to reuse
+            show = kwargs.pop('show', False)
+            figs = kwargs.pop('fig', None) or (None, None, None)
             fig1, ax1 = BP.plotAmplitudeTest(
                             self.wt, cf, self.baitdict, idx,
-                            *self.pick_test['SignalAmp'], **kwargs)
+                            *self.pick_test['SignalAmp'], fig=figs[0],
+                            **kwargs)
             fig2, ax2 = BP.plotSustainTest(
                             self.wt, cf, self.baitdict, idx,
-                            *self.pick_test['SignalSustain'],
+                            *self.pick_test['SignalSustain'], fig=figs[1],
                             **kwargs)
             fig3, ax3 = BP.plotLowFreqTest(
                             self.wt, cf, self.baitdict, idx,
-                            *self.pick_test['LowFreqTrend'],
+                            *self.pick_test['LowFreqTrend'], fig=figs[2],
                             **kwargs)
-            show()
+            if show:
+                BP._show()
             return (fig1, fig2, fig3), (ax1, ax2, ax3)
         else:
             raise BE.InvalidParameter("%s is missing from evaluation tests. "
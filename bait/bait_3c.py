@@ -0,0 +1,178 @@
+"""
+This module contains the three-component (3C) mode of BaIt.
+
+A single `BaIt3C` object picks all the components of a station in
+one call. The stream lookup and the raw/proc pairing are done once
+for all the components (one pass over the streams), the
+instrumentation timer (and the CF cache, if one is given) is shared,
+and the results of every component are returned together (dicts keyed
+by component).
+
+Each component can have its own BaIt configuration (i.e. different
+picker/tests parameters for S-waves on the horizontals).
+
+USAGE:
+    >>> B3 = BaIt3C(st, stream_raw=stR, **BAIT_PAR_DICT)
+    >>> B3.CatchEmAll()
+    {'Z': True, 'N': False, 'E': True}
+    >>> B3.extract_true_pick(idx="all", picker="BK", compact_format=True)
+    {'Z': [(UTCDateTime(...), 'IPU0'), ...], 'N': [], 'E': [...]}
+"""
+
+import logging
+#
+from bait import bait_errors as BE
+from bait.bait import BaIt
+from bait.bait_instrument import createTimer
+from obspy.core.stream import Stream
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------- Private
+
+
+def _matchComponent(channel, components):
+    """
+    Return the component key (first letter of the matching entry of
+    `components`) of the channel code, None if not requested.
+    I.e. components ("Z", "N1", "E2") --> "HH1" is returned as "N".
+    """
+    for _cc in components:
+        if channel[-1:].upper() in _cc.upper():
+            return _cc[0].upper()
+    return None
+
+
+def _splitComponents(stream, stream_raw, components):
+    """
+    Single pass over the input streams. Return a dict
+    {component: (proc trace, raw trace/None)}.
+    Raise BE.BadInstance if more stations (or duplicated components)
+    are found.
+    """
+    out = {}
+    _station = None
+    for tr in stream:
+        _key = _matchComponent(tr.stats.channel, components)
+        if _key is None:
+            continue
+        _id = tr.id[:-1]        # NET.STA.LOC.CH (without component)
+        if _station is None:
+            _station = _id
+        elif _id != _station:
+            raise BE.BadInstance("BaIt3C works on a single station: "
+                                 "%s - %s" % (_station, _id))
+        if _key in out:
+            raise BE.BadKeyValue({'message': ("duplicated component --> %s"
+                                              % tr.id)})
+        out[_key] = [tr, None]
+    #
+    if isinstance(stream_raw, Stream):
+        for tr in stream_raw:
+            _key = _matchComponent(tr.stats.channel, components)
+            if _key in out and out[_key][1] is None and \
+               tr.id[:-1] == _station:
+                out[_key][1] = tr
+    return {_kk: tuple(_vv) for _kk, _vv in out.items()}
+
+
+# --------------------------------------------- Public
+
+
+class BaIt3C(object):
+    """
+    Three-component BaIt picker.
+
+    INPUT:
+        - stream: obspy.Stream (PROC) of a single station
+        - stream_raw: obspy.Stream (RAW) of the same station, or None
+        - components: tuple of the components to pick. Each entry can
+                      list alternative codes (i.e. "N1"), the result
+                      key is always the first one.
+        - component_conf: dict {component: {BaIt kwargs}} overriding
+                          the common `kwargs` for that component
+        - kwargs: any other `BaIt` keyword argument, common to all
+                  the components (max_iter, opbk_main, instrument ...)
+
+    Missing components are logged and skipped.
+
+    *** NB: `cf_cache` (None by default) is passed as it is to every
+            component. The cached CFs are reused by later runs even if
+            the trace data are edited in place (see `BaIt`).
+    """
+    def __init__(self,
+                 stream,
+                 stream_raw=None,
+                 components=("Z", "N1", "E2"),
+                 component_conf=None,
+                 **kwargs):
+        if not isinstance(stream, Stream):
+            raise BE.BadInstance("Input must be an obspy.Stream!")
+        self.components = tuple(_cc[0].upper() for _cc in components)
+        self.cf_cache = kwargs.pop('cf_cache', None)
+        self.timer = createTimer(kwargs.pop('instrument', None))
+        #
+        self.baits = {}
+        self.errors = {}
+        pairs = _splitComponents(stream, stream_raw, components)
+        for _cc in self.components:
+            if _cc not in pairs:
+                logger.warning("Component %s not found" % _cc)
+                continue
+            _proc, _raw = pairs[_cc]
+            _conf = dict(kwargs)
+            if component_conf and _cc in component_conf:
+                _conf.update(component_conf[_cc])
+            self.baits[_cc] = BaIt(
+                        Stream(traces=[_proc]),
+                        stream_raw=(Stream(traces=[_raw])
+                                    if _raw is not None else None),
+                        channel=_proc.stats.channel,
+                        instrument=self.timer,
+                        cf_cache=self.cf_cache,
+                        **_conf)
+        if not self.baits:
+            raise BE.MissingVariable({'message': "No component found!"})
+
+    def CatchEmAll(self):
+        """
+        Run `BaIt.CatchEmAll` on every component.
+        Return a dict {component: True/False} (valid picks found).
+        Components without valid picks are stored in `self.errors`.
+        """
+        out = {}
+        self.errors = {}
+        for _cc, BP in self.baits.items():
+            try:
+                BP.CatchEmAll()
+            except BE.MissingVariable as err:
+                logger.warning("%s: %s" % (BP.wt.id, err))
+                self.errors[_cc] = "No TRUE pick found!"
+                out[_cc] = False
+            else:
+                out[_cc] = True
+        return out
+
+    def extract_true_pick(self, **kwargs):
+        """
+        Return a dict {component: `BaIt.extract_true_pick(**kwargs)`}.
+        Components with no valid pick return an empty list.
+        """
+        return {_cc: BP.extract_true_pick(**kwargs)
+                for _cc, BP in self.baits.items()}
+
+    @property
+    def picks(self):
+        """ Dict {component: bait_picks.PickStore} """
+        return {_cc: BP.picks for _cc, BP in self.baits.items()}
+
+    @property
+    def timings(self):
+        """ Per-stage timings of all the components (None if disabled) """
+        if self.timer is None:
+            return None
+        return self.timer.summary()
+
+    def __getitem__(self, component):
+        return self.baits[component.upper()]
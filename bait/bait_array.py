@@ -0,0 +1,211 @@
+"""
+This module contains the batched (2-D array) version of BaIt.
+
+For event-based processing, many equal-length windows (the rows of a
+(n_traces, n_samples) array) are picked together, without creating
+any obspy Trace:
+ - rows are grouped by sampling rate, each group is picked at once
+ - the data are converted once to a C-contiguous float32 array: every
+   iteration of the Baer-Kradolfer picker (`pk_baer`) runs on a view
+   of the row, starting from the previous pick (as BaIt "single" mode)
+ - the CF of all the rows is computed at once
+ - at each iteration, the new picks of all the rows are evaluated
+   together with the batched interface of the validation tests
+   (`bait_customtests.registerTest(..., batched=True)`). Tests without
+   it are run pick by pick.
+The iterative cycle is the one of `BaIt.CatchEmAll`: `opbk_main` for
+the first iteration, `opbk_aux` after, and a row stops at the first
+iteration without a pick.
+
+USAGE:
+    >>> res = pickArray(data, 100.0, data_raw=raw, **BAIT_PAR_DICT)
+    >>> res['sample'][3]                     # all the picks of row 3
+    >>> extractPicks(res)[3]                 # valid picks of row 3
+"""
+
+import logging
+import numpy as np
+#
+from bait import bait_errors as BE
+from bait import bait_customtests as BCT
+from bait import bait_kernels as KRN
+from bait.bait import _pk_baer
+from bait.bait_picks import NOSAMPLE, _testmetric
+from bait.bait_window import _bounds
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------- Private
+
+
+def _sec2sample(value, df):
+    """ Same conversion of `BaIt._sec2sample` """
+    return int(round(value * df))
+
+
+def _cfRows(data):
+    """ CF of each row, computed by `bait_customtests._createCF` (the
+        CF of the single-trace BaIt) """
+    _dt = data.dtype if np.issubdtype(data.dtype, np.floating) else \
+        np.float64
+    cf = np.empty(data.shape, dtype=_dt)
+    for _ii in range(data.shape[0]):
+        cf[_ii] = BCT._createCF(data[_ii])
+    cf.flags.writeable = False
+    return cf
+
+
+def _resultArray(ntraces, max_iter, names, infolen=8):
+    """ Empty (NOSAMPLE / -1 / NaN) output array """
+    dtype = [('iteration', 'i4'),
+             ('sample', 'i8'),
+             ('bk_info', 'U%d' % infolen),
+             ('sample_aic', 'i8'),
+             ('evaluatePick', 'i1')]
+    for _nn in names:
+        dtype += [(_nn, 'i1'), (_nn + '_metric', 'f8')]
+    out = np.zeros((ntraces, max_iter), dtype=dtype)
+    out['iteration'] = np.arange(1, max_iter + 1)
+    out['sample'] = NOSAMPLE
+    out['sample_aic'] = NOSAMPLE
+    out['evaluatePick'] = -1
+    for _nn in names:
+        out[_nn] = -1
+        out[_nn + '_metric'] = np.nan
+    return out
+
+
+def _pickGroup(out, rows, data, bkdata, raw, df, maxit, opbk_main,
+               opbk_aux, tests, pickAIC, pickAIC_conf):
+    """ Iterative picking of the rows of a single sampling rate """
+    npts = data.shape[1]
+    cf = _cfRows(data)
+    start = np.zeros(len(rows), dtype=np.int64)     # picker start sample
+    active = np.ones(len(rows), dtype=bool)
+    for ITERATION in range(1, maxit + 1):
+        _par = opbk_main if ITERATION == 1 else opbk_aux
+        _args = (_sec2sample(_par['tdownmax'], df),
+                 _sec2sample(_par['tupevent'], df),
+                 _par['thr1'], _par['thr2'],
+                 _sec2sample(_par['preset_len'], df),
+                 _sec2sample(_par['p_dur'], df))
+        _it = ITERATION - 1
+        # ------------------------------------------- picker (row views)
+        picked = []
+        for _ii in np.flatnonzero(active):
+            PickSample, PhaseInfo = _pk_baer(bkdata[_ii, start[_ii]:], df,
+                                             *_args)
+            PhaseInfo = str(PhaseInfo).strip()
+            if PhaseInfo == '':
+                active[_ii] = False         # no pick -> exit the loop
+                continue
+            _smp = start[_ii] + PickSample
+            out['sample'][rows[_ii], _it] = _smp
+            out['bk_info'][rows[_ii], _it] = PhaseInfo
+            start[_ii] = max(_smp, 0)
+            picked.append(_ii)
+        if not picked:
+            break
+        picked = np.array(picked, dtype=np.int64)
+        samples = start[picked]
+        if not tests:
+            continue        # as BaIt: picks not evaluated are not valid
+        # ------------------------------------------- tests (batched)
+        _all = len(picked) == len(rows)
+        _data = data if _all else data[picked]
+        _cf = cf if _all else cf[picked]
+        verdict = np.ones(len(picked), dtype=bool)
+        for (_name, _call, _) in tests:
+            (_vv, _oo) = _call(_data, _cf, samples, df)
+            _vv = np.asarray(_vv, dtype=bool)
+            verdict &= _vv
+            out[_name][rows[picked], _it] = _vv
+            out[_name + '_metric'][rows[picked], _it] = [
+                _testmetric(_name, _xx) for _xx in _oo]
+        out['evaluatePick'][rows[picked], _it] = verdict
+        # ------------------------------------------- AIC (valid picks)
+        if pickAIC:
+            _src = raw if (pickAIC_conf.get('useraw') and
+                           raw is not None) else data
+            for _ii, _smp in zip(picked[verdict], samples[verdict]):
+                _ss, _ee = _bounds(0.0, npts, df, 1.0 / df,
+                                   _smp / df -
+                                   pickAIC_conf.get('wintrim_noise', 1.0),
+                                   _smp / df +
+                                   pickAIC_conf.get('wintrim_sign', 1.0))
+                if _ee - _ss < 2:
+                    continue
+                _idx, _ = KRN.aic(_src[_ii, _ss:_ee])
+                out['sample_aic'][rows[_ii], _it] = _ss + _idx
+
+
+# --------------------------------------------- Public
+
+
+def pickArray(data,
+              sampling_rate,
+              data_raw=None,
+              max_iter=5,
+              opbk_main={},
+              opbk_aux={},
+              test_pickvalidation={},
+              pickAIC=None,
+              pickAIC_conf={}):
+    """
+    Iterative BK picking of the rows of a 2-D array.
+
+    INPUT:
+        - data: (n_traces, n_samples) array of PROCESSED traces
+        - sampling_rate: float, or array with the rate of each row
+        - data_raw: (n_traces, n_samples) array of RAW traces (AIC with
+                    pickAIC_conf['useraw']) or None
+        - max_iter, opbk_main, opbk_aux, test_pickvalidation, pickAIC,
+          pickAIC_conf: same as `BaIt`
+
+    OUTPUT:
+        - structured array (n_traces, max_iter), one element per row and
+          iteration, with the fields of `PickStore.toarray` without the
+          times: 'iteration', 'sample' (pick sample index in the row,
+          NOSAMPLE if missing), 'bk_info', 'sample_aic', 'evaluatePick'
+          (int8, -1 not evaluated) and for each test `name` (verdict,
+          -1 not evaluated) and `name_metric`.
+    """
+    data = np.asarray(data)
+    if data.ndim != 2:
+        raise BE.BadInstance("Input data must be a 2-D array "
+                             "(n_traces, n_samples)!")
+    if data_raw is not None:
+        data_raw = np.asarray(data_raw)
+        if data_raw.shape != data.shape:
+            raise BE.SizeMismatch("data_raw must have the shape of data!")
+    rates = np.broadcast_to(np.asarray(sampling_rate, dtype=np.float64),
+                            (data.shape[0],))
+    tests = BCT.resolveBatchTests(test_pickvalidation)   # fail early
+    names = tuple(test_pickvalidation.keys()) if test_pickvalidation else ()
+    out = _resultArray(data.shape[0], max_iter, names)
+    #
+    for _df in np.unique(rates):
+        rows = np.flatnonzero(rates == _df)
+        _all = len(rows) == data.shape[0]
+        _data = data if _all else data[rows]
+        _raw = (None if data_raw is None else
+                data_raw if _all else data_raw[rows])
+        logger.info("Picking %d traces @ %.2f Hz" % (len(rows), _df))
+        _pickGroup(out, rows, _data,
+                   np.ascontiguousarray(_data, dtype=np.float32),
+                   _raw, float(_df), max_iter, opbk_main, opbk_aux, tests,
+                   pickAIC, pickAIC_conf)
+    return out
+
+
+def extractPicks(result, picker="BK"):
+    """
+    Return the list (one per row) of the sorted sample indexes of the
+    valid picks ("BK" or "AIC") of a `pickArray` result.
+    """
+    if picker.lower() not in ("bk", "aic"):
+        raise BE.BadKeyValue({'message': "Wrong picker input ('bk', 'aic')"})
+    _field = 'sample' if picker.lower() == "bk" else 'sample_aic'
+    _valid = (result['evaluatePick'] == 1) & (result[_field] != NOSAMPLE)
+    return [np.sort(_rr[_vv]) for _rr, _vv in zip(result[_field], _valid)]
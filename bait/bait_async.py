@@ -0,0 +1,172 @@
+"""
+This module contains the asyncio pipeline API of BaIt:
+
+    async source --> [queue] --> picking stage --> [queue] --> async sink
+
+ - the source is an async iterable (or a plain iterable) of obspy
+   Streams or (proc, raw) Stream pairs
+ - the picking stage runs the blocking BaIt pipeline in an executor
+   (a new BaIt object per station, no shared state) with at most
+   `concurrency` jobs at the same time
+ - the sink is an async callable receiving each station result, the
+   same dict returned by `bait_batch.pickStream`:
+        {'id': "NET.STA.LOC", 'picks': [...], 'error': None/str}
+
+Both queues are bounded: a burst of events blocks the source (back-
+pressure) instead of filling the memory, and a slow sink does not
+stall the picking until `sink_buffer` results are waiting. At most
+`queue_size + concurrency + sink_buffer` items are in memory.
+
+USAGE:
+    >>> async def publish(result):
+    ...     await producer.send(json.dumps(result, default=str))
+    >>> stats = asyncio.run(pickPipeline(source, publish, concurrency=4,
+    ...                                  **BAIT_PAR_DICT))
+"""
+
+import inspect
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+#
+from bait import bait_errors as BE
+from bait.bait_batch import _groupStations, _pickStation
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()        # end-of-stream sentinel
+
+
+# --------------------------------------------- Private
+
+
+def _pickItem(item, channel, baitconf, extractconf):
+    """
+    Executor function: pick all the stations of a source item.
+    It must stay at module level (picklable by the process pool).
+    """
+    if isinstance(item, (list, tuple)):
+        _proc, _raw = item
+    else:
+        _proc, _raw = item, None
+    return [_pickStation((_key, _st, _rr, channel, baitconf, extractconf,
+                          False))
+            for (_key, _st, _rr) in _groupStations(_proc, _raw, channel)]
+
+
+# --------------------------------------------- Public
+
+
+async def pickPipeline(source,
+                       sink,
+                       concurrency=4,
+                       queue_size=None,
+                       sink_buffer=None,
+                       sink_workers=1,
+                       executor=None,
+                       channel="*Z",
+                       extract_conf=None,
+                       **kwargs):
+    """
+    Run the ingest --> pick --> publish pipeline until the source is
+    exhausted and all the results are published.
+
+    INPUT:
+        - source: async iterable (or iterable) of obspy.Stream or
+                  (proc, raw) pairs
+        - sink: async callable (a plain callable is accepted too, but
+                it runs in the event loop) receiving each result dict
+        - concurrency: maximum number of picking jobs at the same time
+        - queue_size: maximum items waiting to be picked
+                      (default 2 * concurrency)
+        - sink_buffer: maximum results waiting for the sink
+                       (default 4 * concurrency)
+        - sink_workers: number of concurrent sink calls
+        - executor: concurrent.futures executor. Default: a new
+                    ProcessPoolExecutor(concurrency), shut down at the end
+        - channel, extract_conf: see `bait_batch.pickStream`
+        - kwargs: any other `BaIt` keyword argument
+
+    OUTPUT:
+        - dict {'items', 'stations', 'errors'} counters
+
+    An exception of the source or of the sink stops the pipeline and
+    is raised. Picking errors are published as results (`error` key).
+    """
+    if concurrency < 1 or sink_workers < 1:
+        raise BE.InvalidParameter("concurrency and sink_workers must be "
+                                  "positive!")
+    if not extract_conf:
+        extract_conf = {'idx': 'all', 'picker': 'BK', 'compact_format': True}
+    queue_size = queue_size or 2 * concurrency
+    sink_buffer = sink_buffer or 4 * concurrency
+    #
+    loop = asyncio.get_running_loop()
+    in_q = asyncio.Queue(maxsize=queue_size)
+    out_q = asyncio.Queue(maxsize=sink_buffer)
+    stats = {'items': 0, 'stations': 0, 'errors': 0}
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=concurrency)
+
+    async def _ingest():
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await in_q.put(item)      # blocks when full: backpressure
+        else:
+            for item in source:
+                await in_q.put(item)
+        for _ in range(concurrency):
+            await in_q.put(_DONE)
+
+    async def _picker():
+        while True:
+            item = await in_q.get()
+            if item is _DONE:
+                return
+            stats['items'] += 1
+            try:
+                results = await loop.run_in_executor(
+                            executor, _pickItem, item, channel, kwargs,
+                            extract_conf)
+            except Exception as err:
+                logger.error("Picking failed: %s" % err)
+                results = [{'id': None, 'picks': [],
+                            'error': "%s: %s" % (type(err).__name__, err)}]
+            for _rr in results:
+                await out_q.put(_rr)
+
+    async def _closer(pickers):
+        await asyncio.gather(*pickers)
+        for _ in range(sink_workers):
+            await out_q.put(_DONE)
+
+    async def _publisher():
+        while True:
+            result = await out_q.get()
+            if result is _DONE:
+                return
+            stats['stations'] += 1
+            if result['error']:
+                stats['errors'] += 1
+            _ret = sink(result)
+            if inspect.isawaitable(_ret):
+                await _ret
+
+    pickers = [asyncio.ensure_future(_picker()) for _ in range(concurrency)]
+    tasks = ([asyncio.ensure_future(_ingest()),
+              asyncio.ensure_future(_closer(pickers))] + pickers +
+             [asyncio.ensure_future(_publisher())
+              for _ in range(sink_workers)])
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for _tt in tasks:
+            _tt.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        if own_executor:
+            # waiting for the workers must not block the event loop
+            await loop.run_in_executor(None, executor.shutdown, True)
+    return stats
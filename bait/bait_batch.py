@@ -0,0 +1,171 @@
+"""
+This module contains the multi-station (batch) engine of BaIt.
+
+The input stream is split by station (NET.STA.LOC) and the BaIt
+pipeline (`CatchEmAll` --> `extract_true_pick`) runs independently
+for each of them on a pool of worker processes.
+Results are always returned sorted by station id, no matter the
+order in which the workers complete.
+
+*** NB: only the traces matching `channel` are sent to the workers.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+#
+from bait import bait_errors as BE
+from bait.bait import BaIt
+from bait.bait_cache import cachedCatchEmAll
+from obspy.core.stream import Stream
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------- Private
+
+
+def _stationKey(tr):
+    """ Return the station key NET.STA.LOC of the input trace """
+    return "%s.%s.%s" % (tr.stats.network,
+                         tr.stats.station,
+                         tr.stats.location)
+
+
+def _groupStations(stream, stream_raw=None, channel="*Z"):
+    """
+    Split the input into per-station work units.
+
+    INPUT:
+        - stream: obspy.Stream (PROC) or a list of (proc, raw) stream
+                  pairs (one pair per station, raw can be None)
+        - stream_raw: obspy.Stream (RAW) or None. Ignored if `stream`
+                      is a list of pairs
+        - channel: channel selection (obspy.Stream.select)
+
+    OUTPUT:
+        - list of tuples (stationkey, proc stream, raw stream/None)
+          sorted by station key
+    """
+    units = {}
+    if isinstance(stream, Stream):
+        for tr in stream.select(channel=channel):
+            units.setdefault(_stationKey(tr), [Stream(), None])[0] += tr
+        if isinstance(stream_raw, Stream):
+            for tr in stream_raw.select(channel=channel):
+                _key = _stationKey(tr)
+                if _key in units:
+                    if units[_key][1] is None:
+                        units[_key][1] = Stream()
+                    units[_key][1] += tr
+
+    elif isinstance(stream, (list, tuple)):
+        for _pair in stream:
+            try:
+                _proc, _raw = _pair
+            except (TypeError, ValueError):
+                raise BE.BadInstance("Input must be a list of (proc, raw) "
+                                     "stream pairs!")
+            _proc = _proc.select(channel=channel)
+            if not _proc:
+                continue
+            if isinstance(_raw, Stream):
+                _raw = _raw.select(channel=channel)
+            _key = _stationKey(_proc[0])
+            if _key in units:
+                raise BE.BadKeyValue({'message': ("duplicated station --> %s"
+                                                  % _key)})
+            units[_key] = [_proc, _raw if _raw else None]
+    else:
+        raise BE.BadInstance("Input must be an obspy.Stream or a list of "
+                             "(proc, raw) stream pairs!")
+    #
+    return [(_key, units[_key][0], units[_key][1])
+            for _key in sorted(units.keys())]
+
+
+def _pickStation(unit):
+    """
+    Worker function: run the BaIt pipeline over a single station.
+    It must stay at module level (picklable by the process pool).
+
+    RETURN: dict with keys 'id', 'picks', 'error' (and 'baitdict'
+            if requested)
+    """
+    (stkey, st, straw, channel, baitconf, extractconf, keepdict) = unit[:7]
+    cache = unit[7] if len(unit) > 7 else None
+    out = {'id': stkey, 'picks': [], 'error': None}
+    BP = BaIt(st, stream_raw=straw, channel=channel, **baitconf)
+    try:
+        if cache is not None:
+            cachedCatchEmAll(BP, cache)
+        else:
+            BP.CatchEmAll()
+    except BE.MissingVariable as err:
+        logger.warning("%s: %s" % (stkey, err))
+        out['error'] = "No TRUE pick found!"
+    else:
+        out['picks'] = BP.extract_true_pick(**extractconf)
+    #
+    if keepdict:
+        out['baitdict'] = BP.baitdict
+    return out
+
+
+# --------------------------------------------- Public
+
+
+def pickStream(stream,
+               stream_raw=None,
+               channel="*Z",
+               processes=None,
+               chunksize=1,
+               extract_conf=None,
+               return_baitdict=False,
+               cache=None,
+               **kwargs):
+    """
+    Run the BaIt picking pipeline over all the stations of a stream,
+    in parallel.
+
+    INPUT:
+        - stream: obspy.Stream (PROC) or list of (proc, raw) pairs
+        - stream_raw: obspy.Stream (RAW) paired by station id
+        - channel: channel to pick for each station (i.e. "*Z")
+        - processes: number of worker processes. None uses all the
+                     CPUs, 1 runs serially in the calling process
+        - chunksize: number of stations sent to a worker at once
+        - extract_conf: dict of `extract_true_pick` arguments.
+                        Default: {'idx': 'all', 'picker': 'BK',
+                                  'compact_format': True}
+        - return_baitdict: if True, the full baitdict of each station
+                           is returned as well
+        - cache: `bait_cache.ResultCache` (or cache directory) to reuse
+                 the results of already picked stations
+        - kwargs: any other `BaIt` keyword argument (max_iter,
+                  opbk_main, opbk_aux, test_pickvalidation, pickAIC ...)
+
+    OUTPUT:
+        - list of dict, one per station sorted by station id:
+            {'id': "NET.STA.LOC", 'picks': [...], 'error': None/str}
+          Stations without a valid pick (`MissingVariable`) are returned
+          with an empty pick list and the error message.
+    """
+    if not extract_conf:
+        extract_conf = {'idx': 'all', 'picker': 'BK', 'compact_format': True}
+    #
+    units = [(_key, _st, _raw, channel, kwargs, extract_conf,
+              return_baitdict, cache)
+             for (_key, _st, _raw) in _groupStations(stream, stream_raw,
+                                                     channel)]
+    logger.info("Picking %d stations" % len(units))
+    if not units:
+        return []
+    #
+    if processes == 1 or len(units) == 1:
+        return [_pickStation(_uu) for _uu in units]
+    #
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # executor.map returns the results in the input order
+        results = list(executor.map(_pickStation, units,
+                                    chunksize=chunksize))
+    return results
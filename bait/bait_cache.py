@@ -0,0 +1,312 @@
+"""
+This module contains the (optional) on-disk cache of BaIt results.
+
+The results of `CatchEmAll` (the `bait_picks.PickStore`) are stored
+under a sha256 key combining:
+ - the content of the PROC (and RAW) working traces: data bytes,
+   dtype, id, starttime and sampling rate
+ - the channel
+ - a normalized hash of the picking configuration (`max_iter`,
+   `opbk_main`, `opbk_aux`, `test_pickvalidation`, `pickAIC`,
+   `pickAIC_conf`, `keep_aiccf`, `test_evaluation`, `precision`):
+   6 and 6.0 or tuples and lists give the same key, dict keys are
+   sorted.
+ - the bait version (a new release never reuses old results)
+
+Safe concurrent access from many processes:
+ - entries are written to a temporary file and moved in place with
+   `os.replace` (atomic): readers see the old entry, the new one, or
+   nothing, never a partial file
+ - the total size of the entries is kept in a sidecar file (`.size`)
+   updated by each `put` under an exclusive `fcntl` lock: a write
+   never lists the cache. The size-based eviction (least recently
+   used first, by mtime) runs under the same lock, so only one process
+   at a time deletes entries; it scans the entries and rewrites the
+   exact total. A reader losing an entry just gets a miss.
+
+USAGE:
+    >>> cache = ResultCache("/scratch/bait_cache", max_size=2 * 2**30)
+    >>> BP = BaIt(st, stream_raw=stR, **BAIT_PAR_DICT)
+    >>> cachedCatchEmAll(BP, cache)   # same as BP.CatchEmAll()
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import logging
+import tempfile
+import contextlib
+import numpy as np
+try:
+    import fcntl
+except ImportError:       # not Unix: eviction without inter-process lock
+    fcntl = None
+#
+from bait import __version__
+from bait import bait_errors as BE
+from obspy.core.stream import Stream
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT = 1
+CONF_KEYS = ('max_iter', 'opbk_main', 'opbk_aux', 'test_pickvalidation',
+             'pickAIC', 'pickAIC_conf', 'keep_aiccf', 'test_evaluation',
+             'precision')
+
+
+# --------------------------------------------- Private
+
+
+def _normalizeConf(obj):
+    """ Return a JSON-able, canonical version of the configuration """
+    if isinstance(obj, dict):
+        return {str(_kk): _normalizeConf(_vv) for _kk, _vv in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_normalizeConf(_vv) for _vv in obj]
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, bool) or obj is None or isinstance(obj, str):
+        return obj
+    if isinstance(obj, (int, float)):
+        return float(obj)
+    raise BE.BadInstance("Not hashable configuration value: %r" % (obj,))
+
+
+def _hashTrace(hasher, tr):
+    """ Update the hasher with the content of a trace (None allowed) """
+    if tr is None:
+        hasher.update(b"none")
+        return
+    _data = np.ascontiguousarray(tr.data)
+    hasher.update(("%s|%s|%d|%r|%d|" % (
+                    tr.id, _data.dtype.str, tr.stats.starttime.ns,
+                    float(tr.stats.sampling_rate), len(_data))
+                   ).encode())
+    hasher.update(memoryview(_data).cast("B"))
+
+
+# --------------------------------------------- Public
+
+
+class ResultCache(object):
+    """
+    On-disk cache of BaIt results.
+
+    INPUT:
+        - path: cache directory (created if missing)
+        - max_size: maximum size in bytes. When exceeded, the least
+                    recently used entries are removed down to
+                    `low_water` * max_size.
+    """
+    def __init__(self, path, max_size=2**30, low_water=0.9):
+        self.path = os.path.abspath(path)
+        self.max_size = int(max_size)
+        self.low_water = low_water
+        os.makedirs(self.path, exist_ok=True)
+
+    # ------------------------------------- keys
+    def key(self, proc, raw=None, channel="*Z", conf=None):
+        """
+        Return the sha256 key (hex) of PROC/RAW traces, channel and
+        configuration dict (only the `CONF_KEYS` are used).
+        """
+        hasher = hashlib.sha256()
+        hasher.update(("bait-%s|%d|%s|" % (__version__, CACHE_FORMAT,
+                                           channel)).encode())
+        _conf = {_kk: (conf or {}).get(_kk) for _kk in CONF_KEYS}
+        hasher.update(json.dumps(_normalizeConf(_conf),
+                                 sort_keys=True).encode())
+        _hashTrace(hasher, proc)
+        _hashTrace(hasher, raw)
+        return hasher.hexdigest()
+
+    def keyFor(self, BP):
+        """ Return the key of a BaIt object (working traces + config) """
+        BP._setworktrace(BP.wc, "PROC")
+        proc = BP.wt
+        raw = None
+        if isinstance(BP.straw, Stream):
+            _raw = BP.straw.select(channel=BP.wc)
+            raw = _raw[0] if _raw else None
+        conf = {'max_iter': BP.maxit,
+                'opbk_main': BP.opbk_main,
+                'opbk_aux': BP.opbk_aux,
+                'test_pickvalidation': BP.pick_test,
+                'pickAIC': bool(BP.pickAIC),
+                'pickAIC_conf': BP.pickAIC_conf,
+                'keep_aiccf': BP.picks.keep_aiccf,
+                'test_evaluation': BP.test_evaluation,
+                'precision': BP.precision.name}
+        return self.key(proc, raw, BP.wc, conf)
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], key + ".pkl")
+
+    # ------------------------------------- get / put
+    def get(self, key):
+        """ Return the cached object, None on a miss """
+        _ff = self._file(key)
+        try:
+            with open(_ff, "rb") as IN:
+                out = pickle.load(IN)
+        except FileNotFoundError:
+            return None
+        except Exception as err:
+            # corrupted / incompatible entry --> miss
+            logger.warning("Bad cache entry %s: %s" % (key, err))
+            try:
+                os.remove(_ff)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(_ff)           # LRU: mtime is the last access
+        except OSError:
+            pass
+        return out
+
+    def put(self, key, obj):
+        """ Store the object (atomic write), then evict if needed """
+        _ff = self._file(key)
+        os.makedirs(os.path.dirname(_ff), exist_ok=True)
+        _fd, _tmp = tempfile.mkstemp(dir=os.path.dirname(_ff),
+                                     prefix=".tmp-", suffix=".pkl")
+        try:
+            with os.fdopen(_fd, "wb") as OUT:
+                pickle.dump(obj, OUT, protocol=pickle.HIGHEST_PROTOCOL)
+            _new = os.path.getsize(_tmp)
+            try:
+                _old = os.path.getsize(_ff)     # overwritten entry
+            except OSError:
+                _old = 0
+            os.replace(_tmp, _ff)
+        except BaseException:
+            if os.path.exists(_tmp):
+                os.remove(_tmp)
+            raise
+        with self._locked():
+            total = self._readSize()
+            if total is None:
+                total = self.size()     # rebuilt: the entry is included
+            else:
+                total += _new - _old
+            if total > self.max_size:
+                self._evict(self.low_water * self.max_size)
+            else:
+                self._writeSize(total)
+
+    # ------------------------------------- size / eviction
+    def _entries(self):
+        """ Return a list of (mtime, size, file) of the entries """
+        out = []
+        for _dd in os.scandir(self.path):
+            if not _dd.is_dir():
+                continue
+            for _ee in os.scandir(_dd.path):
+                if _ee.name.endswith(".pkl") and \
+                   not _ee.name.startswith(".tmp-"):
+                    try:
+                        _st = _ee.stat()
+                    except FileNotFoundError:
+                        continue        # evicted meanwhile
+                    out.append((_st.st_mtime, _st.st_size, _ee.path))
+        return out
+
+    def size(self):
+        """ Total size in bytes of the cached entries (full scan) """
+        return sum(_ee[1] for _ee in self._entries())
+
+    def __len__(self):
+        return len(self._entries())
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """ Exclusive inter-process lock of the cache (size / eviction) """
+        with open(os.path.join(self.path, ".lock"), "w") as LOCK:
+            if fcntl is not None:
+                fcntl.flock(LOCK, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(LOCK, fcntl.LOCK_UN)
+
+    def _readSize(self):
+        """ Running total of the sidecar file (to be called locked).
+            Return None if it is missing or broken.
+        """
+        try:
+            with open(os.path.join(self.path, ".size"), "r") as IN:
+                return int(IN.read())
+        except (OSError, ValueError):
+            return None
+
+    def _writeSize(self, total):
+        """ Store the running total (to be called locked) """
+        with open(os.path.join(self.path, ".size"), "w") as OUT:
+            OUT.write("%d" % max(total, 0))
+
+    def _evict(self, target):
+        """ Eviction body (to be called locked): return the number of
+            removed entries and rewrite the exact size total.
+        """
+        entries = sorted(self._entries())
+        total = sum(_ee[1] for _ee in entries)
+        removed = 0
+        for (_, _size, _ff) in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(_ff)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= _size
+        self._writeSize(total)
+        logger.info("Cache eviction: %d entries removed" % removed)
+        return removed
+
+    def evict(self, target=None):
+        """
+        Remove the least recently used entries until the cache size is
+        below `target` (default low_water * max_size). Return the number
+        of removed entries.
+        """
+        if target is None:
+            target = self.low_water * self.max_size
+        with self._locked():
+            return self._evict(target)
+
+    def clear(self):
+        """ Remove all the entries """
+        return self.evict(target=0)
+
+
+def cachedCatchEmAll(BP, cache):
+    """
+    Same as `BP.CatchEmAll()` (raise BE.MissingVariable if no valid
+    pick is found), but the results are read from / stored in the
+    ResultCache `cache` (a ResultCache or a cache directory).
+    Return True on a cache hit.
+    """
+    if not isinstance(cache, ResultCache):
+        cache = ResultCache(cache)
+    key = cache.keyFor(BP)
+    picks = cache.get(key)
+    hit = picks is not None
+    if not hit:
+        try:
+            BP.CatchEmAll()
+        except BE.MissingVariable:
+            cache.put(key, BP.picks)    # no valid pick is a result too
+            raise
+        cache.put(key, BP.picks)
+        return False
+    #
+    logger.debug("Cache hit %s" % key)
+    BP.picks = picks
+    if not BP.picks.valid():
+        logger.error("*** No valid pick found")
+        raise BE.MissingVariable({'message': "No TRUE pick found!"})
+    return True
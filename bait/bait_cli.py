@@ -0,0 +1,353 @@
+"""
+This module contains the `bait-pick` command line interface.
+
+It picks a set of waveform files (directories, globs or file lists)
+with the BaIt parameters given in a YAML configuration file, in
+parallel (one file per worker process). Results are appended to a
+JSON-lines file as soon as each file is finished, one line per file:
+
+    {"file": "...", "error": null,
+     "results": [{"id": "NET.STA.LOC", "error": null,
+                  "picks": [["2009-08-24T00:20:07.720000Z", "IPU0"]]}]}
+
+A checkpoint file (default: OUTPUT.ckpt) lists the finished files.
+After a crash, running the same command again skips them and goes on
+with the others (`--restart` to start from scratch). Files that failed
+("error" not null) are written to the output. Failures that would
+happen again (i.e. unknown format, corrupted data) are checkpointed as
+well, I/O errors (OSError) are not: those files are picked again by the
+next run. `--retry-failed` picks again all the failed files. The exit
+status is 1 if any file of the input set failed.
+
+The YAML keys are the `BaIt` keyword arguments (max_iter, opbk_main,
+opbk_aux, test_pickvalidation, pickAIC, pickAIC_conf ...) plus the
+optional:
+    - channel: channel to pick (default "*Z")
+    - preprocess: list of obspy.Stream methods applied to a copy of
+                  the data (the PROC stream, the read data are used
+                  as RAW), i.e.
+                      preprocess:
+                        - detrend: {type: demean}
+                        - taper: {max_percentage: 0.05}
+                        - filter: {type: bandpass, freqmin: 1,
+                                   freqmax: 30, corners: 2,
+                                   zerophase: true}
+                  Without it the read data are used as PROC (no RAW).
+
+USAGE:
+    $ bait-pick data/ -c config.yml -o picks.jsonl -j 4
+    $ bait-pick "data/*.mseed" other.sac -c config.yml -o picks.jsonl
+    $ bait-pick --file-list files.txt -c config.yml -o picks.jsonl
+    $ bait-pick data/ -c config.yml -o picks.jsonl --cache /scratch/bait
+"""
+
+import os
+import sys
+import glob
+import json
+import logging
+import inspect
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+#
+import yaml
+from obspy import read
+#
+from bait import __version__
+from bait import bait_errors as BE
+from bait import bait_customtests as BCT
+from bait.bait import BaIt
+from bait.bait_batch import _groupStations, _pickStation
+from bait.bait_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+PREPROCESS_METHODS = ("detrend", "taper", "filter", "resample", "decimate",
+                      "merge", "trim", "interpolate")
+
+
+# --------------------------------------------- Private
+
+
+def _loadConfig(path):
+    """
+    Read the YAML configuration. Return (BaIt kwargs, channel,
+    preprocess list)
+
+    *** NB: the BaIt keywords and the evaluation tests are checked here,
+            before any file is read: a typo must not fail every file
+    """
+    with open(path, "r") as IN:
+        conf = yaml.safe_load(IN) or {}
+    if not isinstance(conf, dict):
+        raise BE.BadInstance("The configuration file must be a YAML dict!")
+    channel = conf.pop('channel', "*Z")
+    preprocess = conf.pop('preprocess', None) or []
+    for _step in preprocess:
+        if not isinstance(_step, dict) or len(_step) != 1:
+            raise BE.BadKeyValue({'message': "Each preprocess step must be "
+                                  "a single {method: {kwargs}} dict"})
+        _method = list(_step.keys())[0]
+        if _method not in PREPROCESS_METHODS:
+            raise BE.InvalidParameter("Preprocess method %r not allowed %s" %
+                                      (_method, PREPROCESS_METHODS))
+    _allowed = set(inspect.signature(BaIt.__init__).parameters) - {
+                    'self', 'stream', 'stream_raw', 'channel'}
+    _unknown = sorted(set(conf) - _allowed)
+    if _unknown:
+        raise BE.InvalidParameter("Unknown configuration keys %s (allowed: "
+                                  "channel, preprocess, %s)" % (
+                                    _unknown, ", ".join(sorted(_allowed))))
+    BCT.resolveTests(conf.get('test_pickvalidation'))   # unknown tests
+    return conf, channel, preprocess
+
+
+def _collectFiles(inputs, file_list=None):
+    """
+    Expand directories (all the files inside), globs and file names.
+    Return the sorted list of unique (absolute) paths.
+    """
+    paths = list(inputs)
+    if file_list:
+        with open(file_list, "r") as IN:
+            paths.extend(_ll.strip() for _ll in IN
+                         if _ll.strip() and not _ll.startswith("#"))
+    out = set()
+    for _pp in paths:
+        if os.path.isdir(_pp):
+            out.update(os.path.join(_pp, _ff) for _ff in os.listdir(_pp)
+                       if os.path.isfile(os.path.join(_pp, _ff)))
+        elif os.path.isfile(_pp):
+            out.add(_pp)
+        else:
+            _match = [_ff for _ff in glob.glob(_pp) if os.path.isfile(_ff)]
+            if not _match:
+                logger.warning("No file found for %s" % _pp)
+            out.update(_match)
+    return sorted(os.path.abspath(_ff) for _ff in out)
+
+
+def _pickFile(args):
+    """
+    Worker function: read, preprocess and pick a single file.
+    It must stay at module level (picklable by the process pool).
+    Return the output record (dict) of the file and True if it must be
+    checkpointed (no error, or an error that a new run would repeat).
+    """
+    (path, baitconf, channel, preprocess, picker, cache) = args
+    out = {'file': path, 'error': None, 'results': []}
+    try:
+        st = read(path)
+        if preprocess:
+            straw, st = st, st.copy()
+            for _step in preprocess:
+                _method, _kwargs = list(_step.items())[0]
+                getattr(st, _method)(**(_kwargs or {}))
+        else:
+            straw = None
+        #
+        _extract = {'idx': 'all', 'picker': picker, 'compact_format': True}
+        for (_key, _st, _raw) in _groupStations(st, straw, channel):
+            _res = _pickStation((_key, _st, _raw, channel, baitconf,
+                                 _extract, False, cache))
+            _res['picks'] = [[str(_pk), _info]
+                             for (_pk, _info) in _res['picks']]
+            out['results'].append(_res)
+    except Exception as err:
+        # a bad file must not stop the whole run
+        logger.error("%s: %s" % (path, err))
+        out['error'] = "%s: %s" % (type(err).__name__, err)
+        # I/O errors may be transient, bad data or formats are not
+        return (out, not isinstance(err, OSError))
+    return (out, True)
+
+
+def _readCheckpoint(checkpoint):
+    """ Return the set of finished files """
+    if not os.path.isfile(checkpoint):
+        return set()
+    with open(checkpoint, "r") as IN:
+        return set(_ll.rstrip("\n") for _ll in IN if _ll.strip())
+
+
+def _failedFiles(output):
+    """ Return the set of files with an error record in the output """
+    out = set()
+    if not os.path.isfile(output):
+        return out
+    with open(output, "r") as IN:
+        for _ll in IN:
+            try:
+                _rec = json.loads(_ll)
+            except ValueError:
+                continue        # truncated line
+            if _rec.get('error') is not None:
+                out.add(_rec.get('file'))
+    return out
+
+
+def _writeCheckpoint(checkpoint, done):
+    """ Replace atomically the checkpoint with the `done` files """
+    _dir = os.path.dirname(os.path.abspath(checkpoint))
+    _fd, _tmp = tempfile.mkstemp(dir=_dir, prefix=".bait-pick-")
+    try:
+        with os.fdopen(_fd, "w") as OUT:
+            OUT.writelines(_ff + "\n" for _ff in sorted(done))
+        os.replace(_tmp, checkpoint)
+    except BaseException:
+        os.remove(_tmp)
+        raise
+
+
+def _cleanOutput(output, done):
+    """
+    Keep only the (complete) output lines of the checkpointed files:
+    lines written before a crash, but not checkpointed, are removed
+    (the file is picked again). The output is replaced atomically.
+    """
+    if not os.path.isfile(output):
+        return
+    _dir = os.path.dirname(os.path.abspath(output))
+    _fd, _tmp = tempfile.mkstemp(dir=_dir, prefix=".bait-pick-")
+    try:
+        with open(output, "r") as IN, os.fdopen(_fd, "w") as OUT:
+            for _ll in IN:
+                try:
+                    _rec = json.loads(_ll)
+                except ValueError:
+                    continue        # truncated line
+                if _rec.get('file') in done:
+                    OUT.write(_ll if _ll.endswith("\n") else _ll + "\n")
+        os.replace(_tmp, output)
+    except BaseException:
+        os.remove(_tmp)
+        raise
+
+
+def _writeRecord(OUT, CKPT, record, checkpoint=True):
+    """
+    Append the file record, then checkpoint it (both synced).
+    Files not checkpointed are retried by the next run (and
+    `_cleanOutput` drops their error record).
+    """
+    OUT.write(json.dumps(record) + "\n")
+    OUT.flush()
+    os.fsync(OUT.fileno())
+    if not checkpoint:
+        return
+    CKPT.write(record['file'] + "\n")
+    CKPT.flush()
+    os.fsync(CKPT.fileno())
+
+
+# --------------------------------------------- Public
+
+
+def runPick(files, config, output, checkpoint=None, processes=None,
+            picker="BK", restart=False, cache=None, retry_failed=False):
+    """
+    Pick all the `files` with the YAML `config`, appending the results
+    to `output` (JSON lines) and the finished files to `checkpoint`.
+    The optional `cache` (bait_cache.ResultCache) is shared by the
+    workers. With `retry_failed` the checkpointed files that failed
+    are picked again. Return the number of files picked in this run.
+    """
+    baitconf, channel, preprocess = _loadConfig(config)
+    if picker not in ("BK", "AIC"):
+        raise BE.InvalidParameter("PICKER must be either BK or AIC!")
+    if picker == "AIC" and not baitconf.get('pickAIC'):
+        raise BE.InvalidParameter("AIC picks requested, but pickAIC is "
+                                  "not set in the configuration!")
+    checkpoint = checkpoint or output + ".ckpt"
+    # the output directory may be among the inputs: skip our own files
+    _own = (os.path.abspath(output), os.path.abspath(checkpoint))
+    files = [_ff for _ff in files if os.path.abspath(_ff) not in _own and
+             not os.path.basename(_ff).startswith(".bait-pick-")]
+    if restart:
+        for _ff in (output, checkpoint):
+            if os.path.isfile(_ff):
+                os.remove(_ff)
+    done = _readCheckpoint(checkpoint)
+    if retry_failed:
+        _failed = done & _failedFiles(output)
+        if _failed:
+            done -= _failed
+            _writeCheckpoint(checkpoint, done)
+    _cleanOutput(output, done)
+    todo = [_ff for _ff in files if _ff not in done]
+    logger.info("%d files to pick (%d already done)" % (
+                len(todo), len(files) - len(todo)))
+    if not todo:
+        return 0
+    #
+    units = [(_ff, baitconf, channel, preprocess, picker, cache)
+             for _ff in todo]
+    with open(output, "a") as OUT, open(checkpoint, "a") as CKPT:
+        if processes == 1 or len(units) == 1:
+            for _uu in units:
+                _writeRecord(OUT, CKPT, *_pickFile(_uu))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [executor.submit(_pickFile, _uu) for _uu in units]
+                # written as soon as each file is finished
+                for _fut in as_completed(futures):
+                    _writeRecord(OUT, CKPT, *_fut.result())
+    return len(units)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+                prog="bait-pick",
+                description="Pick waveform files with BaIt, in parallel "
+                            "and with resumable checkpoints.")
+    parser.add_argument("inputs", nargs="*",
+                        help="files, directories or globs (quoted)")
+    parser.add_argument("-c", "--config", required=True,
+                        help="YAML file with the BaIt parameters")
+    parser.add_argument("-o", "--output", default="bait_picks.jsonl",
+                        help="output JSON-lines file (appended)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="checkpoint file (default: OUTPUT.ckpt)")
+    parser.add_argument("--file-list", default=None,
+                        help="text file with one input path per line")
+    parser.add_argument("-j", "--processes", type=int, default=None,
+                        help="worker processes (default: all CPUs)")
+    parser.add_argument("--picker", default="BK", choices=("BK", "AIC"),
+                        help="pick time to store")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore (and remove) checkpoint and output")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="pick again the checkpointed failed files")
+    parser.add_argument("--cache", default=None,
+                        help="results cache directory (reused among runs)")
+    parser.add_argument("--cache-size", type=float, default=1024.0,
+                        help="maximum cache size [MB] (default: 1024)")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument("--version", action="version",
+                        version="%(prog)s " + __version__)
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    #
+    files = _collectFiles(args.inputs, args.file_list)
+    if not files:
+        parser.error("no input file found")
+    npicked = runPick(files, args.config, args.output,
+                      checkpoint=args.checkpoint,
+                      processes=args.processes,
+                      picker=args.picker,
+                      restart=args.restart,
+                      cache=(ResultCache(args.cache,
+                                         max_size=args.cache_size * 2**20)
+                             if args.cache else None),
+                      retry_failed=args.retry_failed)
+    nfailed = len(_failedFiles(args.output) & set(files))
+    print("Picked %d files (%d total, %d failed) --> %s" % (
+          npicked, len(files), nfailed, args.output))
+    return 1 if nfailed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+This module contains the chunked (continuous data) mode of BaIt.
+
+Long records (i.e. 24 h) are processed in overlapping chunks: each
+chunk is picked by its own BaIt object (CF normalized over the chunk
+only) and only the picks falling in the region OWNED by the chunk
+(the chunk without its overlaps) are kept. Owned regions do not
+overlap, so a pick is never reported twice; picks of adjacent chunks
+closer than `min_separation` (the same onset seen from both sides of
+a boundary) are reconciled keeping the one farther from its chunk
+edge.
+
+Chunks of in-memory traces are views (`obspy.Trace.slice`, no copy).
+If file names are given instead, only the header is read at first
+and each chunk is read lazily (`obspy.read(starttime, endtime)`),
+so the peak memory is proportional to the chunk length and not to
+the file length.
+
+*** NB: each chunk restarts the iterative cycle (`opbk_main` for the
+        first pick of the chunk, `opbk_aux` afterwards).
+*** NB: one channel of one station is picked (the first trace id
+        matching `channel`). Use `bait_batch` for many stations.
+"""
+
+import logging
+from obspy import read
+from obspy.core.trace import Trace
+from obspy.core.stream import Stream
+#
+from bait import bait_errors as BE
+from bait.bait import BaIt
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------- Private
+
+
+def _chunkTimes(starttime, endtime, chunk_len, overlap):
+    """
+    Return the list of chunks (read_start, read_end, own_start, own_end)
+    covering [starttime, endtime]. The owned regions are contiguous and
+    not overlapping (the last one is closed on `endtime`).
+    """
+    if chunk_len <= 0 or overlap < 0:
+        raise BE.InvalidParameter("chunk_len must be positive and overlap "
+                                  "not negative!")
+    out = []
+    _ts = starttime
+    while _ts <= endtime:
+        _te = _ts + chunk_len
+        out.append((max(_ts - overlap, starttime),
+                    min(_te + overlap, endtime),
+                    _ts, _te))
+        _ts = _te
+    return out
+
+
+def _selectTrace(stream, channel, traceid=None):
+    """
+    Return the (merged) trace of the first id matching `channel`
+    (or `traceid`), None if missing. Gaps are filled with zeros.
+    """
+    st = stream.select(id=traceid) if traceid else \
+        stream.select(channel=channel)
+    if not st:
+        return None
+    st = st.select(id=st[0].id)
+    if len(st) > 1:
+        st = st.copy().merge(method=1, fill_value=0)
+    return st[0]
+
+
+class _Source(object):
+    """
+    Chunk provider: an in-memory obspy.Stream/Trace (views) or a file
+    name/glob read lazily chunk by chunk.
+    """
+    def __init__(self, source, channel, traceid=None):
+        self.channel = channel
+        self.path = None
+        self.trace = None
+        if isinstance(source, str):
+            self.path = source
+            _head = read(source, headonly=True)
+            _head = _head.select(id=traceid) if traceid else \
+                _head.select(channel=channel)
+            if not _head:
+                raise BE.MissingVariable({'message': "No %s trace in %s" % (
+                                            channel, source)})
+            _head = _head.select(id=_head[0].id)
+            self.id = _head[0].id
+            self.starttime = min(_tr.stats.starttime for _tr in _head)
+            self.endtime = max(_tr.stats.endtime for _tr in _head)
+        else:
+            if isinstance(source, Trace):
+                source = Stream(traces=[source])
+            if not isinstance(source, Stream):
+                raise BE.BadInstance("Input must be an obspy.Stream, "
+                                     "obspy.Trace or a file name!")
+            self.trace = _selectTrace(source, channel, traceid)
+            if self.trace is None:
+                raise BE.MissingVariable({'message': "No %s trace found" %
+                                          channel})
+            self.id = self.trace.id
+            self.starttime = self.trace.stats.starttime
+            self.endtime = self.trace.stats.endtime
+
+    def get(self, starttime, endtime):
+        """ Return the chunk trace (None if no data) """
+        if self.trace is not None:
+            tr = self.trace.slice(starttime, endtime)     # view
+        else:
+            tr = _selectTrace(read(self.path, starttime=starttime,
+                                   endtime=endtime), self.channel, self.id)
+        if tr is None or not tr.stats.npts:
+            return None
+        return tr
+
+
+# --------------------------------------------- Public
+
+
+def pickContinuous(stream,
+                   stream_raw=None,
+                   channel="*Z",
+                   chunk_len=3600.0,
+                   overlap=60.0,
+                   min_separation=1.0,
+                   picker="BK",
+                   **kwargs):
+    """
+    Pick a continuous record chunk by chunk.
+
+    INPUT:
+        - stream: obspy.Stream/Trace (PROC) or file name (glob) to be
+                  read lazily
+        - stream_raw: same for the RAW data (paired by trace id
+                      without the processing), or None
+        - channel: channel to pick (i.e. "*Z")
+        - chunk_len: seconds owned by each chunk
+        - overlap: seconds added on both sides of each chunk. Should be
+                   longer than the evaluation tests / AIC windows.
+        - min_separation: picks of adjacent chunks closer than this
+                          (seconds) are the same pick
+        - picker: "BK" or "AIC" (the output pick time)
+        - kwargs: any other `BaIt` keyword argument. `max_iter` is the
+                  maximum number of iterations PER CHUNK.
+
+    OUTPUT:
+        - list of (UTCDateTime, bk_info) sorted in time (the same
+          output of `BaIt.extract_true_pick(compact_format=True)`)
+    """
+    if picker.lower() not in ("bk", "aic"):
+        raise BE.BadKeyValue({'message': "Wrong picker input ('bk', 'aic')"})
+    if picker.lower() == "aic" and not kwargs.get('pickAIC'):
+        raise BE.MissingAttribute({'message': "AIC asked, but unpicked!"})
+    proc = _Source(stream, channel)
+    raw = (_Source(stream_raw, channel, traceid=proc.id)
+           if stream_raw is not None else None)
+    #
+    found = []          # (BK pick, out pick, bk_info, margin, chunk)
+    chunks = _chunkTimes(proc.starttime, proc.endtime, chunk_len, overlap)
+    logger.info("Picking %s in %d chunks" % (proc.id, len(chunks)))
+    for _nn, (_rs, _re, _os, _oe) in enumerate(chunks):
+        tr = proc.get(_rs, _re)
+        if tr is None:
+            continue
+        _raw = raw.get(_rs, _re) if raw is not None else None
+        BP = BaIt(Stream(traces=[tr]),
+                  stream_raw=(Stream(traces=[_raw])
+                              if _raw is not None else None),
+                  channel=tr.stats.channel,
+                  **kwargs)
+        try:
+            BP.CatchEmAll()
+        except BE.MissingVariable:
+            logger.debug("No valid pick in chunk %d" % _nn)
+            continue
+        for rec in BP.picks.valid():
+            _pk = rec.pickUTC
+            if not _os <= _pk < _oe:
+                continue        # owned by the adjacent chunk
+            _out = rec.pickUTC_AIC if picker.lower() == "aic" else _pk
+            found.append((_pk, _out, rec.bk_info,
+                          min(_pk - tr.stats.starttime,
+                              tr.stats.endtime - _pk), _nn))
+        # the chunk objects are released here --> bounded memory
+        del BP, tr, _raw
+    #
+    # Reconcile the picks across the chunk boundaries
+    found.sort(key=lambda x: x[0])
+    out = []
+    for _ff in found:
+        if out and _ff[4] != out[-1][4] and \
+           _ff[0] - out[-1][0] < min_separation:
+            if _ff[3] > out[-1][3]:
+                out[-1] = _ff
+            continue
+        out.append(_ff)
+    return [(_ff[1], _ff[2]) for _ff in out]
@@ -1,19 +1,36 @@
 """
 DEVELOPER HINT:
- - Every main method should receive a trace.copy() instance
+ - Every main method receives a read-only `bait_window.TraceWindow`
+   (a view, no copy) of the working trace when called by BaIt, or
+   a trace.copy() instance. Never modify the input data in-place!
+ - Every main method accepts the `cf` keyword: the (read-only)
+   carachteristic function trace already computed (and cached) by BaIt.
+   If None, the CF is created from the input trace.
  - If you want to use SLICE instead of TRIM, make sure that your
    pointer reference changes as well! (i.e. reassign a new name to the slice)
         ES: >>> Signal = wt.slice( ...)
                     NOT
             >>>  wt.slice(...)
 
+ - New tests (also outside this module) are made available to BaIt
+   with `registerTest` (see the Registry section at the bottom).
+   The `test_pickvalidation` names are checked and bound once, when
+   the BaIt object is created: unknown names fail before any picking.
+
 
 """
 
 import sys
+import inspect
+import functools
 import numpy as np
 import logging
+from collections import namedtuple
 from bait import bait_errors as BE
+from bait import bait_kernels as KRN
+from bait.bait_window import sliceBounds, windowBounds, _roundAway, _bounds
+from obspy.core.trace import Trace
+from obspy.core.utcdatetime import UTCDateTime
 
 
 logger = logging.getLogger(__name__)
@@ -22,39 +39,83 @@ logger = logging.getLogger(__name__)
 # --------------------------------------------- Private
 
 
-def _normalizeTrace(workList, rangeVal=[-1, 1]):
+def _normalizeTrace(workList, rangeVal=[-1, 1], dtype=None):
     """
     This simple method will normalize the trace between rangeVal.
     Simply by scaling everything...
 
+    The scaling is done IN-PLACE on the input `numpy.ndarray` (and the
+    same array is returned). A converted copy is created (and returned)
+    only if the input is not a writeable floating array of `dtype`.
+     - dtype: output dtype (i.e. `numpy.float32`). If None, the input
+              dtype is kept (float64 is used for non-floating input)
+
+    *** NB: a flat trace (max == min) is returned as a constant
+            array equal to rangeVal[0]
     """
-    minVal, maxVal = min(workList), max(workList)
-    workList[:] = [((x - minVal) / (maxVal - minVal)) *
-                   (rangeVal[1] - rangeVal[0]) for x in workList]
-    workList = workList + rangeVal[0]
-    return workList
+    if dtype is None:
+        if np.issubdtype(workList.dtype, np.floating):
+            dtype = workList.dtype
+        else:
+            dtype = np.float64
+    if workList.dtype != dtype or not workList.flags.writeable:
+        workList = workList.astype(dtype)
+    if workList.size == 0:
+        return workList
+    return KRN.normalize(workList, rangeVal[0], rangeVal[1])
 
 
-def _createCF(inarray):
+def _createCF(inarray, dtype=None):
     """
     Simple method to create the carachteristic function of BaIt
     picking algorithm
+     - dtype: output dtype (i.e. `numpy.float32`). If None, the
+              `_normalizeTrace` default is used.
 
     *** NB: The outarray of 13.02.2019 (the squared one), better enanche
             impulsive features of the signal, but it's really weak on
             emergent arrivals, especially with The SignalAmp feature.
     """
-    outarray = np.abs(inarray)         # ORIGINAL
+    if dtype is not None and inarray.dtype != dtype:
+        # convert once, then everything is done in-place
+        outarray = inarray.astype(dtype)
+        np.abs(outarray, out=outarray)
+    else:
+        outarray = np.abs(inarray)         # ORIGINAL
     # outarray = abs(inarray**2)      # MB 13.02.2019 - test -
     # outarray = np.sqrt(abs(inarray))      # MB 13.02.2019 - test -
-    outarray = _normalizeTrace(outarray, rangeVal=[0, 1])
+    outarray = _normalizeTrace(outarray, rangeVal=[0, 1], dtype=dtype)
     return outarray
 
 
+def _getCF(wt, cf=None):
+    """
+    Return the CF trace to be used by the evaluation tests.
+    If `cf` (the CF already computed by BaIt) is given, it is returned
+    as it is. Otherwise the CF is created (new array) from the input trace.
+    """
+    if cf is None:
+        wt.data = _createCF(wt.data)
+        return wt
+    return cf
+
+
+def _windowStats(data, bounds, mode):
+    """
+    Return the array of the mean (or max) of each `data[start:end]`
+    window in `bounds` (see `bait_kernels.windowStats`).
+    Empty windows return NaN (the edge of the trace).
+    """
+    return KRN.windowStats(data,
+                           [_bb[0] for _bb in bounds],
+                           [_bb[1] for _bb in bounds],
+                           mode)
+
+
 # --------------------------------------------- Evaluation
 
 
-def SignalAmp(wt, bpd, timewin, thr_par_1):
+def SignalAmp(wt, bpd, timewin, thr_par_1, cf=None):
     """
     This test evaluate the maximum amplitude of the first window
     after the pick and compare it to a threshold given by user.
@@ -63,13 +124,14 @@ def SignalAmp(wt, bpd, timewin, thr_par_1):
         INPUT:
             - workTrace (obspy.Trace obj)
             - bpd = baitpickdict with the actual pick info to analyze
+            - cf = (optional) precomputed CF trace of workTrace
 
         OUTPUT
             - bool (True/False)
 
     """
     tfn = sys._getframe().f_code.co_name
-    wt.data = _createCF(wt.data)
+    wt = _getCF(wt, cf)
     Signal = wt.slice(bpd['pickUTC'], bpd['pickUTC'] + timewin)
 
     # ------ Out + Log
@@ -83,7 +145,8 @@ def SignalAmp(wt, bpd, timewin, thr_par_1):
         return (True, Signal.data.max())
 
 
-def Signal2NoiseRatio_MAX(wt, bpd, timewinSIG, timewinNOI, thr_par_1):
+def Signal2NoiseRatio_MAX(wt, bpd, timewinSIG, timewinNOI, thr_par_1,
+                          cf=None):
     """
     This test evaluate the signal2noise ratio among custom signal and
     noise tim-window length (seconds). It evaluates the MAX values ratios
@@ -92,13 +155,14 @@ def Signal2NoiseRatio_MAX(wt, bpd, timewinSIG, timewinNOI, thr_par_1):
         INPUT:
             - workTrace (obspy.Trace obj)
             - bpd = baitpickdict with the actual pick info to analyze
+            - cf = (optional) precomputed CF trace of workTrace
 
         OUTPUT
             - bool (True/False)
 
     """
     tfn = sys._getframe().f_code.co_name
-    wt.data = _createCF(wt.data)
+    wt = _getCF(wt, cf)
     Signal = wt.slice(bpd['pickUTC'], bpd['pickUTC'] + timewinSIG)
     Noise = wt.slice(bpd['pickUTC'] - timewinNOI, bpd['pickUTC'])
 
@@ -114,7 +178,8 @@ def Signal2NoiseRatio_MAX(wt, bpd, timewinSIG, timewinNOI, thr_par_1):
         return (True, Signal.data.max(), Noise.data.max(), s2nr)
 
 
-def Signal2NoiseRatio_STD(wt, bpd, timewinSIG, timewinNOI, thr_par_1):
+def Signal2NoiseRatio_STD(wt, bpd, timewinSIG, timewinNOI, thr_par_1,
+                          cf=None):
     """
     This test evaluate the signal2noise ratio among custom signal and
     noise time-window length (seconds). It evaluates the STD values ratios
@@ -123,13 +188,14 @@ def Signal2NoiseRatio_STD(wt, bpd, timewinSIG, timewinNOI, thr_par_1):
         INPUT:
             - workTrace (obspy.Trace obj)
             - bpd = baitpickdict with the actual pick info to analyze
+            - cf = (optional) precomputed CF trace of workTrace
 
         OUTPUT
             - bool (True/False)
 
     """
     tfn = sys._getframe().f_code.co_name
-    wt.data = _createCF(wt.data)
+    wt = _getCF(wt, cf)
     Signal = wt.slice(bpd['pickUTC'], bpd['pickUTC'] + timewinSIG)
     Noise = wt.slice(bpd['pickUTC'] - timewinNOI, bpd['pickUTC'])
 
@@ -149,7 +215,7 @@ def Signal2NoiseRatio_STD(wt, bpd, timewinSIG, timewinNOI, thr_par_1):
 
 
 def SignalSustain(wt, bpd, timewin, timenum, snratio, mode="mean",
-                  failwindow_tolerance=0):
+                  failwindow_tolerance=0, cf=None):
     """
     This test evaluate the mean value of signal windows in comparison
     with the noise window before the pick. The ratio should be
@@ -167,6 +233,7 @@ def SignalSustain(wt, bpd, timewin, timenum, snratio, mode="mean",
                                     BELOW threshold ratio.
                                     NB: the FIRST on must be ALWAYS up
                                     (because is what BK see in triggering)
+            - cf: (optional) precomputed CF trace of workTrace
 
         OUTPUT
             - tuple: Result (bool), Values (snr each windows)
@@ -175,40 +242,27 @@ def SignalSustain(wt, bpd, timewin, timenum, snratio, mode="mean",
     if failwindow_tolerance > timenum:
         failwindow_tolerance = timenum
 
+    if mode.lower() not in ("mean", "max"):
+        raise BE.InvalidParameter("MODE parameter must be either MAX or MEAN!")
+
     tfn = sys._getframe().f_code.co_name
-    PrePick_GMT = bpd['pickUTC']-timewin
-    wt.data = _createCF(wt.data)
+    pickUTC = bpd['pickUTC']
+    PrePick_GMT = pickUTC-timewin
+    wt = _getCF(wt, cf)
     #
-    Noise = wt.slice(PrePick_GMT, bpd['pickUTC'])
+    # v2.6.0: only the sample bounds of the windows are computed (same
+    #         selection of `wt.slice`), the statistics are vectorized.
+    _ns, _ne = sliceBounds(wt, PrePick_GMT, pickUTC)
+    noise_mean = wt.data[_ns:_ne].mean() if _ne > _ns else np.nan
+    bounds = windowBounds(wt, [pickUTC + (num*timewin)
+                               for num in range(timenum + 1)])
     #
-    WINDOWING = []                # list of numpy array
-    for num in range(timenum):
-        # index must start from 0
-        Signal = wt.slice(bpd['pickUTC'] + (num*timewin),
-                          bpd['pickUTC'] + ((num+1)*timewin))
-        WINDOWING.append(Signal.data)
-
-    # Next steps cannot be included in list-comprehension because of
-    # Exception handling
-    RATIOS = []
-    if mode.lower() == "mean":
-        for _xx in WINDOWING:
-            try:
-                RATIOS.append(float(_xx.mean() / Noise.data.mean()))
-            except ValueError:
-                RATIOS.append(np.nan)
-
-    elif mode.lower() == "max":
-        # Because numpy.arrayy max e min raise exception if array empty!
-        for _xx in WINDOWING:
-            try:
-                RATIOS.append(float(_xx.max() / Noise.data.mean()))
-            except ValueError:
-                RATIOS.append(np.nan)
-    else:
-        raise BE.InvalidParameter("MODE parameter must be either MAX or MEAN!")
+    # Empty windows (end of trace) --> NaN ratio
+    with np.errstate(divide='ignore', invalid='ignore'):
+        RATIOS = [float(_xx) for _xx in
+                  _windowStats(wt.data, bounds, mode.lower()) / noise_mean]
 
-    _boolarr = np.array([True if _xx <= snratio else False for _xx in RATIOS])
+    _boolarr = np.asarray(RATIOS) <= snratio
     if np.sum(_boolarr) <= failwindow_tolerance:
         # True if below the threshold -> 1st WINDOW must be ALWAYS pass
         if _boolarr[0]:
@@ -233,12 +287,15 @@ def SignalSustain(wt, bpd, timewin, timenum, snratio, mode="mean",
         # return ( False, (RATIOS, np.sum(_boolarr)))
 
 
-def LowFreqTrend(wt, bpd, timewin, conf=0.95):
+def LowFreqTrend(wt, bpd, timewin, conf=0.95, cf=None):
     """
     This method should help avoiding mispicks due
     to the so-called filter effect by recognizing trends (pos or negative)
     return False if trend found --> bad pick
 
+    *** NB: the `cf` keyword is accepted for interface compatibility only,
+            this test works on the input trace.
+
     """
     tfn = sys._getframe().f_code.co_name
     # ------ WORK
@@ -246,25 +303,412 @@ def LowFreqTrend(wt, bpd, timewin, conf=0.95):
     wt.slice(bpd['pickUTC'], bpd['pickUTC'] + timewin)
 
     # asign=np.sign(wt.data)
-    asign = np.sign(np.diff(wt.data))
-    unique, counts = np.unique(asign, return_counts=True)
-    dsign = dict(zip(unique, counts))
-    #
-    for key in (-1.0, 1.0):
-        if key in dsign and dsign[key]:
-            pass
-        else:
-            dsign[key] = 0
+    _pos, _neg, _nn = KRN.signCounts(wt.data)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pos, neg = np.float64(_pos) / _nn, np.float64(_neg) / _nn
 
     # ------ Out + Log
-    if dsign[1.0]/len(asign) >= conf or dsign[-1.0]/len(asign) >= conf:
+    if pos >= conf or neg >= conf:
         logger.debug((' '*4+'FALSE  %s: Pos. %5.2f  -  Neg. %5.2f  [%5.2f]') %
-                     (tfn, dsign[1.0]/len(asign), dsign[-1.0]/len(asign), conf))
-        return (False, (dsign[1.0]/len(asign), dsign[-1.0]/len(asign), conf))
+                     (tfn, pos, neg, conf))
+        return (False, (pos, neg, conf))
     else:
         logger.debug((' '*4+'TRUE   %s: Pos. %5.2f  -  Neg. %5.2f  [%5.2f]') %
-                     (tfn, dsign[1.0]/len(asign), dsign[-1.0]/len(asign), conf))
-        return (True, (dsign[1.0]/len(asign), dsign[-1.0]/len(asign), conf))
+                     (tfn, pos, neg, conf))
+        return (True, (pos, neg, conf))
+
+
+# --------------------------------------------- Evaluation (batched)
+# Array interface of the tests above (see the Registry section):
+# one row per pick, same windows and verdicts of the per-pick version.
+
+
+def _pickBounds(npts, df, samples, tstart, tend):
+    """
+    Return the (starts, ends) arrays of the `sliceBounds` of the windows
+    [pick + tstart, pick + tend] of each pick sample (row).
+    """
+    _delta = 1.0 / df
+    out = np.array([_bounds(0.0, npts, df, _delta,
+                            _ss / df + tstart, _ss / df + tend)
+                    for _ss in samples], dtype=np.int64).reshape(-1, 2)
+    return out[:, 0], out[:, 1]
+
+
+class _Timing(object):
+    """ Minimal trace timing (starttime 0.0) for `windowBounds` """
+    __slots__ = ('data', 'stats', 'starttime', 'sampling_rate', 'delta')
+
+    def __init__(self, npts, df):
+        self.data = range(npts)         # only its length is used
+        self.stats = self
+        self.starttime = 0.0
+        self.sampling_rate = df
+        self.delta = 1.0 / df
+
+
+def _rowStats(arr, starts, ends, mode):
+    """ `bait_kernels.windowStats` of one window per row of `arr` """
+    arr = np.ascontiguousarray(arr)
+    _offset = np.arange(arr.shape[0], dtype=np.int64) * arr.shape[1]
+    return KRN.windowStats(arr.ravel(), starts + _offset, ends + _offset,
+                           mode)
+
+
+def _signalAmpBatch(data, cf, samples, df, timewin, thr_par_1):
+    """ Batched `SignalAmp` (NaN maximum if the window is empty) """
+    _ss, _ee = _pickBounds(cf.shape[1], df, samples, 0.0, timewin)
+    maxs = _rowStats(cf, _ss, _ee, "max")
+    return (maxs >= thr_par_1, list(maxs))
+
+
+def _signalSustainBatch(data, cf, samples, df, timewin, timenum, snratio,
+                        mode="mean", failwindow_tolerance=0):
+    """ Batched `SignalSustain` """
+    if failwindow_tolerance > timenum:
+        failwindow_tolerance = timenum
+    if mode.lower() not in ("mean", "max"):
+        raise BE.InvalidParameter("MODE parameter must be either MAX or MEAN!")
+    cf = np.ascontiguousarray(cf)
+    _npicks, _npts = cf.shape
+    _ss, _ee = _pickBounds(_npts, df, samples, -timewin, 0.0)
+    noise_mean = _rowStats(cf, _ss, _ee, "mean")
+    # all the windows of all the picks in a single kernel call
+    _bb = np.array([windowBounds(_Timing(_npts, df),
+                                 [_smp / df + (num * timewin)
+                                  for num in range(timenum + 1)])
+                    for _smp in samples], dtype=np.int64)
+    _offset = (np.arange(_npicks, dtype=np.int64) * _npts)[:, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        RATIOS = KRN.windowStats(cf.ravel(),
+                                 (_bb[:, :, 0] + _offset).ravel(),
+                                 (_bb[:, :, 1] + _offset).ravel(),
+                                 mode.lower()).reshape(_npicks, timenum)
+        RATIOS = RATIOS / noise_mean[:, np.newaxis]
+    _below = RATIOS <= snratio
+    verdicts = ((np.sum(_below, axis=1) <= failwindow_tolerance) &
+                ~_below[:, 0])
+    return (verdicts, [[float(_xx) for _xx in _rr] for _rr in RATIOS])
+
+
+def _lowFreqTrendBatch(data, cf, samples, df, timewin, conf=0.95):
+    """ Batched `LowFreqTrend` (as the per-pick one: the whole row) """
+    verdicts, outputs = [], []
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _row in data:
+            _pos, _neg, _nn = KRN.signCounts(_row)
+            pos, neg = np.float64(_pos) / _nn, np.float64(_neg) / _nn
+            verdicts.append(not (pos >= conf or neg >= conf))
+            outputs.append((pos, neg, conf))
+    return (np.array(verdicts, dtype=bool), outputs)
+
+
+# --------------------------------------------- Registry
+#
+# name --> _TestEntry(func, batch, window)
+#   - func: per-pick interface (the built-in tests above)
+#         func(wt, bpd, *params, cf=None) --> (verdict, output)
+#         The `cf` keyword is optional: tests without it (nor **kwargs)
+#         are called as func(wt, bpd, *params)
+#   - batch: array interface, many picks at once
+#         batch(data, cf, samples, df, *params) --> (verdicts, outputs)
+#           data, cf: 2-D (n_picks, n_samples) arrays of the working
+#                     trace and of its CF (one row per pick)
+#           samples: array of the pick sample index of each row
+#           df: sampling rate
+#           verdicts: bool array (n_picks,), outputs: list (n_picks)
+#   - window: data span needed around the pick (streaming BaIt)
+#         window(*params) --> (pre, post) seconds before / after the
+#         pick. None stands for "the whole trace" (before or after).
+# A test can have both interfaces (two `registerTest` calls).
+
+_TestEntry = namedtuple("_TestEntry", ("func", "batch", "window"))
+_REGISTRY = {}
+
+
+def _checkArity(name, func, params, nargs):
+    """ Fail early if `params` don't fit the test signature """
+    try:
+        sig = inspect.signature(func)
+    except (TypeError, ValueError):
+        return      # no signature available (i.e. builtins)
+    try:
+        sig.bind(*((None,) * nargs + tuple(params)))
+    except TypeError as err:
+        raise BE.InvalidParameter("Wrong parameters for test %r: %s" % (
+                                  name, err))
+
+
+def _acceptsCF(func):
+    """ True if the per-pick test accepts the `cf` keyword """
+    try:
+        sig = inspect.signature(func)
+    except (TypeError, ValueError):
+        return True     # no signature available: built-in interface
+    for _pp in sig.parameters.values():
+        if _pp.kind == _pp.VAR_KEYWORD or (
+           _pp.name == "cf" and _pp.kind != _pp.POSITIONAL_ONLY):
+            return True
+    return False
+
+
+def _callPick(func, params, usecf, wt, bpd, cf):
+    if usecf:
+        return func(wt, bpd, *params, cf=cf)
+    return func(wt, bpd, *params)
+
+
+def _callBatch(batch, params, wt, bpd, cf):
+    """ Single pick evaluation with the array interface """
+    _smp = int(_roundAway((bpd['pickUTC'] - wt.stats.starttime) *
+                          wt.stats.sampling_rate))
+    (verdicts, outputs) = batch(wt.data[np.newaxis], cf.data[np.newaxis],
+                                np.array([_smp]), wt.stats.sampling_rate,
+                                *params)
+    return (bool(verdicts[0]), outputs[0])
+
+
+def _callArray(batch, params, data, cf, samples, df):
+    return batch(data, cf, samples, df, *params)
+
+
+def _callPickBatch(func, params, usecf, data, cf, samples, df):
+    """ Many picks evaluation with the per-pick interface """
+    _t0 = UTCDateTime(0)
+    verdicts, outputs = [], []
+    for _row, _cfrow, _smp in zip(data, cf, samples):
+        _wt = Trace(data=_row, header={'sampling_rate': df,
+                                       'starttime': _t0})
+        _cf = Trace(data=_cfrow, header={'sampling_rate': df,
+                                         'starttime': _t0})
+        (_vv, _oo) = _callPick(func, params, usecf, _wt,
+                               {'pickUTC': _t0 + _smp / df}, _cf)
+        verdicts.append(bool(_vv))
+        outputs.append(_oo)
+    return (np.array(verdicts, dtype=bool), outputs)
+
+
+def registerTest(name, func=None, batched=False, window=None):
+    """
+    Register an evaluation test: it can then be used by its `name` in
+    the `test_pickvalidation` dict of BaIt. `func` has the per-pick
+    interface, or the array one if batched=True (see above).
+    The optional `window(*params)` returns the (pre, post) seconds of
+    data the test needs around the pick: it is required by the
+    streaming BaIt (`bait_realtime`) only.
+    Registering an existing name replaces that interface (and the
+    window, if given). Usable as a decorator as well:
+
+        >>> @registerTest("MyTest", window=lambda timewin, thr: (0, timewin))
+        ... def MyTest(wt, bpd, timewin, thr, cf=None):
+        ...     ...
+        ...     return (verdict, output)
+    """
+    if func is None:
+        def _decorator(ff):
+            registerTest(name, ff, batched=batched, window=window)
+            return ff
+        return _decorator
+    #
+    if not isinstance(name, str) or not name:
+        raise BE.BadInstance("Test name must be a non-empty string!")
+    if not callable(func):
+        raise BE.BadInstance("Test %r is not callable!" % name)
+    if window is not None and not callable(window):
+        raise BE.BadInstance("Window of test %r is not callable!" % name)
+    _old = _REGISTRY.get(name, _TestEntry(None, None, None))
+    _REGISTRY[name] = (_old._replace(batch=func) if batched else
+                       _old._replace(func=func))
+    if window is not None:
+        _REGISTRY[name] = _REGISTRY[name]._replace(window=window)
+    return func
+
+
+def unregisterTest(name):
+    """ Remove a test (both interfaces) from the registry """
+    getTest(name)
+    del _REGISTRY[name]
+
+
+def registeredTests():
+    """ Return the sorted list of the available test names """
+    return sorted(_REGISTRY, key=str.lower)
+
+
+def getTest(name):
+    """ Return the registry entry (func, batch) of a test """
+    try:
+        return _REGISTRY[name]
+    except (KeyError, TypeError):
+        raise BE.MissingAttribute({'message': "Unknown evaluation test %r "
+                                   "(available: %s)" % (
+                                    name, ", ".join(registeredTests()))})
+
+
+def testWindow(name, params):
+    """
+    Return the (pre, post) seconds of data needed around the pick by
+    the test `name` with `params` (None: the whole trace).
+    Raise BE.MissingAttribute if the test has no declared window,
+    BE.InvalidParameter if the window does not fit the parameters.
+    """
+    _entry = getTest(name)
+    if _entry.window is None:
+        raise BE.MissingAttribute({'message': "Test %r has no declared data "
+                                   "window: register it with "
+                                   "registerTest(..., window=)" % name})
+    try:
+        (pre, post) = _entry.window(*params)
+    except (TypeError, ValueError) as err:
+        raise BE.InvalidParameter("Wrong window parameters for test %r: "
+                                  "%s" % (name, err))
+    return (pre, post)
+
+
+def resolveTests(test_dict):
+    """
+    Validate and bind the tests of a `test_pickvalidation` dict.
+
+    OUTPUT:
+        - list of (name, call, params) in the evaluation order
+          (alphabetical, case-insensitive). `call(wt, bpd, cf)` returns
+          (verdict, output) with either interface.
+
+    Raise BE.MissingAttribute for unknown tests, BE.InvalidParameter
+    for parameters not matching the test signature.
+    """
+    if not test_dict:
+        return []
+    if not isinstance(test_dict, dict):
+        raise BE.BadInstance("Evaluation tests must be a dict!")
+    out = []
+    for _name in sorted(test_dict, key=str.lower):
+        _entry = getTest(_name)
+        _params = test_dict[_name]
+        if not isinstance(_params, (list, tuple)):
+            raise BE.BadInstance("Parameters of test %r must be a list!" %
+                                 _name)
+        _params = tuple(_params)
+        if _entry.func is not None:
+            _checkArity(_name, _entry.func, _params, 2)
+            _call = functools.partial(_callPick, _entry.func, _params,
+                                      _acceptsCF(_entry.func))
+        else:
+            _checkArity(_name, _entry.batch, _params, 4)
+            _call = functools.partial(_callBatch, _entry.batch, _params)
+        out.append((_name, _call, _params))
+    return out
+
+
+def resolveBatchTests(test_dict):
+    """
+    Same as `resolveTests`, for the array interface:
+    `call(data, cf, samples, df)` returns (verdicts, outputs) of many
+    picks (one per row). Tests without a batched version are run pick
+    by pick.
+    """
+    if not test_dict:
+        return []
+    if not isinstance(test_dict, dict):
+        raise BE.BadInstance("Evaluation tests must be a dict!")
+    out = []
+    for _name in sorted(test_dict, key=str.lower):
+        _entry = getTest(_name)
+        _params = test_dict[_name]
+        if not isinstance(_params, (list, tuple)):
+            raise BE.BadInstance("Parameters of test %r must be a list!" %
+                                 _name)
+        _params = tuple(_params)
+        if _entry.batch is not None:
+            _checkArity(_name, _entry.batch, _params, 4)
+            _call = functools.partial(_callArray, _entry.batch, _params)
+        else:
+            _checkArity(_name, _entry.func, _params, 2)
+            _call = functools.partial(_callPickBatch, _entry.func, _params,
+                                      _acceptsCF(_entry.func))
+        out.append((_name, _call, _params))
+    return out
+
+
+class TestStats(object):
+    """
+    Running cost (seconds per call) and rejection rate of each test,
+    used by the short-circuit evaluation (BaIt test_evaluation=
+    "shortcircuit") to order the tests. A pick is rejected by the
+    first False, so the expected cost of the chain is minimal when
+    the tests are sorted by   mean_cost / P(rejection)   (ascending):
+    cheap tests that reject often go first.
+    Tests never measured go first (to be measured), ties keep the
+    alphabetical order. P(rejection) = (rejections + 1) / (calls + 2).
+
+    *** NB: there is no process-wide instance: the same TestStats must
+            be given explicitly (`test_stats`) to the BaIt objects that
+            should learn from each other.
+    """
+    def __init__(self):
+        self.stats = {}         # name: [calls, rejections, total_seconds]
+
+    def update(self, name, elapsed, verdict):
+        try:
+            _st = self.stats[name]
+        except KeyError:
+            _st = self.stats[name] = [0, 0, 0.0]
+        _st[0] += 1
+        _st[1] += not verdict
+        _st[2] += elapsed
+
+    def rank(self, name):
+        """ Expected cost per rejection (0.0 if never measured) """
+        _st = self.stats.get(name)
+        if not _st or not _st[0]:
+            return 0.0
+        return (_st[2] / _st[0]) / ((_st[1] + 1.0) / (_st[0] + 2.0))
+
+    def order(self, tests):
+        """ Sort the `resolveTests` output for the short-circuit """
+        return sorted(tests, key=lambda x: self.rank(x[0]))
+
+    def reset(self):
+        self.stats = {}
+
+    def summary(self):
+        """
+        Return a dict {name: {'calls', 'rejections', 'reject_rate',
+                              'mean_s'}}
+        """
+        return {_kk: {'calls': _vv[0],
+                      'rejections': _vv[1],
+                      'reject_rate': _vv[1] / _vv[0] if _vv[0] else 0.0,
+                      'mean_s': _vv[2] / _vv[0] if _vv[0] else 0.0}
+                for _kk, _vv in self.stats.items()}
+
+
+def _signalAmpWindow(timewin, thr_par_1):
+    return (0.0, timewin)
+
+
+def _signal2NoiseWindow(timewinSIG, timewinNOI, thr_par_1):
+    return (timewinNOI, timewinSIG)
+
+
+def _signalSustainWindow(timewin, timenum, snratio, *args):
+    return (timewin, timewin * timenum)
+
+
+def _lowFreqTrendWindow(timewin, conf=0.95):
+    return (None, None)         # the whole trace (see LowFreqTrend)
+
+
+for (_ff, _ww) in ((SignalAmp, _signalAmpWindow),
+                   (Signal2NoiseRatio_MAX, _signal2NoiseWindow),
+                   (Signal2NoiseRatio_STD, _signal2NoiseWindow),
+                   (SignalSustain, _signalSustainWindow),
+                   (LowFreqTrend, _lowFreqTrendWindow)):
+    registerTest(_ff.__name__, _ff, window=_ww)
+registerTest("SignalAmp", _signalAmpBatch, batched=True)
+registerTest("SignalSustain", _signalSustainBatch, batched=True)
+registerTest("LowFreqTrend", _lowFreqTrendBatch, batched=True)
+del _ff, _ww
 
 
 # --------------------------------------------- Phase recognition
@@ -0,0 +1,82 @@
+"""
+This module contains the (optional) instrumentation of BaIt.
+
+A `StageTimer` collects the wall time and the number of calls of
+each stage of the picking pipeline (i.e. 'picker', 'pk_baer', 'AIC',
+'_setworktrace', each validation test ...). Every single measure can
+be forwarded to a user callback (i.e. a metrics system) with
+signature:
+
+    callback(stage, elapsed_seconds)
+
+When BaIt is created without instrumentation, no timer exists and
+the only cost is a `None` check per stage.
+"""
+
+import logging
+from time import perf_counter
+from bait import bait_errors as BE
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer(object):
+    """ Collect wall time and call counts per pipeline stage """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.clock = perf_counter
+        self.stages = {}                # stage: [calls, total_seconds]
+
+    def record(self, stage, elapsed):
+        """ Store a single measure (and forward it to the callback) """
+        try:
+            _stage = self.stages[stage]
+        except KeyError:
+            _stage = self.stages[stage] = [0, 0.0]
+        _stage[0] += 1
+        _stage[1] += elapsed
+        if self.callback is not None:
+            try:
+                self.callback(stage, elapsed)
+            except Exception as err:
+                # metrics must never break the picking
+                logger.warning("Instrumentation callback failed: %s" % err)
+
+    def reset(self):
+        self.stages = {}
+
+    def summary(self):
+        """
+        Return a dict {stage: {'calls': int, 'total_s': float,
+                               'mean_s': float}}
+        """
+        return {_kk: {'calls': _vv[0],
+                      'total_s': _vv[1],
+                      'mean_s': _vv[1] / _vv[0] if _vv[0] else 0.0}
+                for _kk, _vv in self.stages.items()}
+
+    def __repr__(self):
+        _lines = ["%-28s %6s %12s" % ("stage", "calls", "total [s]")]
+        for _kk, _vv in sorted(self.stages.items(), key=lambda x: -x[1][1]):
+            _lines.append("%-28s %6d %12.6f" % (_kk, _vv[0], _vv[1]))
+        return "\n".join(_lines)
+
+
+def createTimer(instrument):
+    """
+    Return the StageTimer for the BaIt `instrument` argument:
+     - None/False: no instrumentation (returns None)
+     - True: new StageTimer
+     - callable: new StageTimer forwarding the measures to it
+     - StageTimer: used as it is (i.e. shared among several BaIt)
+    """
+    if instrument is None or instrument is False:
+        return None
+    if isinstance(instrument, StageTimer):
+        return instrument
+    if instrument is True:
+        return StageTimer()
+    if callable(instrument):
+        return StageTimer(callback=instrument)
+    raise BE.BadInstance("instrument must be None, bool, callable or "
+                         "StageTimer")
@@ -0,0 +1,411 @@
+"""
+This module contains the numeric kernels (the hot loops) of BaIt:
+
+ - aic(td): AIC carachteristic function --> (idx, AIC)   [`bait._AICcf`]
+ - normalize(arr, lo, hi): in-place min/max scaling      [`_normalizeTrace`]
+ - windowStats(data, starts, ends, mode): mean/max of
+   each data[start:end] window (NaN if empty)            [`SignalSustain`]
+ - signCounts(data): positive, negative and total counts
+   of np.sign(np.diff(data))                             [`LowFreqTrend`]
+
+Two backends, with the same results (within round-off):
+ - "numpy": always available
+ - "numba": JIT-compiled loops, used when `numba` is installed. The
+            kernels are compiled with cache=True: the machine code is
+            stored on disk (next to this file, or in NUMBA_CACHE_DIR if
+            the package is read-only), so new worker processes load it
+            instead of compiling again.
+
+The backend is chosen at the first kernel call (numba itself is
+imported only then): environment variable BAIT_KERNELS = "auto"
+(default: numba if installed, numpy otherwise), "numba" or "numpy",
+or `setBackend(name)` at run time. If the numba kernels fail to
+compile, BaIt falls back on numpy with a warning.
+
+USAGE:
+    >>> from bait import bait_kernels as KRN
+    >>> KRN.setBackend("numba")
+    >>> KRN.warmup()        # i.e. in a pool initializer
+"""
+
+import os
+import types
+import logging
+import numpy as np
+#
+from bait import bait_errors as BE
+from numpy.lib.stride_tricks import as_strided
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("auto", "numba", "numpy")
+_STATE = {'backend': None, 'kernels': None, 'numba': None}
+
+
+# --------------------------------------------- NumPy kernels
+
+
+def _aicNumpy(xx):
+    npts = len(xx)
+    xx = xx - xx.mean()
+    xx2 = xx * xx
+
+    # left portion --> td[0:ii]  /  right portion --> td[ii:]
+    kk = np.arange(1, npts, dtype=np.float64)
+    kk_right = npts - kk
+    sum1_left = np.cumsum(xx)[:-1]
+    sum2_left = np.cumsum(xx2)[:-1]
+    sum1_right = np.cumsum(xx[::-1])[::-1][1:]
+    sum2_right = np.cumsum(xx2[::-1])[::-1][1:]
+
+    var_left = (sum2_left / kk) - (sum1_left / kk)**2
+    var_right = (sum2_right / kk_right) - (sum1_right / kk_right)**2
+
+    # Variances below the round-off level of the sums are zero-variances
+    eps = np.finfo(np.float64).eps
+    AIC = np.zeros(npts - 1, dtype=np.float64)
+    _mask = var_left > eps * sum2_left
+    AIC[_mask] = kk[_mask] * np.log(var_left[_mask])
+    _mask = var_right > eps * sum2_right
+    AIC[_mask] += (kk_right[_mask] - 1) * np.log(var_right[_mask])
+    #
+    return int(np.argmin(AIC)), AIC
+
+
+def _normalizeNumpy(arr, lo, rng):
+    minVal, maxVal = arr.min(), arr.max()
+    if maxVal == minVal:
+        arr.fill(lo)
+        return arr
+    np.subtract(arr, minVal, out=arr)
+    np.divide(arr, maxVal - minVal, out=arr)
+    np.multiply(arr, rng, out=arr)
+    np.add(arr, lo, out=arr)
+    return arr
+
+
+def _windowStatsNumpy(data, starts, ends, usemax):
+    # When all the windows have the same length and are evenly spaced
+    # (the common case: consecutive windows sharing the boundary sample)
+    # they are evaluated at once on a strided (n_windows, n_samples)
+    # view of the data (no copy).
+    _lens = ends - starts
+    _step = starts[1] - starts[0] if len(starts) > 1 else 0
+    if (_lens[0] > 0 and np.all(_lens == _lens[0]) and _step >= 0 and
+       np.all(np.diff(starts) == _step)):
+        _view = as_strided(data[starts[0]:],
+                           shape=(len(starts), _lens[0]),
+                           strides=(_step * data.strides[0], data.strides[0]),
+                           writeable=False)
+        return _view.max(axis=1) if usemax else _view.mean(axis=1)
+    # Fallback: window by window (i.e. trace edges)
+    _func = np.max if usemax else np.mean
+    return np.array([_func(data[_ss:_ee]) if _ee > _ss else np.nan
+                     for _ss, _ee in zip(starts, ends)])
+
+
+def _signCountsNumpy(data):
+    asign = np.sign(np.diff(data))
+    return (int(np.count_nonzero(asign > 0)),
+            int(np.count_nonzero(asign < 0)),
+            len(asign))
+
+
+# --------------------------------------------- Loop kernels (JIT)
+# Plain python loops: compiled by numba, never called as they are.
+
+
+def _blockSum(data, start, nn):
+    """ NumPy pairwise_sum leaf (nn <= 128): 8 partial sums """
+    if nn < 8:
+        res = 0.0
+        for ii in range(start, start + nn):
+            res += data[ii]
+        return res
+    r0, r1, r2, r3 = data[start], data[start + 1], \
+        data[start + 2], data[start + 3]
+    r4, r5, r6, r7 = data[start + 4], data[start + 5], \
+        data[start + 6], data[start + 7]
+    for ii in range(start + 8, start + nn - nn % 8, 8):
+        r0 += data[ii]
+        r1 += data[ii + 1]
+        r2 += data[ii + 2]
+        r3 += data[ii + 3]
+        r4 += data[ii + 4]
+        r5 += data[ii + 5]
+        r6 += data[ii + 6]
+        r7 += data[ii + 7]
+    res = ((r0 + r1) + (r2 + r3)) + ((r4 + r5) + (r6 + r7))
+    for ii in range(start + nn - nn % 8, start + nn):
+        res += data[ii]
+    return res
+
+
+def _pairwiseSum(data, start, nn):
+    """
+    Sum of data[start:start+nn] with the same summation tree of NumPy
+    (halves split at a multiple of 8, leaves of <= 128 samples).
+    Iterative: recursive functions can't be cached by numba.
+    """
+    if nn <= 128:
+        return _blockSum(data, start, nn)
+    # explicit stack of the halves: state 0 new, 1 left pending,
+    # 2 right pending (left sum in `vals`)
+    starts = np.empty(64, dtype=np.int64)
+    sizes = np.empty(64, dtype=np.int64)
+    state = np.zeros(64, dtype=np.int64)
+    vals = np.zeros(64)
+    top = 0
+    starts[0], sizes[0] = start, nn
+    res = 0.0
+    while top >= 0:
+        if sizes[top] > 128:
+            n2 = sizes[top] // 2
+            n2 -= n2 % 8
+            state[top] = 1
+            top += 1
+            starts[top], sizes[top], state[top] = starts[top - 1], n2, 0
+            continue
+        val = _blockSum(data, starts[top], sizes[top])
+        top -= 1
+        while top >= 0:
+            if state[top] == 1:
+                n2 = sizes[top] // 2
+                n2 -= n2 % 8
+                vals[top], state[top] = val, 2
+                top += 1
+                starts[top] = starts[top - 1] + n2
+                sizes[top] = sizes[top - 1] - n2
+                state[top] = 0
+                break
+            val = vals[top] + val
+            top -= 1
+        else:
+            res = val
+    return res
+
+
+def _aicLoop(xx):
+    npts = xx.shape[0]
+    mean = _pairwiseSum(xx, 0, npts) / npts
+    # right portion sums (reverse cumulative)
+    sum1_right = np.empty(npts)
+    sum2_right = np.empty(npts)
+    acc1 = 0.0
+    acc2 = 0.0
+    for ii in range(npts - 1, -1, -1):
+        vv = xx[ii] - mean
+        acc1 += vv
+        acc2 += vv * vv
+        sum1_right[ii] = acc1
+        sum2_right[ii] = acc2
+    #
+    eps = 2.220446049250313e-16
+    AIC = np.zeros(npts - 1)
+    acc1 = 0.0
+    acc2 = 0.0
+    idx = 0
+    for ii in range(npts - 1):
+        vv = xx[ii] - mean
+        acc1 += vv
+        acc2 += vv * vv
+        kk = ii + 1.0
+        var = acc2 / kk - (acc1 / kk)**2
+        val = 0.0
+        if var > eps * acc2:
+            val = kk * np.log(var)
+        kk = npts - kk
+        var = sum2_right[ii + 1] / kk - (sum1_right[ii + 1] / kk)**2
+        if var > eps * sum2_right[ii + 1]:
+            val += (kk - 1) * np.log(var)
+        AIC[ii] = val
+        if val < AIC[idx]:
+            idx = ii
+    return idx, AIC
+
+
+def _normalizeLoop(arr, lo, rng):
+    minVal = arr[0]
+    maxVal = arr[0]
+    for ii in range(arr.shape[0]):
+        if arr[ii] < minVal:
+            minVal = arr[ii]
+        elif arr[ii] > maxVal:
+            maxVal = arr[ii]
+    if maxVal == minVal:
+        arr[:] = lo
+        return arr
+    span = maxVal - minVal
+    for ii in range(arr.shape[0]):
+        arr[ii] = ((arr[ii] - minVal) / span) * rng + lo
+    return arr
+
+
+def _windowStatsLoop(data, starts, ends, usemax):
+    out = np.empty(starts.shape[0])
+    for ww in range(starts.shape[0]):
+        if ends[ww] <= starts[ww]:
+            out[ww] = np.nan
+            continue
+        if usemax:
+            acc = data[starts[ww]]
+            for ii in range(starts[ww] + 1, ends[ww]):
+                if data[ii] > acc:
+                    acc = data[ii]
+            out[ww] = acc
+        else:
+            # same summation order of `np.mean` (float64: same result)
+            out[ww] = (_pairwiseSum(data, starts[ww], ends[ww] - starts[ww])
+                       / (ends[ww] - starts[ww]))
+    return out
+
+
+def _signCountsLoop(data):
+    npos = 0
+    nneg = 0
+    for ii in range(data.shape[0] - 1):
+        dd = data[ii + 1] - data[ii]
+        if dd > 0:
+            npos += 1
+        elif dd < 0:
+            nneg += 1
+    return npos, nneg, max(data.shape[0] - 1, 0)
+
+
+_NUMPY = {'aic': _aicNumpy,
+          'normalize': _normalizeNumpy,
+          'windowStats': _windowStatsNumpy,
+          'signCounts': _signCountsNumpy}
+
+
+def _rebind(func, namespace):
+    """ Copy of `func` resolving its global names in `namespace` """
+    return types.FunctionType(func.__code__, namespace, func.__name__,
+                              func.__defaults__, func.__closure__)
+
+
+def _loadNumba():
+    """
+    Compile (or load from the on-disk cache) the numba kernels and
+    check them on small inputs. Raise ImportError if numba is missing.
+    """
+    if _STATE['numba'] is not None:
+        return _STATE['numba']          # compiled once per process
+    import numba
+    _jit = numba.njit(cache=True, nogil=True)
+    # own namespace of the compiled kernels: the helpers they call are
+    # the jitted ones, the module-level functions are left untouched
+    _ns = dict(globals())
+    _ns['_blockSum'] = _jit(_rebind(_blockSum, _ns))
+    _ns['_pairwiseSum'] = _jit(_rebind(_pairwiseSum, _ns))
+    kernels = {'aic': _jit(_rebind(_aicLoop, _ns)),
+               'normalize': _jit(_rebind(_normalizeLoop, _ns)),
+               'windowStats': _jit(_rebind(_windowStatsLoop, _ns)),
+               'signCounts': _jit(_rebind(_signCountsLoop, _ns))}
+    # warm-up: the common specializations (i.e. read-only windows)
+    _ro = np.linspace(0., 1., 8)
+    _ro.flags.writeable = False
+    _bb = np.array([0, 4], dtype=np.int64)
+    for _dt in (np.float64, np.float32):
+        _xx = np.linspace(0., 1., 8).astype(_dt)
+        kernels['normalize'](_xx, _dt(0), _dt(1))
+        kernels['windowStats'](_xx, _bb, _bb + 4, False)
+        kernels['windowStats'](_ro.astype(_dt), _bb, _bb + 4, True)
+        kernels['signCounts'](_xx)
+    kernels['aic'](np.linspace(0., 1., 8))
+    kernels['windowStats'](_ro, _bb, _bb + 4, False)
+    kernels['signCounts'](_ro)
+    _STATE['numba'] = kernels
+    return kernels
+
+
+def _kernels():
+    """ Return the kernels of the active backend (selected once) """
+    if _STATE['kernels'] is None:
+        setBackend(os.environ.get("BAIT_KERNELS", "auto"))
+    return _STATE['kernels']
+
+
+# --------------------------------------------- Public
+
+
+def setBackend(name="auto"):
+    """
+    Select the kernels backend: "auto", "numba" or "numpy".
+    Return the name of the active backend.
+    """
+    name = name.lower()
+    if name not in BACKENDS:
+        raise BE.InvalidParameter("Kernel backend must be one of %s" %
+                                  (BACKENDS,))
+    kernels, active = _NUMPY, "numpy"
+    if name in ("auto", "numba"):
+        try:
+            kernels, active = _loadNumba(), "numba"
+        except ImportError:
+            if name == "numba":
+                raise BE.InvalidParameter("numba backend asked, but numba "
+                                          "is not installed!")
+        except Exception as err:
+            logger.warning("numba kernels not available (%s), using numpy"
+                           % err)
+    _STATE['backend'], _STATE['kernels'] = active, kernels
+    logger.debug("Kernel backend: %s" % active)
+    return active
+
+
+def getBackend():
+    """ Return the name of the active backend """
+    _kernels()
+    return _STATE['backend']
+
+
+def warmup():
+    """ Select the backend and load the kernels now (not at first use) """
+    return getBackend()
+
+
+def aic(td):
+    """
+    AIC carachteristic function of `td` (at least 2 samples), computed
+    in float64. Return (index of the minimum, AIC array)
+    """
+    xx = np.ascontiguousarray(td, dtype=np.float64)
+    idx, AIC = _kernels()['aic'](xx)
+    return int(idx), AIC
+
+
+def normalize(arr, lo, hi):
+    """
+    Scale IN-PLACE the writeable floating array `arr` between lo and hi
+    (a flat array is filled with `lo`). Return `arr`.
+    """
+    _dt = arr.dtype.type
+    if arr.flags.c_contiguous:
+        return _kernels()['normalize'](arr, _dt(lo), _dt(hi - lo))
+    return _normalizeNumpy(arr, _dt(lo), _dt(hi - lo))
+
+
+def windowStats(data, starts, ends, mode="mean"):
+    """
+    Return the float array of the mean (mode="mean") or max ("max") of
+    each data[starts[ii]:ends[ii]] window, NaN for the empty ones.
+    """
+    if data.dtype not in (np.float64, np.float32):
+        data = data.astype(np.float64)
+    # windows are clipped on the data (as slicing would do)
+    _npts = len(data)
+    starts = np.clip(np.asarray(starts, dtype=np.int64), 0, _npts)
+    ends = np.clip(np.asarray(ends, dtype=np.int64), 0, _npts)
+    return _kernels()['windowStats'](data, starts, ends, mode == "max")
+
+
+def signCounts(data):
+    """
+    Return (n_positive, n_negative, n) of the sign of the first
+    differences of `data` (n = len(data) - 1)
+    """
+    if data.dtype not in (np.float64, np.float32):
+        data = data.astype(np.float64)
+    npos, nneg, nn = _kernels()['signCounts'](data)
+    return int(npos), int(nneg), int(nn)
@@ -0,0 +1,291 @@
+"""
+This module contains the compact pick-result store of BaIt.
+
+Each iteration of the picker is stored in a `PickRecord` (`__slots__`
+object) holding integer sample indexes (relative to the PROC working
+trace), the pick times as integer nanoseconds, the BK info, the
+evaluation verdict and the tests outputs (verdicts and metrics).
+Many picks can be exported at once in a structured NumPy array with
+`PickStore.toarray()`.
+
+For compatibility, a `PickStore` behaves like the old `BaIt.baitdict`
+(a read-only mapping of "iteration": record) and every record like the
+old per-iteration dict, i.e. `store["1"]["pickUTC"]` still returns an
+`obspy.UTCDateTime` and `store["1"]["evaluatePick_tests"]` a mapping.
+
+*** NB: the "evaluatePick_tests" mapping returned by a record is a
+        read-only view created on the fly (writing to it raises
+        TypeError): modify the tests results with `PickRecord.settest`
+        (or assign a whole dict to the key). `todict` returns a dict.
+"""
+
+import types
+import logging
+import numpy as np
+from collections.abc import Mapping
+from obspy.core.utcdatetime import UTCDateTime
+from obspy.core.compatibility import round_away
+from bait import bait_errors as BE
+
+logger = logging.getLogger(__name__)
+
+
+# Keys of the old per-iteration baitdict (order kept)
+PICK_KEYS = ('pickUTC',
+             'bk_info',
+             'pickUTC_AIC',
+             'AICcf',
+             'iteration',
+             'evaluatePick',
+             'evaluatePick_tests')
+
+# Scalar metric of each test output stored by `toarray`
+TEST_METRICS = {
+    'SignalAmp': lambda out: out,
+    'Signal2NoiseRatio_MAX': lambda out: out[2],
+    'Signal2NoiseRatio_STD': lambda out: out[2],
+    'SignalSustain': lambda out: np.min(out),
+    'LowFreqTrend': lambda out: max(out[0], out[1]),
+}
+
+NOSAMPLE = -1     # sample index of a missing pick in `toarray`
+
+
+def _testmetric(name, out):
+    """ Return the scalar metric (float) of a test output, NaN if none """
+    if out is None:
+        return np.nan
+    try:
+        if name in TEST_METRICS:
+            return float(TEST_METRICS[name](out))
+        return float(out)
+    except (TypeError, ValueError, IndexError):
+        return np.nan
+
+
+class PickRecord(Mapping):
+    """
+    Result of a single picker iteration.
+
+    ATTRIBUTES:
+        - iteration: int
+        - sample / sample_aic: index of the BK / AIC pick in the PROC
+                               working trace (None if missing)
+        - pick_ns / pick_aic_ns: pick times in integer nanoseconds
+        - bk_info: BK phase info string
+        - evaluatePick: tests verdict (None if not evaluated)
+        - AICcf: AIC characteristic function (None if not stored)
+        - testnames / tests: names and (verdict, output) of the tests
+
+    The old dict keys (`PICK_KEYS`) are accessible with `record[key]`.
+    """
+    __slots__ = ('iteration', 'sample', 'pick_ns', 'bk_info',
+                 'sample_aic', 'pick_aic_ns', 'AICcf', 'evaluatePick',
+                 'testnames', 'tests', '_ref')
+
+    def __init__(self, iteration, ref, testnames=()):
+        self.iteration = iteration
+        self.sample = None
+        self.pick_ns = None
+        self.bk_info = None
+        self.sample_aic = None
+        self.pick_aic_ns = None
+        self.AICcf = None
+        self.evaluatePick = None
+        self.testnames = testnames
+        self.tests = [None] * len(testnames)
+        self._ref = ref                 # (reftime, sampling_rate) shared
+
+    # ------------------------------------- time <--> sample
+    def _utc2sample(self, utc):
+        _reftime, _df = self._ref
+        if _reftime is None:
+            return None
+        return int(round_away((utc - _reftime) * _df))
+
+    @property
+    def pickUTC(self):
+        return UTCDateTime(ns=self.pick_ns) if self.pick_ns is not None \
+               else None
+
+    @pickUTC.setter
+    def pickUTC(self, utc):
+        if utc is None:
+            self.pick_ns, self.sample = None, None
+        else:
+            self.pick_ns, self.sample = utc.ns, self._utc2sample(utc)
+
+    @property
+    def pickUTC_AIC(self):
+        return UTCDateTime(ns=self.pick_aic_ns) \
+               if self.pick_aic_ns is not None else None
+
+    @pickUTC_AIC.setter
+    def pickUTC_AIC(self, utc):
+        if utc is None:
+            self.pick_aic_ns, self.sample_aic = None, None
+        else:
+            self.pick_aic_ns, self.sample_aic = (utc.ns,
+                                                 self._utc2sample(utc))
+
+    # ------------------------------------- tests
+    def settest(self, name, verdict, testout):
+        """ Store the (verdict, output) of the test `name` """
+        try:
+            _idx = self.testnames.index(name)
+        except ValueError:
+            self.testnames = self.testnames + (name,)
+            self.tests.append(None)
+            _idx = len(self.tests) - 1
+        self.tests[_idx] = (verdict, testout)
+
+    @property
+    def evaluatePick_tests(self):
+        """ Read-only view: use `settest` to store the results """
+        return types.MappingProxyType(dict(zip(self.testnames, self.tests)))
+
+    @evaluatePick_tests.setter
+    def evaluatePick_tests(self, tdict):
+        self.testnames = tuple(tdict.keys())
+        self.tests = list(tdict.values())
+
+    # ------------------------------------- old dict interface
+    def __getitem__(self, key):
+        if key not in PICK_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in PICK_KEYS:
+            raise BE.MissingKey({'message': "Unknown pick key: %r" % key})
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(PICK_KEYS)
+
+    def __len__(self):
+        return len(PICK_KEYS)
+
+    def todict(self):
+        """ Return the old-style baitdict entry (a new dict) """
+        out = {_kk: self[_kk] for _kk in PICK_KEYS}
+        out['evaluatePick_tests'] = dict(out['evaluatePick_tests'])
+        return out
+
+    def __repr__(self):
+        return "PickRecord(iteration=%r, pickUTC=%s, bk_info=%r, " \
+               "evaluatePick=%r)" % (self.iteration, self.pickUTC,
+                                     self.bk_info, self.evaluatePick)
+
+
+class PickStore(Mapping):
+    """
+    Container of the `PickRecord` of a BaIt run, keyed by iteration.
+
+    INPUT:
+        - reftime: UTCDateTime of the first sample of the PROC trace
+        - sampling_rate: of the PROC trace
+        - keep_aiccf: if False the AIC CFs are not stored (memory)
+
+    As a mapping it exposes the old `baitdict` interface (str keys).
+    """
+    def __init__(self, reftime=None, sampling_rate=None, keep_aiccf=True):
+        self.keep_aiccf = keep_aiccf
+        self.testnames = ()
+        self._ref = (reftime, sampling_rate)
+        self._records = {}
+
+    def record(self, iteration):
+        """ Return the record of `iteration`, create it if missing """
+        iteration = int(iteration)
+        try:
+            return self._records[iteration]
+        except KeyError:
+            rec = PickRecord(iteration, self._ref, self.testnames)
+            self._records[iteration] = rec
+            return rec
+
+    def valid(self):
+        """ Return the list of valid (evaluatePick) records by iteration """
+        return sorted((_rr for _rr in self._records.values()
+                       if _rr.evaluatePick),
+                      key=lambda x: x.iteration)
+
+    def clear(self):
+        self._records = {}
+
+    # ------------------------------------- old baitdict interface
+    def __getitem__(self, key):
+        try:
+            return self._records[int(key)]
+        except ValueError:
+            raise KeyError(key)
+
+    def __iter__(self):
+        return (str(_kk) for _kk in self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        try:
+            return int(key) in self._records
+        except ValueError:
+            return False
+
+    def todict(self):
+        """ Return the old-style nested baitdict (new dicts) """
+        return {str(_kk): _vv.todict() for _kk, _vv in self._records.items()}
+
+    # ------------------------------------- compact export
+    def toarray(self):
+        """
+        Return all the records in a structured NumPy array (one row per
+        iteration, sorted). Missing samples are `NOSAMPLE`, missing
+        times NaT, `evaluatePick` and tests verdicts are int8
+        (-1 = not evaluated). Each test `name` has a verdict column and
+        a float `name_metric` column (see `TEST_METRICS`).
+        """
+        records = sorted(self._records.values(), key=lambda x: x.iteration)
+        names = []
+        for _rr in records:
+            for _nn in _rr.testnames:
+                if _nn not in names:
+                    names.append(_nn)
+        _infolen = max([len(_rr.bk_info) for _rr in records
+                        if _rr.bk_info] + [1])
+        dtype = [('iteration', 'i4'),
+                 ('sample', 'i8'),
+                 ('pick_time', 'M8[ns]'),
+                 ('bk_info', 'U%d' % _infolen),
+                 ('sample_aic', 'i8'),
+                 ('pick_time_aic', 'M8[ns]'),
+                 ('evaluatePick', 'i1')]
+        for _nn in names:
+            dtype += [(_nn, 'i1'), (_nn + '_metric', 'f8')]
+        #
+        out = np.empty(len(records), dtype=dtype)
+        _nat = np.datetime64('NaT', 'ns')
+        for _ii, _rr in enumerate(records):
+            _row = [_rr.iteration,
+                    NOSAMPLE if _rr.sample is None else _rr.sample,
+                    (_nat if _rr.pick_ns is None else
+                     np.datetime64(_rr.pick_ns, 'ns')),
+                    _rr.bk_info or "",
+                    NOSAMPLE if _rr.sample_aic is None else _rr.sample_aic,
+                    (_nat if _rr.pick_aic_ns is None else
+                     np.datetime64(_rr.pick_aic_ns, 'ns')),
+                    -1 if _rr.evaluatePick is None else int(_rr.evaluatePick)]
+            _tests = dict(zip(_rr.testnames, _rr.tests))
+            for _nn in names:
+                _tt = _tests.get(_nn)
+                if _tt is None:
+                    _row += [-1, np.nan]
+                else:
+                    _row += [int(bool(_tt[0])), _testmetric(_nn, _tt[1])]
+            out[_ii] = tuple(_row)
+        return out
+
+    def __repr__(self):
+        return "PickStore(%d records, %d valid)" % (len(self._records),
+                                                    len(self.valid()))
@@ -3,7 +3,9 @@ from obspy.core.trace import Trace
 import logging
 import numpy as np
 # plot
-import matplotlib.pyplot as plt
+# *** NB: `matplotlib.pyplot` is imported only when a new (interactive)
+#         figure is requested or shown: figures given with `fig=`
+#         (i.e. `bait_qc` Agg figures) never touch pyplot
 from collections import OrderedDict
 from matplotlib.dates import AutoDateLocator, AutoDateFormatter
 
@@ -13,15 +15,104 @@ logger = logging.getLogger(__name__)
 # ---------------------------
 
 
+def _setupAxes(fig):
+    """
+    Return the figure and the two (shared X) axes of the plots.
+    If FIG is None a new pyplot figure is created, otherwise the
+    given figure is cleared and reused.
+    """
+    if fig is None:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(8, 4.5))
+    else:
+        fig.clf()
+    ax1 = fig.add_subplot(211)
+    ax2 = fig.add_subplot(212, sharex=ax1)  # , sharey=ax1)
+    return fig, ax1, ax2
+
+
+def _show():
+    import matplotlib.pyplot as plt
+    plt.show()
+
+
+def _minmaxIndex(data, i0, i1, nbins):
+    """
+    Return the (sorted) sample indexes of the min/max envelope of
+    DATA[i0:i1] over NBINS bins: the minimum and the maximum sample of
+    each bin. All the samples if they are less than 2*NBINS.
+    """
+    npts = i1 - i0
+    if npts <= 2 * nbins:
+        return np.arange(i0, i1)
+    size = -(-npts // nbins)
+    nfull = npts // size
+    blk = data[i0:i0 + nfull * size].reshape(nfull, size)
+    offs = i0 + np.arange(nfull) * size
+    idx = [offs + blk.argmin(axis=1), offs + blk.argmax(axis=1)]
+    if i0 + nfull * size < i1:
+        _tail = data[i0 + nfull * size:i1]
+        idx += [[i0 + nfull * size + _tail.argmin()],
+                [i0 + nfull * size + _tail.argmax()]]
+    return np.unique(np.concatenate(idx))
+
+
+def _plotTrace(ax, tr, decimate=True, **kwargs):
+    """
+    Plot the trace data against matplotlib dates (`tr.times("matplotlib")`).
+
+    If DECIMATE, only the min/max envelope of the samples is drawn:
+    one (min, max) pair per pixel of the axes width. The envelope is
+    computed again on the visible samples at every X-limits change
+    (zoom/pan, `set_xlim`), so that the full resolution comes back when
+    less than 2 samples per pixel are visible. Only the plotted points
+    have their time computed.
+    *** NB: the picks (axvline) are not affected: always exact
+    """
+    data = tr.data
+    if not decimate or isinstance(data, np.ma.MaskedArray):
+        return ax.plot(tr.times("matplotlib"), data, **kwargs)[0]
+    #
+    from matplotlib.dates import date2num
+    npts, df = tr.stats.npts, tr.stats.sampling_rate
+    t0 = date2num(tr.stats.starttime.datetime)
+
+    def _envelope(i0, i1):
+        _idx = _minmaxIndex(data, i0, i1, max(int(ax.bbox.width), 1))
+        return t0 + (_idx / df) / 86400.0, data[_idx]
+
+    line = ax.plot(*_envelope(0, npts), **kwargs)[0]
+
+    def _onXlim(_ax):
+        (_x0, _x1) = sorted(_ax.get_xlim())
+        # one more sample on both sides: the line reaches the borders
+        i0 = min(max(int(np.floor((_x0 - t0) * 86400.0 * df)) - 1, 0), npts)
+        i1 = min(max(int(np.ceil((_x1 - t0) * 86400.0 * df)) + 2, 0), npts)
+        line.set_data(*_envelope(i0, i1))
+
+    # the callback (a closure, strong reference) dies with the axes
+    ax.callbacks.connect('xlim_changed', _onXlim)
+    return line
+
+
+# ---------------------------
+
+
 def plotBait(tr,
              cf,
              baitdict,
              figtitle=None,
              show=False,
              savefig=False,
-             savepath=None):
+             savepath=None,
+             fig=None,
+             decimate=True):
     """
     Improved method to plot all the picks
+     - fig: matplotlib Figure to reuse (cleared). If None, a new pyplot
+            figure is created
+     - decimate: draw the min/max envelope of trace and CF at the
+                 axes resolution, refined on zoom (see `_plotTrace`)
     """
     tfn = sys._getframe().f_code.co_name
     if not isinstance(tr, Trace):
@@ -31,13 +122,9 @@ def plotBait(tr,
         logger.error('%s: not a valid ObsPy trace (CF) ...' % tfn)
         return False
     #
-    fig = plt.figure(figsize=(8, 4.5))
-
-    ax1 = plt.subplot(211)
-    ax1.plot(tr.times("matplotlib"), tr.data, color='black')
-
-    ax2 = plt.subplot(212, sharex=ax1)  # , sharey=ax1)
-    ax2.plot(cf.times("matplotlib"), cf.data, color='blue')
+    fig, ax1, ax2 = _setupAxes(fig)
+    _plotTrace(ax1, tr, decimate=decimate, color='black')
+    _plotTrace(ax2, cf, decimate=decimate, color='blue')
 
     # ---- Plot picks
     for _kk, _vv in baitdict.items():
@@ -90,11 +177,12 @@ def plotBait(tr,
             savepath = "baitfig.pdf"
         fig.savefig(savepath, bbox_inches='tight')
     if show:
-        plt.show()
+        _show()
     return fig, (ax1, ax2)
 
 
-def plotAmplitudeTest(tr, cf, baitdict, idx, timewin, thr_1, show=False):
+def plotAmplitudeTest(tr, cf, baitdict, idx, timewin, thr_1, show=False,
+                      fig=None, decimate=True):
     """ Plotting routine for the Amplitude Test over a defined pick """
     tfn = sys._getframe().f_code.co_name
     if not isinstance(tr, Trace):
@@ -104,13 +192,9 @@ def plotAmplitudeTest(tr, cf, baitdict, idx, timewin, thr_1, show=False):
         logger.error('%s: not a valid ObsPy trace (CF) ...' % tfn)
         return False
     #
-    fig = plt.figure(figsize=(8, 4.5))
-
-    ax1 = plt.subplot(211)
-    ax1.plot(tr.times("matplotlib"), tr.data, color='black')
-
-    ax2 = plt.subplot(212, sharex=ax1)  # , sharey=ax1)
-    ax2.plot(cf.times("matplotlib"), cf.data, color='blue')
+    fig, ax1, ax2 = _setupAxes(fig)
+    _plotTrace(ax1, tr, decimate=decimate, color='black')
+    _plotTrace(ax2, cf, decimate=decimate, color='blue')
 
     _vv = baitdict[str(idx)]
     testpass = _vv['evaluatePick_tests']['SignalAmp'][0]
@@ -157,12 +241,13 @@ def plotAmplitudeTest(tr, cf, baitdict, idx, timewin, thr_1, show=False):
     AutoDateFormatter(AutoDateLocator())
 
     if show:
-        plt.show()
+        _show()
     return fig, (ax1, ax2)
 
 
 def plotSustainTest(tr, cf, baitdict, idx, timewin, timenum, snratio, mode="mean",
-                    failwindow_tolerance=0, show=False):
+                    failwindow_tolerance=0, show=False, fig=None,
+                    decimate=True):
     """ Plotting routine for the Sustain Test over a defined pick """
     tfn = sys._getframe().f_code.co_name
     if not isinstance(tr, Trace):
@@ -172,13 +257,9 @@ def plotSustainTest(tr, cf, baitdict, idx, timewin, timenum, snratio, mode="mean
         logger.error('%s: not a valid ObsPy trace (CF) ...' % tfn)
         return False
     #
-    fig = plt.figure(figsize=(8, 4.5))
-
-    ax1 = plt.subplot(211)
-    ax1.plot(tr.times("matplotlib"), tr.data, color='black')
-
-    ax2 = plt.subplot(212, sharex=ax1)  # , sharey=ax1)
-    ax2.plot(cf.times("matplotlib"), cf.data, color='blue')
+    fig, ax1, ax2 = _setupAxes(fig)
+    _plotTrace(ax1, tr, decimate=decimate, color='black')
+    _plotTrace(ax2, cf, decimate=decimate, color='blue')
 
     _vv = baitdict[str(idx)]
     testpass = _vv['evaluatePick_tests']['SignalSustain'][0]
@@ -238,11 +319,12 @@ def plotSustainTest(tr, cf, baitdict, idx, timewin, timenum, snratio, mode="mean
     AutoDateFormatter(AutoDateLocator())
 
     if show:
-        plt.show()
+        _show()
     return fig, (ax1, ax2)
 
 
-def plotLowFreqTest(tr, cf, baitdict, idx, timewin, conf, show=False):
+def plotLowFreqTest(tr, cf, baitdict, idx, timewin, conf, show=False,
+                    fig=None, decimate=True):
     """ Plotting routine for the Sustain Test over a defined pick """
     tfn = sys._getframe().f_code.co_name
     if not isinstance(tr, Trace):
@@ -252,13 +334,9 @@ def plotLowFreqTest(tr, cf, baitdict, idx, timewin, conf, show=False):
         logger.error('%s: not a valid ObsPy trace (CF) ...' % tfn)
         return False
     #
-    fig = plt.figure(figsize=(8, 4.5))
-
-    ax1 = plt.subplot(211)
-    ax1.plot(tr.times("matplotlib"), tr.data, color='black')
-
-    ax2 = plt.subplot(212, sharex=ax1)  # , sharey=ax1)
-    ax2.plot(cf.times("matplotlib"), cf.data, color='blue')
+    fig, ax1, ax2 = _setupAxes(fig)
+    _plotTrace(ax1, tr, decimate=decimate, color='black')
+    _plotTrace(ax2, cf, decimate=decimate, color='blue')
 
     _vv = baitdict[str(idx)]
     testpass = _vv['evaluatePick_tests']['LowFreqTrend'][0]
@@ -312,5 +390,5 @@ def plotLowFreqTest(tr, cf, baitdict, idx, timewin, conf, show=False):
     AutoDateFormatter(AutoDateLocator())
 
     if show:
-        plt.show()
+        _show()
     return fig, (ax1, ax2)
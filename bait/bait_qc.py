@@ -0,0 +1,231 @@
+"""
+This module contains the headless QC renderer of BaIt.
+
+The plots of `bait_plot` (picks and evaluation tests) are drawn on
+matplotlib `Figure` objects with an Agg canvas: no pyplot, no GUI
+backend, no `show()`. The figures are created once (one per plot
+kind) and cleared and reused for every page, station after station.
+
+Each station gets a report:
+ - "pdf": a single multi-page PDF (picks page + one page per test
+          and evaluated pick)
+ - "png": one PNG file per page
+Reports of many stations are rendered in parallel worker processes
+(each worker keeps its own renderer and figures).
+
+USAGE:
+    >>> results = qcReport(st_proc, "./QC", stream_raw=st_raw,
+    ...                    processes=8, **BAIT_PAR_DICT)
+    >>> [_rr['files'] for _rr in results]
+"""
+
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+#
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+#
+from bait import bait_errors as BE
+from bait.bait import BaIt
+from bait.bait_batch import _groupStations
+
+logger = logging.getLogger(__name__)
+
+# evaluation test --> `BaIt.plotTests` name
+TEST_PLOTS = {'SignalAmp': "amp",
+              'SignalSustain': "sustain",
+              'LowFreqTrend': "low"}
+
+_RENDERER = {}      # renderer of the pool workers (one per process)
+
+
+# --------------------------------------------- Private
+
+
+def _initWorker():
+    """ Pool initializer: workers never need an interactive backend """
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _reportStation(unit, renderer=None):
+    """
+    Worker function: pick a single station and write its QC report.
+    It must stay at module level (picklable by the process pool).
+    Without `renderer`, the one cached in the worker process is used.
+
+    RETURN: dict with keys 'id', 'files', 'error'
+    """
+    (stkey, st, straw, channel, baitconf, outdir, qcconf) = unit
+    if renderer is None:
+        if 'renderer' not in _RENDERER:
+            _RENDERER['renderer'] = QCRenderer(figsize=qcconf['figsize'],
+                                               dpi=qcconf['dpi'])
+        renderer = _RENDERER['renderer']
+    out = {'id': stkey, 'files': [], 'error': None}
+    BP = BaIt(st, stream_raw=straw, channel=channel, **baitconf)
+    try:
+        BP.CatchEmAll()
+    except BE.MissingVariable as err:
+        # the rejected picks are still worth a look
+        logger.warning("%s: %s" % (stkey, err))
+        out['error'] = "No TRUE pick found!"
+    try:
+        out['files'] = renderer.render(
+                            BP, os.path.join(outdir, stkey),
+                            fmt=qcconf['fmt'], tests=qcconf['tests'],
+                            plotraw=qcconf['plotraw'], title=stkey)
+    except Exception as err:
+        logger.error("%s: QC report failed - %s" % (stkey, err))
+        out['error'] = "%s: %s" % (type(err).__name__, err)
+    return out
+
+
+# --------------------------------------------- Public
+
+
+class QCRenderer(object):
+    """
+    Headless renderer of the BaIt QC plots.
+
+    One Agg figure per plot kind ("picks" and each test) is created at
+    the first use and reused (cleared) for all the following pages.
+    Only one page per kind can be alive at the same time: every page
+    must be saved before the next one is drawn (see `pages`).
+    """
+    def __init__(self, figsize=(8, 4.5), dpi=100):
+        self.figsize = figsize
+        self.dpi = dpi
+        self._figs = {}
+
+    def figure(self, kind):
+        """ Return the (reused) Agg figure of the plot KIND """
+        if kind not in self._figs:
+            fig = Figure(figsize=self.figsize, dpi=self.dpi)
+            FigureCanvasAgg(fig)
+            self._figs[kind] = fig
+        return self._figs[kind]
+
+    def pages(self, BP, tests="valid", plotraw=False, title=None):
+        """
+        Generator of the (label, figure) pages of a (picked) BaIt object:
+        the picks page, then the test pages of each pick.
+         - tests: "valid" (test pages of the valid picks only), "all"
+                  (every evaluated pick) or None (picks page only)
+        """
+        if tests not in ("valid", "all", None):
+            raise BE.InvalidParameter("TESTS must be either VALID, ALL "
+                                      "or None!")
+        fig, _ = BP.plotPicks(plotraw=plotraw, figtitle=title,
+                              fig=self.figure("picks"))
+        yield "picks", fig
+        if not tests:
+            return
+        for _it, _rec in sorted(BP.baitdict.items(),
+                                key=lambda x: int(x[0])):
+            if not _rec['pickUTC'] or (tests == "valid" and
+                                       not _rec['evaluatePick']):
+                continue
+            for _name, _res in sorted(_rec['evaluatePick_tests'].items()):
+                # tests without a plot routine or not evaluated
+                # (short-circuit) are skipped
+                if _name not in TEST_PLOTS or _res is None:
+                    continue
+                fig, _ = BP.plotTests(int(_it), name=TEST_PLOTS[_name],
+                                      plotraw=plotraw,
+                                      fig=self.figure(_name))
+                yield "%s_%s" % (_it, _name), fig
+
+    def render(self, BP, outpath, fmt="pdf", **kwargs):
+        """
+        Write the QC report of a (picked) BaIt object.
+
+        INPUT:
+            - outpath: output path without extension
+            - fmt: "pdf" (one multi-page file) or "png" (one file per
+                   page, named OUTPATH_LABEL.png)
+            - kwargs: `pages` arguments (tests, plotraw, title)
+
+        OUTPUT:
+            - list of the written files
+        """
+        if fmt.lower() == "pdf":
+            _file = outpath + ".pdf"
+            with PdfPages(_file) as pdf:
+                for (_, fig) in self.pages(BP, **kwargs):
+                    pdf.savefig(fig)
+            return [_file]
+        elif fmt.lower() == "png":
+            out = []
+            for (_label, fig) in self.pages(BP, **kwargs):
+                out.append("%s_%s.png" % (outpath, _label))
+                fig.savefig(out[-1])
+            return out
+        else:
+            raise BE.InvalidParameter("FMT parameter must be either "
+                                      "PDF or PNG!")
+
+    def close(self):
+        """ Release all the figures """
+        for fig in self._figs.values():
+            fig.clf()
+        self._figs.clear()
+
+
+def qcReport(stream,
+             outdir,
+             stream_raw=None,
+             channel="*Z",
+             fmt="pdf",
+             tests="valid",
+             plotraw=False,
+             figsize=(8, 4.5),
+             dpi=100,
+             processes=None,
+             chunksize=1,
+             **kwargs):
+    """
+    Pick all the stations of a stream and write one QC report per
+    station (NET.STA.LOC.pdf or NET.STA.LOC_<page>.png) in OUTDIR.
+
+    INPUT:
+        - stream, stream_raw, channel: see `bait_batch.pickStream`
+        - outdir: output directory (created if missing)
+        - fmt, tests, plotraw: see `QCRenderer.render`/`pages`
+        - figsize, dpi: figures size
+        - processes: number of worker processes. None uses all the
+                     CPUs, 1 runs serially in the calling process
+        - chunksize: number of stations sent to a worker at once
+        - kwargs: any other `BaIt` keyword argument
+
+    OUTPUT:
+        - list of dict, one per station sorted by station id:
+            {'id': "NET.STA.LOC", 'files': [...], 'error': None/str}
+    """
+    if fmt.lower() not in ("pdf", "png"):
+        raise BE.InvalidParameter("FMT parameter must be either PDF or PNG!")
+    os.makedirs(outdir, exist_ok=True)
+    qcconf = {'fmt': fmt, 'tests': tests, 'plotraw': plotraw,
+              'figsize': figsize, 'dpi': dpi}
+    units = [(_key, _st, _raw, channel, kwargs, outdir, qcconf)
+             for (_key, _st, _raw) in _groupStations(stream, stream_raw,
+                                                     channel)]
+    logger.info("QC report of %d stations" % len(units))
+    if not units:
+        return []
+    #
+    if processes == 1 or len(units) == 1:
+        # own renderer: its figures are released before returning
+        renderer = QCRenderer(figsize=figsize, dpi=dpi)
+        try:
+            return [_reportStation(_uu, renderer) for _uu in units]
+        finally:
+            renderer.close()
+    #
+    with ProcessPoolExecutor(max_workers=processes,
+                             initializer=_initWorker) as executor:
+        results = list(executor.map(_reportStation, units,
+                                    chunksize=chunksize))
+    return results
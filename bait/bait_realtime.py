@@ -0,0 +1,407 @@
+"""
+This module contains the real-time (streaming) version of BaIt.
+
+The `BaItRealTime` object is fed with consecutive data packets
+(obspy.Trace objects, i.e. the records of a miniSEED feed) of a
+single PROCESSED channel. Data are stored in a bounded ring buffer
+and the Baer-Kradolfer picker state (iteration, scanning start,
+last pick) is kept between packets, so picks are emitted as soon
+as they are confirmed by the incoming data.
+
+The cost of each packet does not depend on the buffer length:
+ - the picker re-scans only the new samples plus the preset/confirm
+   margin (`preset_len + tupevent + p_dur`) before them
+ - the evaluation of each pick (same tests of `BaIt.evaluatePick_BK`
+   and AIC) works on a window around the pick only. It is deferred
+   until enough data after the pick have arrived, i.e.
+   timenum * timewin seconds for `SignalSustain`. The window of each
+   test is the one declared in the test registry
+   (`bait_customtests.registerTest(..., window=)`): tests without it
+   are refused.
+
+*** NB: as the picker noise statistics are estimated on the re-scanned
+        window only, picks may differ from the offline BaIt ones on
+        very emergent onsets.
+*** NB: the CF of the evaluation tests is normalized over the data
+        currently in the ring buffer (not over the whole trace as in
+        the offline BaIt), therefore amplitude-based verdicts may
+        slightly differ from the offline ones. Tests working on the
+        whole trace (i.e. `LowFreqTrend`) see the evaluation window
+        only: their verdicts may differ from the offline ones, and the
+        'bk_info' of the picks evaluated by them ends with
+        `PARTIAL_WINDOW`.
+*** NB: only processed data are handled, the AIC picker (if
+        requested) always works on the processed data.
+"""
+
+import time
+import logging
+from collections import deque
+import numpy as np
+#
+from bait import bait_errors as BE
+from bait import bait_customtests as BCT
+from bait.bait import _pk_baer, _AICcf
+from bait.bait_window import TraceWindow
+from obspy.core.trace import Trace
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_WINDOW = "*"    # bk_info flag: whole-trace tests on the window
+
+
+# --------------------------------------------- Private
+
+
+class _RingBuffer(object):
+    """
+    Bounded FIFO buffer of samples. Samples are addressed with their
+    ABSOLUTE index (number of samples written since the beginning).
+    """
+    def __init__(self, size, dtype=np.float64):
+        self.size = int(size)
+        self.data = np.zeros(self.size, dtype=dtype)
+        self.nwritten = 0
+        self._ranges = deque()    # (start, end, min, max) of |data| appends
+
+    @property
+    def first(self):
+        """ Absolute index of the oldest sample still in buffer """
+        return max(0, self.nwritten - self.size)
+
+    def append(self, inarray):
+        inarray = np.asarray(inarray)
+        npts = len(inarray)
+        if npts >= self.size:
+            self.data[:] = inarray[-self.size:]
+            self.data = np.roll(self.data, (self.nwritten + npts) % self.size)
+        else:
+            _start = self.nwritten % self.size
+            _stop = _start + npts
+            if _stop <= self.size:
+                self.data[_start:_stop] = inarray
+            else:
+                _split = self.size - _start
+                self.data[_start:] = inarray[:_split]
+                self.data[:npts - _split] = inarray[_split:]
+        self.nwritten += npts
+        if npts:
+            _abs = np.abs(inarray[-self.size:])
+            self._ranges.append((self.nwritten - len(_abs), self.nwritten,
+                                 _abs.min(), _abs.max()))
+        while self._ranges and self._ranges[0][1] <= self.first:
+            self._ranges.popleft()
+
+    def absrange(self):
+        """
+        Return (min, max) of the absolute values of the samples in
+        buffer, from the per-append ranges (only the oldest, partially
+        overwritten, append is scanned again).
+        """
+        _ranges = list(self._ranges)
+        (_start, _end) = _ranges[0][:2]
+        if _start < self.first:
+            # the oldest append is partially overwritten
+            _abs = np.abs(self.get(self.first, _end))
+            _ranges[0] = (self.first, _end, _abs.min(), _abs.max())
+        return (min(_rr[2] for _rr in _ranges),
+                max(_rr[3] for _rr in _ranges))
+
+    def get(self, idx_start, idx_end):
+        """ Return a contiguous copy of the absolute range [start, end) """
+        if idx_start < self.first or idx_end > self.nwritten:
+            raise BE.InvalidParameter("Requested samples not in buffer: "
+                                      "[%d, %d)" % (idx_start, idx_end))
+        _start = idx_start % self.size
+        npts = idx_end - idx_start
+        if _start + npts <= self.size:
+            return self.data[_start:_start + npts].copy()
+        return np.concatenate((self.data[_start:],
+                               self.data[:npts - (self.size - _start)]))
+
+
+# --------------------------------------------- Public
+
+
+def packetSource(trace, packet_npts=256, realtime=False, speed=1.0):
+    """
+    Generator that replays an obspy.Trace as consecutive packets
+    (obspy.Trace objects of `packet_npts` samples), like a local
+    miniSEED feed. If `realtime` is True, each packet is yielded only
+    when its last sample would have been acquired (scaled by `speed`).
+    """
+    df = trace.stats.sampling_rate
+    tstart = time.time()
+    for _ii in range(0, trace.stats.npts, packet_npts):
+        _data = trace.data[_ii:_ii + packet_npts].copy()
+        _head = trace.stats.copy()
+        _head.starttime = trace.stats.starttime + _ii / df
+        if realtime:
+            _wait = ((_ii + len(_data)) / df / speed) - (time.time() - tstart)
+            if _wait > 0:
+                time.sleep(_wait)
+        yield Trace(data=_data, header=_head)
+
+
+class BaItRealTime(object):
+    """
+    Streaming version of BAIT picking algorithm.
+
+    INPUT:
+        - buffer_len: seconds of data stored in the ring buffer. It must
+                      cover the evaluation windows around the picks.
+        - event_len: seconds after the last pick after which the
+                     iterative cycle is closed (back to `opbk_main`)
+        - max_iter, opbk_main, opbk_aux, test_pickvalidation, pickAIC,
+          pickAIC_conf: same as `BaIt`
+
+    USAGE:
+        >>> RT = BaItRealTime(**BAIT_PAR_DICT)
+        >>> for packet in source:
+        ...     for pick in RT.feed(packet):
+        ...         print(pick['status'], pick['pickUTC'], pick['latency'])
+        >>> RT.flush()
+
+    Each emitted pick is a dict with the `baitdict` keys plus:
+    'status' ("detected" or "evaluated"), 'sample' (absolute index),
+    'latency' (wall seconds since the arrival of the packet containing
+    the pick) and 'data_latency' (seconds of data after the pick).
+    """
+    def __init__(self,
+                 buffer_len=300.0,
+                 event_len=30.0,
+                 max_iter=5,
+                 opbk_main={},
+                 opbk_aux={},
+                 test_pickvalidation={},
+                 pickAIC=None,
+                 pickAIC_conf={}):
+        self.buffer_len = buffer_len
+        self.event_len = event_len
+        self.maxit = max_iter
+        self.opbk_main = opbk_main
+        self.opbk_aux = opbk_aux
+        self._tests = BCT.resolveTests(test_pickvalidation)   # fail early
+        self.pick_test = test_pickvalidation
+        self.pickAIC = pickAIC
+        self.pickAIC_conf = pickAIC_conf
+        #
+        (self.pre_pick_time, self.post_pick_time,
+         self._partial) = self._pickwindow()
+        self.picks = []                    # all the evaluated picks
+        self._reset()
+
+    def _reset(self):
+        """ Clear buffer and picker state (i.e. at startup or gaps) """
+        self._rb = None
+        self.stats = None                  # header of absolute sample 0
+        self.df = None
+        self.iteration = 1
+        self._scan = 0
+        self._lastpick = None
+        self._pending = []
+        self._arrivals = deque()
+
+    def _pickwindow(self):
+        """
+        Return the seconds of data needed before and after a pick by
+        the evaluation tests (registry windows) and by the AIC picker,
+        and the tuple of the tests working on the whole trace.
+        """
+        pre, post, partial = 0.0, 0.0, []
+        for (_kk, _, _vv) in self._tests:
+            (_pre, _post) = BCT.testWindow(_kk, _vv)
+            if _pre is None or _post is None:
+                logger.warning("Test %s works on the whole trace: only the "
+                               "evaluation window is available" % _kk)
+                partial.append(_kk)
+            pre = max(pre, _pre or 0.0)
+            post = max(post, _post or 0.0)
+        if self.pickAIC:
+            pre = max(pre, self.pickAIC_conf.get('wintrim_noise', 1.0))
+            post = max(post, self.pickAIC_conf.get('wintrim_sign', 1.0))
+        return (pre, post, tuple(partial))
+
+    def _sec2sample(self, value):
+        return int(round(value * self.df))
+
+    def _abs2utc(self, sample):
+        return self.stats.starttime + sample / self.df
+
+    def _arrivaltime(self, sample):
+        """ Wall time of the arrival of the packet containing `sample` """
+        for (_end, _wall) in self._arrivals:
+            if sample < _end:
+                return _wall
+        return time.time()
+
+    def _newcycle(self, sample):
+        """ Close the iterative cycle and restart with `opbk_main` """
+        self.iteration = 1
+        self._lastpick = None
+        self._scan = max(sample, 0)
+
+    def feed(self, packet):
+        """
+        Add a new data packet (obspy.Trace) to the ring buffer and run
+        detection and deferred evaluation.
+
+        RETURN: list of picks (dict) whose status changed
+        """
+        if not isinstance(packet, Trace):
+            raise BE.BadInstance("Packets must be obspy.Trace objects!")
+        _arrival = time.time()
+        #
+        if self._rb is not None:
+            _expected = self._abs2utc(self._rb.nwritten)
+            if (packet.stats.sampling_rate != self.df or
+               abs(packet.stats.starttime - _expected) > 0.5 / self.df):
+                logger.warning("Gap/overlap in the data feed at %s, "
+                               "resetting BaIt state" %
+                               packet.stats.starttime)
+                self._reset()
+        if self._rb is None:
+            self.df = packet.stats.sampling_rate
+            self.stats = packet.stats.copy()
+            self._rb = _RingBuffer(self._sec2sample(self.buffer_len))
+        #
+        self._rb.append(packet.data)
+        self._arrivals.append((self._rb.nwritten, _arrival))
+        while self._arrivals and self._arrivals[0][0] <= self._rb.first:
+            self._arrivals.popleft()
+        #
+        out = self._detect()
+        out.extend(self._evaluate())
+        return out
+
+    def flush(self):
+        """ Evaluate all the pending picks with the data available """
+        return self._evaluate(force=True)
+
+    def _detect(self):
+        """ Run the BK picker (iteratively) on the new data """
+        out = []
+        while True:
+            opbk = self.opbk_main if self.iteration == 1 else self.opbk_aux
+            preset = self._sec2sample(opbk['preset_len'])
+            confirm = (self._sec2sample(opbk['tupevent']) +
+                       self._sec2sample(opbk['p_dur']))
+            #
+            idx_start = max(self._scan, self._rb.first)
+            idx_end = self._rb.nwritten
+            if idx_end - idx_start <= preset + confirm:
+                break
+            PickSample, PhaseInfo = _pk_baer(
+                            self._rb.get(idx_start, idx_end), self.df,
+                            self._sec2sample(opbk['tdownmax']),
+                            self._sec2sample(opbk['tupevent']),
+                            opbk['thr1'], opbk['thr2'],
+                            preset, self._sec2sample(opbk['p_dur']))
+            PhaseInfo = str(PhaseInfo).strip()
+            #
+            if PhaseInfo == '':
+                if (self._lastpick is not None and
+                   idx_end - self._lastpick > self._sec2sample(
+                                                        self.event_len)):
+                    self._newcycle(idx_end - preset - confirm)
+                else:
+                    # next scan: new samples + preset/confirm margin
+                    self._scan = idx_end - preset - confirm
+                break
+            #
+            pick_abs = idx_start + PickSample
+            if idx_end - pick_abs < confirm:
+                # pick not confirmed yet: wait for more data
+                break
+            rec = {'iteration': self.iteration,
+                   'sample': pick_abs,
+                   'pickUTC': self._abs2utc(pick_abs),
+                   'bk_info': PhaseInfo,
+                   'pickUTC_AIC': None,
+                   'evaluatePick': None,
+                   'evaluatePick_tests': {},
+                   'status': "detected",
+                   'latency': time.time() - self._arrivaltime(pick_abs),
+                   'data_latency': (idx_end - pick_abs) / self.df}
+            logger.debug("Detected (%d): %s - %s" % (
+                         self.iteration, rec['pickUTC'], PhaseInfo))
+            self._pending.append(rec)
+            out.append(rec.copy())
+            #
+            self._lastpick = pick_abs
+            self._scan = pick_abs
+            self.iteration += 1
+            if self.iteration > self.maxit:
+                self._newcycle(pick_abs + self._sec2sample(self.event_len))
+        return out
+
+    def _evaluate(self, force=False):
+        """ Evaluate the pending picks with enough data after them """
+        out = []
+        postpick = self._sec2sample(self.post_pick_time)
+        while self._pending:
+            rec = self._pending[0]
+            if not force and self._rb.nwritten - rec['sample'] < postpick:
+                break
+            self._pending.pop(0)
+            #
+            if rec['sample'] < self._rb.first:
+                logger.warning("Pick %s out of buffer, rejected "
+                               "(increase buffer_len)" % rec['pickUTC'])
+                rec['evaluatePick'] = False
+            else:
+                self._evaluatepick(rec)
+            rec['status'] = "evaluated"
+            rec['latency'] = time.time() - self._arrivaltime(rec['sample'])
+            rec['data_latency'] = (self._rb.nwritten - rec['sample']
+                                   ) / self.df
+            self.picks.append(rec)
+            out.append(rec)
+        return out
+
+    def _evaluatepick(self, rec):
+        """
+        Run the evaluation tests (and AIC) over a window around the pick.
+        The CF is normalized with the |data| range of the whole buffer.
+        """
+        _margin = 2           # samples: same slices of the whole buffer
+        idx_start = max(self._rb.first,
+                        rec['sample'] - self._sec2sample(self.pre_pick_time)
+                        - _margin)
+        idx_end = min(self._rb.nwritten,
+                      rec['sample'] + self._sec2sample(self.post_pick_time)
+                      + _margin + 1)
+        _head = self.stats.copy()
+        _head.starttime = self._abs2utc(idx_start)
+        tr = Trace(data=self._rb.get(idx_start, idx_end), header=_head)
+        #
+        rec['evaluatePick_tests'] = {}
+        if self._tests:
+            (_min, _max) = self._rb.absrange()
+            _cf = np.abs(tr.data)
+            if _max > _min:
+                _cf -= _min
+                _cf /= (_max - _min)
+            else:
+                _cf.fill(0.0)
+            cf = TraceWindow(Trace(data=_cf, header=_head))
+            wt = TraceWindow(tr)
+            verdicts = []
+            for (_kk, testFunction, _) in self._tests:
+                (verdict, testout) = testFunction(wt, rec, cf)
+                verdicts.append(verdict)
+                rec['evaluatePick_tests'][_kk] = (verdict, testout)
+            rec['evaluatePick'] = all(verdicts)
+            if self._partial:
+                rec['bk_info'] += PARTIAL_WINDOW
+        else:
+            rec['evaluatePick'] = True
+        #
+        if rec['evaluatePick'] and self.pickAIC:
+            td = TraceWindow(tr).slice(
+                    rec['pickUTC'] - self.pickAIC_conf.get('wintrim_noise',
+                                                           1.0),
+                    rec['pickUTC'] + self.pickAIC_conf.get('wintrim_sign',
+                                                           1.0))
+            idx, _ = _AICcf(td.data)
+            rec['pickUTC_AIC'] = td.stats.starttime + idx * td.stats.delta
@@ -0,0 +1,194 @@
+"""
+This module contains the parameter sweep engine of BaIt.
+
+A grid of picking parameters (i.e. `thr1`, `thr2`, `tupevent`,
+`tdownmax`, `preset_len`, `p_dur` of `opbk_main`/`opbk_aux`) is
+evaluated over a fixed, labeled trace set (traces with a reference
+pick). For each combination the pick error and the acceptance rate
+are reported.
+
+The trace set is prepared once (channel selection, single-trace
+streams) and sent once to each worker process (pool initializer):
+the tasks only carry the index of the combination. In each worker
+the CFs used by the evaluation tests are computed once per trace
+and shared by all the combinations (`BaIt` cf_cache).
+
+USAGE:
+    >>> dataset = [(st_proc, st_raw, UTCDateTime(...)), ...]
+    >>> grid = {'opbk_main.thr1': [4, 6, 8], 'opbk_aux.tupevent': [0.2, 0.5]}
+    >>> results = sweep(dataset, grid, BAIT_PAR_DICT, processes=4)
+    >>> best = min(results, key=lambda x: (-x['acceptance_rate'], x['mae']))
+"""
+
+import copy
+import logging
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+#
+from bait import bait_errors as BE
+from bait.bait import BaIt
+from obspy.core.stream import Stream
+
+logger = logging.getLogger(__name__)
+
+_SHARED = {}        # worker-side data: 'dataset', 'base', 'combos', ...
+
+
+# --------------------------------------------- Private
+
+
+def _prepareDataset(dataset, channel):
+    """
+    Return a list of (id, proc Stream, raw Stream/None, reference pick)
+    with single-trace streams of `channel` (selected only once).
+    """
+    out = []
+    for _nn, _item in enumerate(dataset):
+        if isinstance(_item, dict):
+            _proc, _raw, _ref = (_item['stream'], _item.get('stream_raw'),
+                                 _item['pick'])
+        else:
+            try:
+                _proc, _raw, _ref = _item
+            except (TypeError, ValueError):
+                raise BE.BadInstance("Dataset items must be (proc, raw, "
+                                     "pick) tuples or dicts!")
+        _proc = _proc.select(channel=channel)
+        if not _proc:
+            raise BE.MissingVariable({'message': "No %s trace in item %d" %
+                                      (channel, _nn)})
+        _tr = _proc[0]
+        if isinstance(_raw, Stream):
+            _raw = _raw.select(id=_tr.id) or _raw.select(channel=channel)
+            _raw = Stream(traces=[_raw[0]]) if _raw else None
+        out.append((_tr.id, Stream(traces=[_tr]), _raw, _ref))
+    return out
+
+
+def _applyParams(base, params):
+    """ Return a copy of `base` with the (dotted keys) `params` set """
+    conf = copy.deepcopy(base)
+    for _kk, _vv in params.items():
+        _node = conf
+        _path = _kk.split(".")
+        for _pp in _path[:-1]:
+            _node = _node.setdefault(_pp, {})
+        _node[_path[-1]] = _vv
+    return conf
+
+
+def _initWorker(dataset, base, combos, channel, picker, match):
+    """ Pool initializer: store the shared data once per worker """
+    _SHARED.clear()
+    _SHARED.update({'dataset': dataset, 'base': base, 'combos': combos,
+                    'channel': channel, 'picker': picker, 'match': match,
+                    'cf_cache': {}})
+
+
+def _runCombination(idx):
+    """
+    Worker function: pick the whole trace set with the combination
+    `idx`. Return the list of signed pick errors [s] (None if no valid
+    pick for the trace).
+    """
+    conf = _applyParams(_SHARED['base'], _SHARED['combos'][idx])
+    out = []
+    for (_id, _proc, _raw, _ref) in _SHARED['dataset']:
+        BP = BaIt(_proc, stream_raw=_raw, channel=_proc[0].stats.channel,
+                  cf_cache=_SHARED['cf_cache'], **conf)
+        try:
+            BP.CatchEmAll()
+        except BE.MissingVariable:
+            out.append(None)
+            continue
+        picks = [_pk for (_pk, _) in BP.extract_true_pick(
+                    idx="all", picker=_SHARED['picker'], compact_format=True)]
+        if _SHARED['match'] == "first":
+            out.append(picks[0] - _ref)
+        else:
+            out.append(min((_pk - _ref for _pk in picks), key=abs))
+    return out
+
+
+def _summary(params, delays, tolerance):
+    """ Metrics of a single combination """
+    _ok = np.array([_dd for _dd in delays if _dd is not None], dtype=float)
+    _abs = np.abs(_ok)
+    return {'params': params,
+            'n_traces': len(delays),
+            'n_accepted': len(_ok),
+            'acceptance_rate': len(_ok) / len(delays) if delays else np.nan,
+            'n_within_tolerance': int(np.sum(_abs <= tolerance)),
+            'mae': float(_abs.mean()) if len(_ok) else np.nan,
+            'rmse': float(np.sqrt(np.mean(_ok ** 2))) if len(_ok) else np.nan,
+            'median_abs_error': float(np.median(_abs)) if len(_ok) else np.nan,
+            'bias': float(_ok.mean()) if len(_ok) else np.nan,
+            'errors': delays}
+
+
+# --------------------------------------------- Public
+
+
+def parameterGrid(grid):
+    """
+    Return the list of all the combinations (dicts) of a grid
+    {"key": [values]}. Keys of nested parameters are dotted
+    (i.e. "opbk_main.thr1"). Order: last key varies fastest.
+    """
+    if not isinstance(grid, dict) or not grid:
+        raise BE.BadInstance("The grid must be a not-empty dict!")
+    keys = list(grid.keys())
+    return [dict(zip(keys, _vv))
+            for _vv in itertools.product(*(grid[_kk] for _kk in keys))]
+
+
+def sweep(dataset,
+          grid,
+          base_conf,
+          channel="*Z",
+          processes=None,
+          tolerance=0.1,
+          picker="BK",
+          match="first"):
+    """
+    Evaluate all the combinations of `grid` on a labeled trace set.
+
+    INPUT:
+        - dataset: list of (proc Stream, raw Stream/None, reference
+                   UTCDateTime) or dicts {'stream', 'stream_raw', 'pick'}
+        - grid: {"key": [values]} (see `parameterGrid`) or an explicit
+                list of combinations (dicts)
+        - base_conf: BaIt keyword arguments for the unchanged parameters
+        - channel: channel to pick
+        - processes: worker processes (None: all CPUs, 1: serial)
+        - tolerance: pick error [s] considered correct
+        - picker: "BK" or "AIC" pick compared with the reference
+        - match: "first" valid pick or the "closest" one to the reference
+
+    OUTPUT:
+        - list of dict (grid order), one per combination: 'params',
+          'n_traces', 'n_accepted', 'acceptance_rate',
+          'n_within_tolerance', 'mae', 'rmse', 'median_abs_error',
+          'bias' (all errors in seconds, pick - reference) and 'errors'
+          (per trace, None if no valid pick)
+    """
+    if match not in ("first", "closest"):
+        raise BE.InvalidParameter("MATCH must be either FIRST or CLOSEST!")
+    combos = grid if isinstance(grid, (list, tuple)) else parameterGrid(grid)
+    data = _prepareDataset(dataset, channel)
+    logger.info("Sweep: %d combinations over %d traces" % (len(combos),
+                                                            len(data)))
+    initargs = (data, base_conf, combos, channel, picker, match)
+    if processes == 1 or len(combos) == 1:
+        _initWorker(*initargs)
+        try:
+            delays = [_runCombination(_ii) for _ii in range(len(combos))]
+        finally:
+            _SHARED.clear()     # release the dataset and the CF cache
+    else:
+        with ProcessPoolExecutor(max_workers=processes,
+                                 initializer=_initWorker,
+                                 initargs=initargs) as executor:
+            delays = list(executor.map(_runCombination, range(len(combos))))
+    return [_summary(_cc, _dd, tolerance) for _cc, _dd in zip(combos, delays)]
@@ -0,0 +1,155 @@
+"""
+This module contains the lightweight, read-only window type used
+internally by BaIt to avoid `obspy.Trace.copy()` calls.
+
+A `TraceWindow` is just a NumPy view on the parent data plus the
+start sample (relative to the parent trace), the sampling rate and
+the reference time of the parent first sample.
+It exposes the subset of the `obspy.Trace` interface used by the
+BaIt pipeline (`data`, `stats.starttime`/`endtime`/`npts`/`delta`/
+`sampling_rate`, `slice`), so the evaluation tests can work on it
+as they do on a trace. Slicing a window never copies the data.
+
+*** NB: the window data are READ-ONLY. Use `copy()` to get back a
+        (mutable) obspy.Trace when you really need to modify them.
+"""
+
+import math
+from obspy.core.trace import Trace
+
+
+class TraceWindow(object):
+    """
+    Read-only window over the data of an obspy.Trace.
+
+    INPUT:
+        - trace: obspy.Trace (or TraceWindow) to take the view from
+        - start: index of the first sample (relative to `trace`)
+        - end: index of the last sample + 1 (None --> end of trace)
+    """
+    __slots__ = ('data', 'start', 'sampling_rate', 'delta', 'reftime',
+                 'header')
+
+    def __init__(self, trace, start=0, end=None):
+        if isinstance(trace, TraceWindow):
+            _data = trace.data
+            self.start = trace.start + start
+            self.reftime = trace.reftime
+            self.header = trace.header
+        elif isinstance(trace, Trace):
+            _data = trace.data
+            self.start = start
+            self.reftime = trace.stats.starttime
+            self.header = trace.stats
+        else:
+            raise TypeError("Input must be an obspy.Trace or TraceWindow")
+        #
+        self.sampling_rate = self.header.sampling_rate
+        self.delta = self.header.delta
+        self.data = _data[start:end].view()
+        self.data.flags.writeable = False
+
+    # ------------------------------------- obspy.Trace-like interface
+    @property
+    def stats(self):
+        """ The window itself acts as the (read-only) stats object """
+        return self
+
+    @property
+    def npts(self):
+        return len(self.data)
+
+    @property
+    def starttime(self):
+        return self.reftime + self.start * self.delta
+
+    @property
+    def endtime(self):
+        return self.reftime + (self.start + self.npts - 1) * self.delta
+
+    @property
+    def id(self):
+        return self.header.network + "." + self.header.station + "." + \
+               self.header.location + "." + self.header.channel
+
+    def __len__(self):
+        return self.npts
+
+    def __repr__(self):
+        return "TraceWindow(%s | %s - %s | %d samples)" % (
+                    self.id, self.starttime, self.endtime, self.npts)
+
+    def slice(self, starttime=None, endtime=None):
+        """
+        Return a new TraceWindow (view) between starttime and endtime.
+        Same sample selection of `obspy.Trace.slice(nearest_sample=True)`
+        """
+        _start, _end = sliceBounds(self, starttime, endtime)
+        return TraceWindow(self, _start, _end)
+
+    def copy(self):
+        """ Return a new (mutable) obspy.Trace with copied data """
+        _head = self.header.copy()
+        _head.starttime = self.starttime
+        return Trace(data=self.data.copy(), header=_head)
+
+
+def _roundAway(number):
+    """
+    Pure-python (faster on scalars) `obspy.core.compatibility.round_away`:
+    nearest integer, halfway cases rounded away from zero.
+    """
+    floor = math.floor(number)
+    ceil = math.ceil(number)
+    if (floor != ceil) and (abs(number - floor) == abs(ceil - number)):
+        return int(number) + (1 if number > 0 else -1)
+    return round(number)
+
+
+def _bounds(reftime, npts, sampling_rate, delta, starttime, endtime):
+    """ Core of `sliceBounds` (trace timing already extracted) """
+    if starttime is not None and endtime is not None and \
+       starttime > endtime:
+        raise ValueError("startime is larger than endtime")
+    _start, _end = 0, npts
+    _tstart = reftime
+    if starttime is not None:
+        _delta = _roundAway((starttime - _tstart) * sampling_rate)
+        if _delta > 0:
+            _tstart = _tstart + _delta * delta
+            _start = min(_delta, npts)
+    if endtime is not None:
+        _delta = _roundAway((endtime - _tstart) *
+                            sampling_rate) - (_end - _start) + 1
+        if _delta < 0:
+            if endtime < _tstart:
+                _end = _start
+            elif endtime == _tstart:
+                _end = min(_start + 1, _end)
+            else:
+                _end = max(_end + _delta, _start)
+    return _start, _end
+
+
+def sliceBounds(trace, starttime=None, endtime=None):
+    """
+    Return the (start, end) indexes of the samples of `trace`
+    (obspy.Trace or TraceWindow) selected by
+    `obspy.Trace.slice(starttime, endtime, nearest_sample=True)`,
+    i.e. `trace.data[start:end]`, without creating any new object.
+    """
+    _stats = trace.stats
+    return _bounds(_stats.starttime, len(trace.data), _stats.sampling_rate,
+                   _stats.delta, starttime, endtime)
+
+
+def windowBounds(trace, times):
+    """
+    Return the `sliceBounds` of the consecutive windows
+    [times[0], times[1]], [times[1], times[2]] ... of `trace`.
+    """
+    _stats = trace.stats
+    _args = (_stats.starttime, len(trace.data), _stats.sampling_rate,
+             _stats.delta)
+    return [_bounds(*_args, starttime=times[_ii], endtime=times[_ii + 1])
+            for _ii in range(len(times) - 1)]
@@ -0,0 +1,84 @@
+"""
+Import-time benchmark of BaIt (in the style of `python -X importtime`).
+
+It imports `bait.bait` in fresh interpreters, parses the importtime
+report and checks that:
+ - the cumulative import time of `bait.bait` stays under the budget
+ - no plotting module (matplotlib) is imported by the picking library
+
+The heaviest imports are printed to help finding regressions.
+Exit code is 1 if one of the checks fails (i.e. usable in CI).
+
+USAGE (with bait installed, i.e. `pip install .`):
+    $ python benchmarks/bench_importtime.py
+    $ python benchmarks/bench_importtime.py --budget 0.3 --repeat 10
+"""
+
+import sys
+import argparse
+import subprocess
+
+DEFAULT_BUDGET = 0.6            # seconds, cumulative import of bait.bait
+FORBIDDEN = ("matplotlib",)
+
+
+def _importtime(module):
+    """
+    Run `python -X importtime -c "import module"` in a new interpreter.
+    Return a dict {imported_module: (self_us, cumulative_us)}
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                           "import %s" % module],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    report = {}
+    for _line in proc.stderr.splitlines():
+        if not _line.startswith("import time:") or "[us]" in _line:
+            continue
+        _self, _cumul, _name = _line[len("import time:"):].split("|")
+        report[_name.strip()] = (int(_self), int(_cumul))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--module", default="bait.bait")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                        help="maximum cumulative import time [s]")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="best of N fresh interpreters")
+    parser.add_argument("--top", type=int, default=10,
+                        help="number of heaviest imports to print")
+    args = parser.parse_args(argv)
+    #
+    best = None
+    for _ in range(args.repeat):
+        report = _importtime(args.module)
+        if best is None or (report[args.module][1] <
+                            best[args.module][1]):
+            best = report
+    total = best[args.module][1] / 1e6
+    #
+    print("Heaviest imports (self time):")
+    for _name, (_self, _cumul) in sorted(best.items(),
+                                         key=lambda x: x[1][0],
+                                         reverse=True)[:args.top]:
+        print("  %10.1f ms  %10.1f ms  %s" % (_self / 1e3, _cumul / 1e3,
+                                              _name))
+    print("import %s: %.3f s (budget %.3f s)" % (args.module, total,
+                                                  args.budget))
+    #
+    failed = False
+    if total > args.budget:
+        print("*** FAIL: import time over budget")
+        failed = True
+    for _name in best:
+        if _name.split(".")[0] in FORBIDDEN:
+            print("*** FAIL: %s imported by %s" % (_name, args.module))
+            failed = True
+            break
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark of the numeric kernels (`bait_kernels`) with the NumPy and
+the numba backends (the latter only if numba is installed).
+
+Timed kernels: `aic` (AIC window), `normalize` (whole CF),
+`windowStats` (SignalSustain-like windows, mean and max) and
+`signCounts` (LowFreqTrend). The numba time does not include the
+compilation: the kernels are loaded (or compiled and cached on disk)
+before timing.
+
+USAGE (with bait installed, i.e. `pip install .[jit]`):
+    $ python benchmarks/bench_kernels.py
+    $ python benchmarks/bench_kernels.py --sizes 1e3 1e5 --repeat 10
+"""
+
+import sys
+import argparse
+import timeit
+import numpy as np
+from bait import bait_kernels as KRN
+
+
+def _best(func, repeat):
+    """ Best time [s] of `repeat` runs """
+    best = np.inf
+    for _ in range(repeat):
+        t0 = timeit.default_timer()
+        func()
+        best = min(best, timeit.default_timer() - t0)
+    return best
+
+
+def _cases(npts, rng):
+    data = rng.standard_normal(npts)
+    work = np.abs(data)
+    _step = max(npts // 20, 1)
+    starts = np.arange(0, npts - _step, _step)
+    irregular = starts + rng.integers(0, 3, len(starts))
+    return [("aic", lambda: KRN.aic(data[:min(npts, 10000)])),
+            ("normalize", lambda: KRN.normalize(work, 0, 1)),
+            ("windowStats mean",
+             lambda: KRN.windowStats(work, starts, starts + _step, "mean")),
+            ("windowStats max (irregular)",
+             lambda: KRN.windowStats(work, irregular, irregular + _step,
+                                     "max")),
+            ("signCounts", lambda: KRN.signCounts(data))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", nargs="+", type=float,
+                        default=[1e3, 1e4, 1e5, 1e6],
+                        help="number of samples of the test arrays")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    #
+    backends = ["numpy"]
+    if KRN.setBackend("auto") == "numba":
+        backends.append("numba")
+    else:
+        print("numba not installed: NumPy backend only")
+    #
+    rng = np.random.default_rng(42)
+    print("%10s %-28s %s" % ("npts", "kernel",
+                             " ".join("%14s" % ("%s [s]" % _bb)
+                                      for _bb in backends)))
+    for _nn in args.sizes:
+        npts = int(_nn)
+        for (_name, _func) in _cases(npts, rng):
+            _times = []
+            for _bb in backends:
+                KRN.setBackend(_bb)
+                _func()         # warm-up
+                _times.append(_best(_func, args.repeat))
+            print("%10d %-28s %s" % (npts, _name,
+                                     " ".join("%14.6f" % _tt
+                                              for _tt in _times)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
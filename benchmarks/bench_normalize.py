@@ -0,0 +1,79 @@
+"""
+Benchmark of the CF normalization kernel (`_normalizeTrace`).
+
+It compares the current NumPy in-place implementation (float64 and
+float32 output) against the original list-comprehension one, on
+arrays from 10^4 to 10^8 samples.
+
+*** NB: the original implementation builds a python list of the whole
+        trace. By default it is timed only up to 10^6 samples
+        (see --legacy-max), above that it needs several GB of RAM.
+
+USAGE (with bait installed, i.e. `pip install .`):
+    $ python benchmarks/bench_normalize.py
+    $ python benchmarks/bench_normalize.py --sizes 1e4 1e5 --repeat 5
+"""
+
+import sys
+import argparse
+import timeit
+import numpy as np
+from bait.bait_customtests import _normalizeTrace
+
+
+def _normalizeTrace_legacy(workList, rangeVal=[-1, 1]):
+    """ Original implementation (BaIt <= 2.5.9), here for reference """
+    minVal, maxVal = min(workList), max(workList)
+    workList[:] = [((x - minVal) / (maxVal - minVal)) *
+                   (rangeVal[1] - rangeVal[0]) for x in workList]
+    workList = workList + rangeVal[0]
+    return workList
+
+
+def _timeit(func, inarray, repeat):
+    """ Best time [s] of `repeat` runs, each on a fresh copy """
+    best = np.inf
+    for _ in range(repeat):
+        work = inarray.copy()
+        t0 = timeit.default_timer()
+        func(work)
+        best = min(best, timeit.default_timer() - t0)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", nargs="+", type=float,
+                        default=[1e4, 1e5, 1e6, 1e7, 1e8],
+                        help="number of samples of the test arrays")
+    parser.add_argument("--legacy-max", type=float, default=1e6,
+                        help="largest size timed with the legacy version")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    #
+    rng = np.random.default_rng(42)
+    print("%12s %14s %14s %14s %10s" % ("npts", "legacy [s]", "numpy64 [s]",
+                                       "numpy32 [s]", "speedup"))
+    for _nn in args.sizes:
+        npts = int(_nn)
+        inarray = np.abs(rng.standard_normal(npts))
+        #
+        t64 = _timeit(lambda x: _normalizeTrace(x, rangeVal=[0, 1]),
+                      inarray, args.repeat)
+        t32 = _timeit(lambda x: _normalizeTrace(x, rangeVal=[0, 1],
+                                                dtype=np.float32),
+                      inarray, args.repeat)
+        if npts <= args.legacy_max:
+            tleg = _timeit(lambda x: _normalizeTrace_legacy(x, [0, 1]),
+                           inarray, 1)
+            print("%12d %14.6f %14.6f %14.6f %9.1fx" % (
+                  npts, tleg, t64, t32, tleg / t64))
+        else:
+            print("%12d %14s %14.6f %14.6f %10s" % (
+                  npts, "-", t64, t32, "-"))
+        del inarray
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Benchmark suite of the BaIt picking pipeline.
+
+Synthetic traces (noise + a few impulsive events) from 1 minute to
+24 hours, at several sampling rates, are used to time separately:
+ - `CatchEmAll` (whole iterative picking, cold CF cache)
+ - `AIC` (around the first valid pick)
+ - every `bait_customtests` evaluation test (around the first pick)
+ - `_createCF`
+ - `extract_true_pick`
+
+For each (duration, sampling rate, stage) the best/mean wall time,
+the throughput (trace samples per second) and the peak memory
+(`tracemalloc`, measured in a separate run to not bias the timings)
+are stored in a machine-readable JSON file, to compare releases
+and to size the processing cluster.
+
+USAGE (with bait installed, i.e. `pip install .`):
+    $ python benchmarks/bench_pipeline.py --output bench_pipeline.json
+    $ python benchmarks/bench_pipeline.py --durations 60 3600 --rates 100
+"""
+
+import sys
+import json
+import time
+import timeit
+import platform
+import argparse
+import tracemalloc
+import numpy as np
+#
+import obspy
+import bait
+from bait import bait_errors as BE
+from bait import bait_customtests as BCT
+from bait.bait import BaIt
+from bait.bait_window import TraceWindow
+from obspy.core.trace import Trace
+from obspy.core.stream import Stream
+from obspy.core.utcdatetime import UTCDateTime
+
+
+BAIT_PAR_DICT = {
+    'max_iter': 10,
+    'opbk_main': {
+          'tdownmax': 0.1,
+          'tupevent': 0.5,
+          'thr1': 6.0,
+          'thr2': 10.0,
+          'preset_len': 0.6,
+          'p_dur': 1.0
+    },
+    'opbk_aux': {
+          'tdownmax': 0.1,
+          'tupevent': 0.25,
+          'thr1': 3,
+          'thr2': 6,
+          'preset_len': 0.1,
+          'p_dur': 1.0
+    },
+    'test_pickvalidation': {
+          'SignalAmp': [0.5, 0.05],
+          'SignalSustain': [0.2, 5, 1.2],
+          'LowFreqTrend': [0.2, 0.80]
+    },
+    'pickAIC': True,
+    'pickAIC_conf': {
+          'useraw': True,
+          'wintrim_noise': 0.8,
+          'wintrim_sign': 0.5
+    }
+}
+
+# Evaluation tests timed one by one (name: parameters)
+BENCH_TESTS = {
+    'SignalAmp': [0.5, 0.05],
+    'Signal2NoiseRatio_MAX': [0.5, 0.5, 1.5],
+    'Signal2NoiseRatio_STD': [0.5, 0.5, 1.5],
+    'SignalSustain': [0.2, 5, 1.2],
+    'LowFreqTrend': [0.2, 0.80],
+}
+
+
+# --------------------------------------------- Synthetic data
+
+
+def syntheticStream(duration, df, nevents=5, seed=42):
+    """
+    Return (proc, raw) obspy.Stream with a single HHZ trace of
+    `duration` seconds sampled at `df` Hz: white noise plus `nevents`
+    exponentially decaying wave-trains evenly spaced in the trace.
+    """
+    rng = np.random.default_rng(seed)
+    npts = int(duration * df)
+    data = rng.standard_normal(npts)
+    _tt = np.arange(int(5 * df)) / df
+    _burst = 40.0 * np.exp(-_tt / 0.8) * np.sin(2 * np.pi * 8.0 * _tt)
+    for _ii in range(1, nevents + 1):
+        _idx = int(_ii * npts / (nevents + 1))
+        _end = min(_idx + len(_burst), npts)
+        data[_idx:_end] += _burst[:_end - _idx]
+    head = {'network': "XX", 'station': "BENCH", 'channel': "HHZ",
+            'sampling_rate': df, 'starttime': UTCDateTime(2020, 1, 1)}
+    raw = Trace(data=(data * 1000).astype(np.int32), header=dict(head))
+    proc = Trace(data=data, header=dict(head))
+    return Stream(traces=[proc]), Stream(traces=[raw])
+
+
+# --------------------------------------------- Timing helpers
+
+
+def _timeit(func, repeat):
+    """ Return the list of wall times [s] of `repeat` calls """
+    times = []
+    for _ in range(repeat):
+        t0 = timeit.default_timer()
+        func()
+        times.append(timeit.default_timer() - t0)
+    return times
+
+
+def _peakmemory(func):
+    """ Peak memory [bytes] allocated during a single call """
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        func()
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak
+
+
+def _catchemall(st, straw):
+    """ Complete BaIt run, returning the object (no valid picks is OK) """
+    BP = BaIt(st, stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+    try:
+        BP.CatchEmAll()
+    except BE.MissingVariable:
+        pass
+    return BP
+
+
+def benchStages(duration, df, repeat, memory=True):
+    """ Benchmark all the stages for a single synthetic trace """
+    st, straw = syntheticStream(duration, df)
+    npts = st[0].stats.npts
+    BP = _catchemall(st, straw)        # reference run (picks for AIC/tests)
+    valid = BP.extract_true_pick(idx="all", picker="BK",
+                                 compact_format=False)
+    pkey = valid[0][0] if valid else None
+    #
+    stages = [("CatchEmAll", lambda: _catchemall(st, straw)),
+              ("_createCF", lambda: BCT._createCF(st[0].data)),
+              ("extract_true_pick",
+               lambda: BP.extract_true_pick(idx="all", picker="AIC",
+                                            compact_format=True))]
+    if pkey:
+        _pick = BP.baitdict[pkey]['pickUTC']
+        stages.append(("AIC", lambda: BP.AIC(aroundpick=_pick,
+                                             **BAIT_PAR_DICT['pickAIC_conf'])))
+        _cf = TraceWindow(BP._getcf())
+        _wt = TraceWindow(BP.wt)
+        for _name, _pars in sorted(BENCH_TESTS.items()):
+            _func = getattr(BCT, _name)
+            stages.append((_name,
+                           (lambda f=_func, p=_pars:
+                            f(_wt, BP.baitdict[pkey], *p, cf=_cf))))
+    #
+    results = []
+    for _name, _func in stages:
+        _times = _timeit(_func, repeat)
+        results.append({
+            'stage': _name,
+            'duration_s': duration,
+            'sampling_rate': df,
+            'npts': npts,
+            'repeat': repeat,
+            'time_best_s': min(_times),
+            'time_mean_s': float(np.mean(_times)),
+            'throughput_sps': npts / min(_times) if min(_times) else None,
+            'peak_memory_bytes': _peakmemory(_func) if memory else None,
+            'valid_picks': len(valid)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--durations", nargs="+", type=float,
+                        default=[60, 600, 3600, 21600, 86400],
+                        help="trace durations [s] (default 1 min - 24 h)")
+    parser.add_argument("--rates", nargs="+", type=float,
+                        default=[20.0, 100.0, 200.0],
+                        help="sampling rates [Hz]")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the (slower) peak memory measure")
+    parser.add_argument("--output", default="bench_pipeline.json")
+    args = parser.parse_args(argv)
+    #
+    report = {'meta': {'bait': bait.__version__,
+                       'obspy': obspy.__version__,
+                       'numpy': np.__version__,
+                       'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'machine': platform.machine(),
+                       'date': time.strftime("%Y-%m-%dT%H:%M:%S")},
+              'results': []}
+    for _df in args.rates:
+        for _dur in args.durations:
+            print("... %8.0f s @ %6.1f Hz" % (_dur, _df))
+            _res = benchStages(_dur, _df, args.repeat,
+                               memory=not args.no_memory)
+            for _rr in _res:
+                print("    %-22s %10.4f s  %12.3e samples/s  %s" % (
+                      _rr['stage'], _rr['time_best_s'],
+                      _rr['throughput_sps'] or 0,
+                      ("%.1f MB" % (_rr['peak_memory_bytes'] / 2**20)
+                       if _rr['peak_memory_bytes'] is not None else "-")))
+            report['results'].extend(_res)
+    #
+    with open(args.output, "w") as OUT:
+        json.dump(report, OUT, indent=2)
+    print("Results stored in %s" % args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,7 +18,11 @@ setup(
     python_requires='>=3.6',
     setup_requires=['wheel'],
     install_requires=required_list,
+    extras_require={'jit': ['numba>=0.50']},
     packages=find_packages(),
+    entry_points={
+        'console_scripts': ['bait-pick=bait.bait_cli:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: GNU General Public License v3 (GPLv3)",
@@ -70,5 +70,5 @@ for xx, ii in enumerate(picklist):
 
 # ========================================== Plots
 BP.plotPicks(show=True)
-BP.plotTests(1, name="all", plotraw=False)
-BP.plotTests(2, name="all", plotraw=False)
+BP.plotTests(1, name="all", plotraw=False, show=True)
+BP.plotTests(2, name="all", plotraw=False, show=True)
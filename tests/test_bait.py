@@ -1,7 +1,11 @@
 from bait.bait import BaIt
+import bait.bait_customtests as BCT
 import bait.bait_errors as BE
 from obspy import read, UTCDateTime
 import numpy as np
+import sys
+import subprocess
+import pytest
 
 
 def miniproc(st):
@@ -742,6 +746,191 @@ def test_bait_wwrong_iteration_sorting():
     assert not errors, "Errors occured:\n{}".format("\n".join(errors))
 
 
+
+def test_aic_fast_vs_reference():
+    """ The linear-time AIC must return the same CF and index
+        of the original (reference) loop.
+    """
+    errors = []
+    #
+    BP = BaIt(stproc,
+              stream_raw=straw,
+              channel="*Z",
+              **BAIT_PAR_DICT)
+    BP.CatchEmAll()
+    #
+    for _pp in BP.extract_true_pick(idx="all", picker="BK",
+                                    compact_format=True):
+        for _useraw in (True, False):
+            pf, cff, idxf = BP.AIC(useraw=_useraw, aroundpick=_pp[0],
+                                   wintrim_noise=0.8, wintrim_sign=0.5,
+                                   mode="fast")
+            pr, cfr, idxr = BP.AIC(useraw=_useraw, aroundpick=_pp[0],
+                                   wintrim_noise=0.8, wintrim_sign=0.5,
+                                   mode="reference")
+            if idxf != idxr or pf != pr:
+                errors.append("AIC index mismatch: %d - %d" % (idxf, idxr))
+            np.testing.assert_allclose(cff, cfr, rtol=1e-9)
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+
+def test_cf_cache():
+    """ The CF must be created once per working trace, shared read-only
+        and re-created only when the working trace changes.
+    """
+    errors = []
+    #
+    BP = BaIt(stproc.copy(),
+              stream_raw=straw,
+              channel="*Z",
+              **BAIT_PAR_DICT)
+    BP.CatchEmAll()
+    cf = BP._getcf()
+    #
+    if cf is not BP._getcf():
+        errors.append("CF re-created without trace changes")
+    if cf.data.flags.writeable:
+        errors.append("Cached CF is not read-only")
+    if BP.wt.data is cf.data:
+        errors.append("CF shares the working trace data")
+    #
+    BP.st.select(channel="*Z")[0].data = BP.wt.data * 2.0
+    if BP._getcf() is cf:
+        errors.append("CF not invalidated after trace change")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+
+def test_normalizetrace():
+    """ In-place normalization, float32 output and flat traces """
+    errors = []
+    #
+    inarr = np.abs(stproc.select(channel="*Z")[0].data)
+    outarr = BCT._normalizeTrace(inarr, rangeVal=[0, 1])
+    if outarr is not inarr:
+        errors.append("Normalization not performed in-place")
+    if outarr.min() != 0.0 or outarr.max() != 1.0:
+        errors.append("Wrong normalization range")
+    #
+    outarr = BCT._normalizeTrace(np.arange(10), rangeVal=[-1, 1],
+                                 dtype=np.float32)
+    if outarr.dtype != np.float32:
+        errors.append("Float32 output not respected")
+    np.testing.assert_allclose(outarr, np.linspace(-1, 1, 10), rtol=1e-6)
+    #
+    outarr = BCT._normalizeTrace(np.full(10, 3.3), rangeVal=[0, 1])
+    if not np.all(outarr == 0.0):
+        errors.append("Flat trace not normalized to rangeVal[0]")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+
+def _signalsustain_legacy(cf, pick, timewin, timenum, mode):
+    """ Per-window slicing loop (pre v2.6.0) """
+    noise = cf.slice(pick - timewin, pick).data
+    ratios = []
+    for num in range(timenum):
+        _xx = cf.slice(pick + (num*timewin), pick + ((num+1)*timewin)).data
+        try:
+            _vv = _xx.mean() if mode == "mean" else _xx.max()
+            ratios.append(float(_vv / noise.mean()))
+        except ValueError:
+            ratios.append(np.nan)
+    return ratios
+
+
+@pytest.mark.filterwarnings("ignore:Mean of empty slice")
+def test_signalsustain_vectorized():
+    """ Vectorized windows must return the same ratios (edges too) """
+    errors = []
+    wt = stproc.select(channel="*Z")[0]
+    cf = wt.copy()
+    cf.data = BCT._createCF(wt.data)
+    rng = np.random.default_rng(7)
+    t0, t1 = wt.stats.starttime, wt.stats.endtime
+    with np.errstate(all='ignore'):
+        for _ in range(200):
+            _pick = t0 + rng.uniform(-1.0, (t1 - t0) + 1.0)
+            _tw = float(rng.choice([0.013, 0.2, 0.33333]))
+            _nn = int(rng.integers(1, 8))
+            for _mode in ("mean", "max"):
+                _, ratios = BCT.SignalSustain(wt, {'pickUTC': _pick}, _tw,
+                                              _nn, 1.2, mode=_mode, cf=cf)
+                ref = _signalsustain_legacy(cf, _pick, _tw, _nn, _mode)
+                if not np.array_equal(ratios, ref, equal_nan=True):
+                    errors.append("Ratios mismatch @ %s (%s)" % (_pick,
+                                                                 _mode))
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_picker_single_vs_legacy():
+    """ The single-pass picker must return the same picks of the
+        legacy (copy + trim) one on the bundled test data.
+    """
+    errors = []
+    #
+    for (_st, _str, _conf) in ((stproc, straw, BAIT_PAR_DICT),
+                               (stproc_new, straw_new, BAIT_PAR_DICT_NEW)):
+        _out = {}
+        for _mode in ("single", "legacy"):
+            BP = BaIt(_st, stream_raw=_str, channel="*Z",
+                      picker_mode=_mode, **_conf)
+            BP.CatchEmAll()
+            _out[_mode] = [(_kk, _vv['pickUTC'], _vv['bk_info'],
+                            _vv['evaluatePick'])
+                           for _kk, _vv in BP.baitdict.items()]
+        if _out["single"] != _out["legacy"]:
+            errors.append("Single-pass and legacy picks differ")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+
+def test_lazy_imports():
+    """ Importing the picking library must not load matplotlib """
+    out = subprocess.check_output(
+        [sys.executable, "-c",
+         "import sys, bait.bait, bait.bait_batch, bait.bait_realtime; "
+         "print(any(_mm.startswith('matplotlib') for _mm in sys.modules))"],
+        universal_newlines=True)
+    assert out.strip() == "False", "matplotlib imported by bait.bait"
+
+
+def test_instrument_timings():
+    """ Per-stage timings: counts, callback, same picks, disabled """
+    errors = []
+    measures = []
+    BP_ref = BaIt(stproc, stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+    BP_ref.CatchEmAll()
+    BP = BaIt(stproc, stream_raw=straw, channel="*Z",
+              instrument=lambda stage, sec: measures.append(stage),
+              **BAIT_PAR_DICT)
+    BP.CatchEmAll()
+    #
+    if BP_ref.timings is not None:
+        errors.append("Timings must be None without instrumentation")
+    tm = BP.timings
+    if tm['CatchEmAll']['calls'] != 1:
+        errors.append("CatchEmAll must be timed once")
+    if tm['picker']['calls'] != tm['pk_baer']['calls']:
+        errors.append("picker/pk_baer calls mismatch")
+    for _kk in BAIT_PAR_DICT['test_pickvalidation']:
+        if tm[_kk]['calls'] != tm['evaluatePick_BK']['calls']:
+            errors.append("Test %s not timed at each evaluation" % _kk)
+    if len(measures) != sum(_vv['calls'] for _vv in tm.values()):
+        errors.append("Callback not called for every measure")
+    if ([_pp[0] for _pp in BP.extract_true_pick(idx="all", picker="AIC")] !=
+       [_pp[0] for _pp in BP_ref.extract_true_pick(idx="all", picker="AIC")]):
+        errors.append("Instrumentation changed the picks")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
 # ================= Picks (PRIOR *_new_8)
 # =================
 
@@ -831,3 +1020,195 @@ def test_bait_wwrong_iteration_sorting():
 #         errors.append("BAIT returns unsorted dict: first true must be 5th iter!")
 #     #
 #     assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_test_registry():
+    errors = []
+    # ---- unknown names / wrong parameters fail at construction
+    for _bad, _err in (({'SignalAmpp': [0.5, 0.05]}, BE.MissingAttribute),
+                       ({'SignalAmp': [0.5]}, BE.InvalidParameter)):
+        _conf = dict(BAIT_PAR_DICT, test_pickvalidation=_bad)
+        try:
+            BaIt(stproc, stream_raw=straw, channel="*Z", **_conf)
+        except _err:
+            pass
+        else:
+            errors.append("%s not raised for %s" % (_err.__name__, _bad))
+
+    # ---- user tests: per-pick and batched (same as SignalAmp)
+    def _ampBatch(data, cf, samples, df, timewin, thr):
+        _nn = int(round(timewin * df))
+        _max = np.array([_rr[_ss:_ss + _nn + 1].max()
+                         for _rr, _ss in zip(cf, samples)])
+        return (_max >= thr, list(_max))
+
+    BCT.registerTest("UserAmp", lambda wt, bpd, tw, thr, cf=None:
+                     BCT.SignalAmp(wt, bpd, tw, thr, cf=cf))
+    BCT.registerTest("BatchAmp", _ampBatch, batched=True)
+    # old signature: no `cf` keyword, the test builds its own CF
+    BCT.registerTest("OldAmp", lambda wt, bpd, tw, thr:
+                     BCT.SignalAmp(wt, bpd, tw, thr))
+    try:
+        ref = BaIt(stproc, stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+        ref.CatchEmAll()
+        _refpk = [_pk for (_pk, _) in ref.extract_true_pick(
+                    idx="all", compact_format=True)]
+        for _name in ("UserAmp", "BatchAmp", "OldAmp"):
+            _tests = dict(BAIT_PAR_DICT['test_pickvalidation'])
+            _tests[_name] = _tests.pop('SignalAmp')
+            BP = BaIt(stproc, stream_raw=straw, channel="*Z",
+                      **dict(BAIT_PAR_DICT, test_pickvalidation=_tests))
+            BP.CatchEmAll()
+            _pk = [_pk for (_pk, _) in BP.extract_true_pick(
+                    idx="all", compact_format=True)]
+            if _pk != _refpk:
+                errors.append("%s picks differ from SignalAmp" % _name)
+            for _it, rec in BP.picks.items():
+                if rec.pick_ns is None:
+                    continue
+                if rec.evaluatePick_tests[_name][0] != \
+                   ref.picks[_it].evaluatePick_tests['SignalAmp'][0]:
+                    errors.append("%s verdict differs @ %s" % (_name, _it))
+    finally:
+        BCT.unregisterTest("UserAmp")
+        BCT.unregisterTest("BatchAmp")
+        BCT.unregisterTest("OldAmp")
+    if "UserAmp" in BCT.registeredTests():
+        errors.append("Test not unregistered")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_shortcircuit_evaluation():
+    errors = []
+    stats = BCT.TestStats()
+    BPF = BaIt(stproc, stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+    BPF.CatchEmAll()
+    for _run in range(3):       # stats learned along the runs
+        BPS = BaIt(stproc, stream_raw=straw, channel="*Z",
+                   test_evaluation="shortcircuit", test_stats=stats,
+                   **BAIT_PAR_DICT)
+        BPS.CatchEmAll()
+        for _it, rec in BPF.picks.items():
+            if rec.pick_ns is None:
+                continue
+            _sc = BPS.picks[_it]
+            if _sc.evaluatePick != rec.evaluatePick:
+                errors.append("Verdict differs @ %s (run %d)" % (_it, _run))
+            _done = [_vv for _vv in _sc.evaluatePick_tests.values()
+                     if _vv is not None]
+            if rec.evaluatePick and \
+               len(_done) != len(BAIT_PAR_DICT['test_pickvalidation']):
+                errors.append("Accepted pick must run all the tests")
+            if not rec.evaluatePick and \
+               [_vv[0] for _vv in _done].count(False) != 1:
+                errors.append("Rejected pick must stop at the first False")
+    # ---- order: cheap tests rejecting often first
+    _sts = BCT.TestStats()
+    for _ in range(10):
+        _sts.update("Slow", 1.0, False)
+        _sts.update("Fast", 0.001, False)
+        _sts.update("Pass", 0.001, True)
+    _order = [_tt[0] for _tt in _sts.order([("Fast", None, None),
+                                            ("New", None, None),
+                                            ("Pass", None, None),
+                                            ("Slow", None, None)])]
+    if _order != ["New", "Fast", "Pass", "Slow"]:
+        errors.append("Wrong test order: %s" % _order)
+    # ---- no shared statistics unless given explicitly
+    if BPF.test_stats is not None or hasattr(BCT, "TEST_STATS"):
+        errors.append("Full evaluation measured without test_stats")
+    BP1, BP2 = [BaIt(stproc, channel="*Z", test_evaluation="shortcircuit",
+                     **BAIT_PAR_DICT) for _ in range(2)]
+    BP1.CatchEmAll()
+    if not BP1.test_stats.stats or BP2.test_stats.stats:
+        errors.append("Short-circuit statistics shared among objects")
+    _sts = BCT.TestStats()
+    BaIt(stproc, channel="*Z", test_stats=_sts, **BAIT_PAR_DICT).CatchEmAll()
+    if sorted(_sts.stats) != sorted(BAIT_PAR_DICT['test_pickvalidation']):
+        errors.append("Explicit test_stats not updated by full evaluation")
+    try:
+        BaIt(stproc, channel="*Z", test_evaluation="fast", **BAIT_PAR_DICT)
+        errors.append("Wrong test_evaluation not raised")
+    except BE.InvalidParameter:
+        pass
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_float32_precision():
+    errors = []
+    out = {}
+    for _prec in ("float64", "float32"):
+        BP = BaIt(stproc, stream_raw=straw, channel="*Z", precision=_prec,
+                  **BAIT_PAR_DICT)
+        BP.CatchEmAll()
+        out[_prec] = BP.extract_true_pick(idx="all", picker="AIC",
+                                          compact_format=True)
+        _dtypes = set([BP._getcf().data.dtype] +
+                      [_rr.AICcf.dtype for _rr in BP.picks.values()
+                       if _rr.AICcf is not None])
+        if _dtypes != {np.dtype(_prec)}:
+            errors.append("Wrong %s arrays: %s" % (_prec, _dtypes))
+    if out["float64"] != out["float32"]:
+        errors.append("Float32 picks differ: %s" % out["float32"])
+    try:
+        BaIt(stproc, channel="*Z", precision="float16", **BAIT_PAR_DICT)
+        errors.append("Wrong precision not raised")
+    except BE.InvalidParameter:
+        pass
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def _pickOutcome(BP):
+    try:
+        BP.CatchEmAll()
+    except BE.MissingVariable:
+        return None
+    return BP.extract_true_pick(idx="all", picker="BK", compact_format=True)
+
+
+def test_bkdata_inplace_edit():
+    """ An in-place edit of the PROC data must be seen by a new
+        CatchEmAll run of the same object (no stale picker input).
+    """
+    errors = []
+    st = stproc.copy()
+    BP = BaIt(st, stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+    BP.CatchEmAll()
+    st.select(channel="*Z")[0].data *= -3
+    _fresh = _pickOutcome(BaIt(st.copy(), stream_raw=straw, channel="*Z",
+                               **BAIT_PAR_DICT))
+    _rerun = _pickOutcome(BP)
+    if _rerun != _fresh:
+        errors.append("Stale picker input: %s != %s" % (_rerun, _fresh))
+    if not np.array_equal(BP._getbkdata(),
+                          st.select(channel="*Z")[0].data.astype(np.float32)):
+        errors.append("Cached BK data differ from the trace data")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_cf_inplace_edit():
+    """ The CF (and the tests verdicts) of a new CatchEmAll run must
+        follow an in-place edit of the PROC data.
+    """
+    errors = []
+    st = stproc.copy()
+    BP = BaIt(st, stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+    BP.CatchEmAll()
+    _tr = st.select(channel="*Z")[0]
+    _tr.data[:1500] *= 0.05
+    BPF = BaIt(st.copy(), stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+    if _pickOutcome(BP) != _pickOutcome(BPF):
+        errors.append("Different picks after the in-place edit")
+    if not np.array_equal(BP._getcf().data, BCT._createCF(_tr.data)):
+        errors.append("Stale CF after the in-place edit")
+    _ref = [(_kk, _vv['evaluatePick_tests']) for _kk, _vv in
+            BPF.baitdict.items()]
+    if [(_kk, _vv['evaluatePick_tests'])
+       for _kk, _vv in BP.baitdict.items()][:len(_ref)] != _ref:
+        errors.append("Test verdicts computed on the old CF")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
@@ -0,0 +1,80 @@
+from bait.bait import BaIt
+from bait.bait_3c import BaIt3C
+import bait.bait_errors as BE
+import bait.bait_customtests as BCT
+import numpy as np
+#
+from test_bait import stproc, straw, BAIT_PAR_DICT
+
+
+def test_3c_same_picks():
+    """ Each component must pick as a stand-alone BaIt """
+    errors = []
+    B3 = BaIt3C(stproc, stream_raw=straw, **BAIT_PAR_DICT)
+    valid = B3.CatchEmAll()
+    picks = B3.extract_true_pick(idx="all", picker="AIC",
+                                 compact_format=True)
+    #
+    if sorted(B3.baits) != ["E", "N", "Z"]:
+        errors.append("Wrong components: %s" % sorted(B3.baits))
+    for _cc in ("Z", "N", "E"):
+        BP = BaIt(stproc, stream_raw=straw, channel="*" + _cc,
+                  **BAIT_PAR_DICT)
+        try:
+            BP.CatchEmAll()
+            _ok = True
+        except BE.MissingVariable:
+            _ok = False
+        if _ok != valid[_cc] or (_cc in B3.errors) == _ok:
+            errors.append("Wrong validity for %s" % _cc)
+        if BP.extract_true_pick(idx="all", picker="AIC",
+                                compact_format=True) != picks[_cc]:
+            errors.append("Picks mismatch for %s" % _cc)
+        if B3[_cc].straw[0] is not straw.select(channel="*" + _cc)[0]:
+            errors.append("Wrong raw pairing for %s" % _cc)
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_3c_shared_cache_and_conf():
+    errors = []
+    _conf = dict(BAIT_PAR_DICT, pickAIC=False)
+    B3 = BaIt3C(stproc, stream_raw=straw, components=("Z", "N"),
+                component_conf={'N': {'max_iter': 1}}, instrument=True,
+                cf_cache={}, **_conf)
+    B3.CatchEmAll()
+    if sorted(B3.baits) != ["N", "Z"]:
+        errors.append("Components selection not respected")
+    if len(B3["N"].picks) != 1:
+        errors.append("Component configuration not applied")
+    if len(B3.cf_cache) != 2:
+        errors.append("CF cache not shared: %d" % len(B3.cf_cache))
+    if B3.timings['CatchEmAll']['calls'] != 2:
+        errors.append("Timer not shared among components")
+    # --- a new object with the same cache must reuse the CFs
+    _cfs = {_kk: _vv[1] for _kk, _vv in B3.cf_cache.items()}
+    B3b = BaIt3C(stproc, stream_raw=straw, components=("Z", "N"),
+                 cf_cache=B3.cf_cache, **_conf)
+    B3b.CatchEmAll()
+    if any(B3b[_cc]._getcf() is not _cfs[B3b[_cc]._cf_key]
+           for _cc in ("Z", "N")):
+        errors.append("Cached CFs not reused")
+    # --- no cache by default: in-place edits are seen by the next run
+    _st = stproc.copy()
+    B3c = BaIt3C(_st, components=("Z",), **_conf)
+    B3c.CatchEmAll()
+    _st[0].data[:] = _st[0].data[::-1]
+    B3c.CatchEmAll()
+    if B3c.cf_cache is not None or not np.array_equal(
+            B3c["Z"]._getcf().data, BCT._createCF(_st[0].data)):
+        errors.append("Stale CF after an in-place edit")
+    # --- single station only
+    _other = stproc.select(channel="*N").copy()
+    _other[0].stats.station = "OTHER"
+    try:
+        BaIt3C(stproc.select(channel="*Z") + _other, **_conf)
+        errors.append("Multi-station input not rejected")
+    except BE.BadInstance:
+        pass
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
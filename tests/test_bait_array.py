@@ -0,0 +1,66 @@
+from bait import bait_array as BA
+from bait.bait import BaIt
+from obspy import Stream
+import numpy as np
+
+from test_bait import stproc, straw, BAIT_PAR_DICT
+
+FIELDS = ('sample', 'bk_info', 'sample_aic', 'evaluatePick',
+          'SignalAmp', 'SignalSustain', 'LowFreqTrend')
+
+
+def _reference(tr, trR):
+    BP = BaIt(Stream(traces=[tr]), stream_raw=Stream(traces=[trR]),
+              channel=tr.stats.channel, **BAIT_PAR_DICT)
+    try:
+        BP.CatchEmAll()
+    except Exception:
+        pass
+    return BP.picks.toarray()
+
+
+def _compare(res, row, ref, errors):
+    _nn = len(ref)
+    for _ff in FIELDS:
+        if not np.array_equal(res[row][_ff][:_nn], ref[_ff]):
+            errors.append("Row %d - %s: %s != %s" % (
+                          row, _ff, res[row][_ff][:_nn], ref[_ff]))
+    for _ff in ('SignalAmp_metric', 'SignalSustain_metric',
+                'LowFreqTrend_metric'):
+        if not np.allclose(res[row][_ff][:_nn], ref[_ff], equal_nan=True):
+            errors.append("Row %d - %s differs" % (row, _ff))
+    if np.any(res[row]['sample'][_nn:] != BA.NOSAMPLE):
+        errors.append("Row %d - picks after the last iteration" % row)
+
+
+def test_pickarray_matches_bait():
+    errors = []
+    data = np.array([_tr.data for _tr in stproc])
+    raw = np.array([_tr.data for _tr in straw])
+    res = BA.pickArray(data, stproc[0].stats.sampling_rate, data_raw=raw,
+                       **BAIT_PAR_DICT)
+    if res.shape != (3, BAIT_PAR_DICT['max_iter']):
+        errors.append("Wrong output shape: %s" % (res.shape,))
+    for _ii, (_tr, _trR) in enumerate(zip(stproc, straw)):
+        _compare(res, _ii, _reference(_tr, _trR), errors)
+    if not any(len(_pp) for _pp in BA.extractPicks(res)):
+        errors.append("No valid pick found")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_pickarray_mixed_rates():
+    """ Rows at 50 Hz (decimated) are grouped and picked apart """
+    errors = []
+    st, stR = stproc.copy(), straw.copy()
+    for _tr in st[1:] + stR[1:]:
+        _tr.decimate(2, no_filter=True)
+        _tr.data = np.concatenate([_tr.data, np.zeros(_tr.stats.npts)])
+    data = np.array([_tr.data for _tr in st])
+    raw = np.array([_tr.data for _tr in stR])
+    rates = [_tr.stats.sampling_rate for _tr in st]
+    res = BA.pickArray(data, rates, data_raw=raw, **BAIT_PAR_DICT)
+    for _ii, (_tr, _trR) in enumerate(zip(st, stR)):
+        _compare(res, _ii, _reference(_tr, _trR), errors)
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
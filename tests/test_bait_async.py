@@ -0,0 +1,143 @@
+from bait import bait_async as BA
+from bait import bait_batch as BB
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+
+from test_bait import BAIT_PAR_DICT
+from test_bait_batch import _multistation
+
+
+def _items():
+    """ One (proc, raw) pair per station """
+    st, stR = _multistation()
+    out = []
+    for _sta in ("STC", "STA", "STB", "NOI"):
+        _raw = stR.select(station=_sta)
+        out.append((st.select(station=_sta), _raw if _raw else None))
+    return out
+
+
+def test_pipeline_results():
+    errors = []
+    items = _items()
+    ref = {_rr['id']: _rr for _rr in BB.pickStream(
+                list(items), channel="*Z", processes=1, **BAIT_PAR_DICT)}
+    published = []
+
+    async def source():
+        for _it in items:
+            await asyncio.sleep(0)
+            yield _it
+
+    async def sink(result):
+        published.append(result)
+
+    stats = asyncio.run(BA.pickPipeline(source(), sink, concurrency=2,
+                                        **BAIT_PAR_DICT))
+    if stats != {'items': 4, 'stations': 4, 'errors': 1}:
+        errors.append("Wrong stats: %s" % stats)
+    if sorted(_rr['id'] for _rr in published) != sorted(ref.keys()):
+        errors.append("Missing stations: %s" % [_rr['id']
+                                                for _rr in published])
+    for _rr in published:
+        if _rr != ref.get(_rr['id']):
+            errors.append("Result of %s differs from pickStream" % _rr['id'])
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_pipeline_backpressure():
+    """ Slow sink: the source is throttled by the bounded queues """
+    errors = []
+    items = _items()[:3] * 4
+    state = {'pulled': 0, 'published': 0, 'max_pending': 0,
+             'running': 0, 'max_running': 0}
+    concurrency, queue_size, sink_buffer = 2, 1, 2
+
+    def counted(item):
+        state['running'] += 1
+        state['max_running'] = max(state['max_running'], state['running'])
+        try:
+            return BA._pickItem(item, "*Z", BAIT_PAR_DICT,
+                                {'idx': 'all', 'picker': 'BK',
+                                 'compact_format': True})
+        finally:
+            state['running'] -= 1
+
+    class _Executor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            return super().submit(counted, args[0])
+
+    async def source():
+        for _it in items:
+            state['pulled'] += 1
+            state['max_pending'] = max(state['max_pending'],
+                                       state['pulled'] - state['published'])
+            yield _it
+
+    async def sink(result):
+        await asyncio.sleep(0.05)
+        state['published'] += 1
+
+    with _Executor(max_workers=4) as executor:
+        stats = asyncio.run(BA.pickPipeline(
+                    source(), sink, concurrency=concurrency,
+                    queue_size=queue_size, sink_buffer=sink_buffer,
+                    executor=executor, **BAIT_PAR_DICT))
+    if stats['stations'] != len(items) or state['published'] != len(items):
+        errors.append("Not all the results published: %s" % stats)
+    if state['max_running'] > concurrency:
+        errors.append("Concurrency limit exceeded: %d" %
+                      state['max_running'])
+    # queued + picking + waiting for the sink + the sink call + the pulled
+    _bound = queue_size + concurrency + sink_buffer + 2
+    if state['max_pending'] > _bound:
+        errors.append("Source not throttled: %d pending (max %d)" % (
+                      state['max_pending'], _bound))
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_pipeline_sink_error():
+    items = _items()[:2]
+
+    async def sink(result):
+        raise ValueError("sink down")
+
+    with ThreadPoolExecutor(1) as executor:
+        try:
+            asyncio.run(BA.pickPipeline(items, sink, concurrency=1,
+                                        executor=executor, **BAIT_PAR_DICT))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("The sink error was not raised")
+
+
+def test_pipeline_shutdown_nonblocking(monkeypatch):
+    """ The shutdown of the own executor must not stall the loop """
+    class _SlowExecutor(ThreadPoolExecutor):
+        def shutdown(self, wait=True, **kwargs):
+            time.sleep(0.3)
+            super().shutdown(wait=wait, **kwargs)
+
+    monkeypatch.setattr(BA, "ProcessPoolExecutor", _SlowExecutor)
+    ticks = []
+
+    async def _ticker(done):
+        while not done.is_set():
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def _main():
+        done = asyncio.Event()
+        _tt = asyncio.ensure_future(_ticker(done))
+        await BA.pickPipeline(_items()[:1], lambda result: None,
+                              concurrency=1, **BAIT_PAR_DICT)
+        done.set()
+        await _tt
+
+    asyncio.run(_main())
+    _gaps = [_bb - _aa for _aa, _bb in zip(ticks, ticks[1:])]
+    assert max(_gaps) < 0.2, "Event loop blocked for %.2f s" % max(_gaps)
@@ -0,0 +1,46 @@
+from bait import bait_batch as BB
+from obspy import UTCDateTime, Stream
+import numpy as np
+#
+from test_bait import stproc, straw, BAIT_PAR_DICT
+
+
+def _multistation():
+    """ Three copies of the test station + one noise-only station """
+    st, stR = Stream(), Stream()
+    for _sta in ("STC", "STA", "STB"):
+        _tp, _tr = stproc.copy(), straw.copy()
+        for _xx in (_tp + _tr):
+            _xx.stats.station = _sta
+        st += _tp
+        stR += _tr
+    _noise = stproc.select(channel="*Z")[0].copy()
+    _noise.stats.station = "NOI"
+    _noise.data = np.random.default_rng(0).normal(
+                                size=_noise.stats.npts) * 1e-9
+    st += _noise
+    return st, stR
+
+
+def test_pickstream_order_and_errors():
+    errors = []
+    st, stR = _multistation()
+    #
+    for _procs in (1, 2):
+        res = BB.pickStream(st, stream_raw=stR, channel="*Z",
+                            processes=_procs, **BAIT_PAR_DICT)
+        if [_rr['id'] for _rr in res] != ["BW.NOI.", "BW.STA.",
+                                          "BW.STB.", "BW.STC."]:
+            errors.append("Wrong station order: %s" % [_rr['id']
+                                                       for _rr in res])
+        if res[0]['picks'] or not res[0]['error']:
+            errors.append("Noise station should have no valid pick")
+        for _rr in res[1:]:
+            if _rr['error'] or len(_rr['picks']) != 2:
+                errors.append("Wrong picks for %s" % _rr['id'])
+                continue
+            if _rr['picks'][0][0] != UTCDateTime(2009, 8, 24, 0, 20, 7,
+                                                 720000):
+                errors.append("P1 BK not correct for %s" % _rr['id'])
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
@@ -0,0 +1,126 @@
+from bait.bait import BaIt
+from bait import bait_batch as BB
+from bait import bait_cache as BCH
+import bait.bait_errors as BE
+import os
+#
+from test_bait import stproc, straw, BAIT_PAR_DICT
+
+
+def _refPicks():
+    BP = BaIt(stproc, stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+    BP.CatchEmAll()
+    return BP.extract_true_pick(idx="all", picker="AIC", compact_format=True)
+
+
+def test_cache_keys(tmp_path):
+    errors = []
+    cache = BCH.ResultCache(str(tmp_path))
+    tr, tr_raw = stproc.select(channel="*Z")[0], straw.select(channel="*Z")[0]
+    conf = dict(BAIT_PAR_DICT)
+    _ref = cache.key(tr, tr_raw, "*Z", conf)
+    #
+    _int = dict(conf, opbk_aux=dict(conf['opbk_aux'], thr1=3.0))
+    _tup = dict(conf, test_pickvalidation={
+        _kk: tuple(_vv) for _kk, _vv in conf['test_pickvalidation'].items()})
+    _extra = dict(conf, picker_mode="legacy")      # not a picking key
+    for _cc in (_int, _tup, _extra):
+        if cache.key(tr, tr_raw, "*Z", _cc) != _ref:
+            errors.append("Normalized configuration changes the key")
+    #
+    _tr = tr.copy()
+    _tr.data[100] += 1e-3
+    if cache.key(_tr, tr_raw, "*Z", conf) == _ref:
+        errors.append("Data change not detected")
+    if cache.key(tr, None, "*Z", conf) == _ref:
+        errors.append("Raw data not in the key")
+    if cache.key(tr, tr_raw, "*N", conf) == _ref:
+        errors.append("Channel not in the key")
+    if cache.key(tr, tr_raw, "*Z", dict(conf, max_iter=3)) == _ref:
+        errors.append("Configuration change not detected")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_cached_catchemall(tmp_path):
+    errors = []
+    cache = BCH.ResultCache(str(tmp_path))
+    _hits = []
+    ref = _refPicks()
+    for _ in range(2):
+        BP = BaIt(stproc, stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+        _hits.append(BCH.cachedCatchEmAll(BP, cache))
+        if BP.extract_true_pick(idx="all", picker="AIC",
+                                compact_format=True) != ref:
+            errors.append("Cached picks differ")
+    if _hits != [False, True]:
+        errors.append("Wrong cache hits: %s" % _hits)
+    # --- no valid pick is cached as well (and still raises)
+    _conf = dict(BAIT_PAR_DICT, test_pickvalidation={'SignalAmp': [0.1,
+                                                                   0.9]})
+    for _ in range(2):
+        BP = BaIt(stproc, stream_raw=straw, channel="*Z", **_conf)
+        try:
+            BCH.cachedCatchEmAll(BP, cache)
+            errors.append("MissingVariable not raised")
+        except BE.MissingVariable:
+            pass
+    if len(cache) != 2:
+        errors.append("Wrong number of entries: %d" % len(cache))
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_cache_eviction_and_batch(tmp_path):
+    errors = []
+    cache = BCH.ResultCache(str(tmp_path / "lru"), max_size=10**9)
+    for _ii in range(5):
+        cache.put("%064x" % _ii, bytes(1000))
+        os.utime(cache._file("%064x" % _ii), (_ii, _ii))     # LRU order
+    cache.get("%064x" % 0)                  # recently used again
+    cache.max_size = 3500
+    cache.put("%064x" % 9, bytes(1000))
+    _left = sorted(os.path.basename(_ee[2])[:-4][-1]
+                   for _ee in cache._entries())
+    if _left != ["0", "4", "9"]:
+        errors.append("Wrong LRU eviction: %s" % _left)
+    if cache.size() > 3500:
+        errors.append("Cache size over the limit")
+    # --- many workers on the same cache
+    _dir = str(tmp_path / "batch")
+    res = [BB.pickStream(stproc, stream_raw=straw, channel="*Z",
+                         processes=2, cache=_dir, **BAIT_PAR_DICT)
+           for _ in range(2)]
+    if res[0] != res[1] or not res[0][0]['picks']:
+        errors.append("Cached batch results differ")
+    if len(BCH.ResultCache(_dir)) != 1:
+        errors.append("Batch results not cached")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_cache_put_no_scan(tmp_path, monkeypatch):
+    """ Writes keep a running size total: only eviction lists the cache """
+    errors = []
+    cache = BCH.ResultCache(str(tmp_path / "lru"), max_size=4500)
+    scans = []
+    _entries = BCH.ResultCache._entries
+
+    def _countEntries(self):
+        scans.append(1)
+        return _entries(self)
+
+    cache.put("%064x" % 0, bytes(1000))         # sidecar created
+    monkeypatch.setattr(BCH.ResultCache, "_entries", _countEntries)
+    for _ii in range(1, 4):
+        cache.put("%064x" % _ii, bytes(1000))
+    cache.put("%064x" % 3, bytes(1000))         # overwrite: same size
+    if scans:
+        errors.append("Cache listed on %d puts" % len(scans))
+    cache.put("%064x" % 4, bytes(1000))         # over max_size
+    if len(scans) != 1 or len(cache) > 4:
+        errors.append("Cache not evicted")
+    if cache._readSize() != cache.size():
+        errors.append("Wrong running size total")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
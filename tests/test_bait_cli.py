@@ -0,0 +1,158 @@
+from bait import bait_cli as BCLI
+from bait import bait_errors as BE
+import json
+import os
+import shutil
+
+
+CONFIG = os.path.abspath("./config/bait_pick.yml")
+DATA = os.path.abspath("./tests_data")
+
+
+def _records(path):
+    with open(path, "r") as IN:
+        return [json.loads(_ll) for _ll in IN]
+
+
+def test_cli_pick(tmp_path):
+    errors = []
+    out = str(tmp_path / "picks.jsonl")
+    for _procs in ("1", "2"):
+        BCLI.main([DATA, "-c", CONFIG, "-o", out, "-j", _procs,
+                   "--picker", "AIC", "--restart"])
+        recs = {_rr['file']: _rr for _rr in _records(out)}
+        if len(recs) != 4:
+            errors.append("Wrong number of records (%s)" % _procs)
+        _mseed = recs[os.path.join(DATA, "obspyread.mseed")]['results']
+        if [_pp[0] for _pp in _mseed[0]['picks']] != [
+                "2009-08-24T00:20:07.750000Z", "2009-08-24T00:20:08.710000Z"]:
+            errors.append("Wrong AIC picks (%s)" % _procs)
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_cli_resume(tmp_path):
+    """ Finished files are skipped, uncheckpointed lines re-done """
+    errors = []
+    for _ff in os.listdir(DATA):
+        shutil.copy(os.path.join(DATA, _ff), str(tmp_path))
+    out = str(tmp_path / "out" / "picks.jsonl")
+    os.makedirs(os.path.dirname(out))
+    files = BCLI._collectFiles([str(tmp_path / "*")])
+    # --- simulated crash: 1 file checkpointed, 1 written but not
+    #     checkpointed, a truncated line
+    BCLI.runPick(files[:2], CONFIG, out, processes=1)
+    with open(out + ".ckpt", "w") as CK:
+        CK.write(files[0] + "\n")
+    _first = _records(out)[0]
+    with open(out, "a") as OUT:
+        OUT.write('{"file": "%s", "err' % files[2])
+    #
+    npicked = BCLI.runPick(files, CONFIG, out, processes=2)
+    recs = _records(out)
+    if npicked != len(files) - 1:
+        errors.append("Finished file picked again (%d)" % npicked)
+    if sorted(_rr['file'] for _rr in recs) != files:
+        errors.append("Duplicated or missing records")
+    if recs[0] != _first:
+        errors.append("Checkpointed record modified")
+    if sorted(BCLI._readCheckpoint(out + ".ckpt")) != files:
+        errors.append("Checkpoint not complete")
+    if BCLI.runPick(files, CONFIG, out) != 0:
+        errors.append("Completed run not skipped")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_cli_output_in_input_dir(tmp_path):
+    """ Output, checkpoint and temporary files are never picked """
+    errors = []
+    shutil.copy(os.path.join(DATA, "obspyread.mseed"), str(tmp_path))
+    out = str(tmp_path / "bait_picks.jsonl")
+    for _run in range(2):
+        if BCLI.main([str(tmp_path), "-c", CONFIG, "-o", out]) != 0:
+            errors.append("Own files picked (run %d)" % _run)
+    with open(str(tmp_path / ".bait-pick-leftover"), "w") as OUT:
+        OUT.write("temporary")
+    BCLI.main([str(tmp_path), "-c", CONFIG, "-o", out, "--restart"])
+    if [os.path.basename(_rr['file']) for _rr in _records(out)] != [
+            "obspyread.mseed"]:
+        errors.append("Wrong picked files: %s" % _records(out))
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_cli_config_check(tmp_path):
+    """ Wrong BaIt keywords or tests are found before picking """
+    errors = []
+    with open(CONFIG, "r") as IN:
+        _conf = IN.read()
+    for _wrong in (_conf + "\nmax_iters: 3\n",
+                   _conf.replace("SignalAmp", "SignalAmplitude")):
+        _cfg = str(tmp_path / "wrong.yml")
+        with open(_cfg, "w") as OUT:
+            OUT.write(_wrong)
+        try:
+            BCLI.runPick([os.path.join(DATA, "obspyread.mseed")], _cfg,
+                         str(tmp_path / "picks.jsonl"))
+        except (BE.InvalidParameter, BE.MissingAttribute):
+            pass
+        else:
+            errors.append("Wrong configuration accepted")
+        if os.path.isfile(str(tmp_path / "picks.jsonl")):
+            errors.append("Files picked with a wrong configuration")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_cli_failed_files(tmp_path, monkeypatch):
+    """ Bad files are checkpointed, I/O errors are retried """
+    errors = []
+    bad = str(tmp_path / "broken.mseed")
+    with open(bad, "w") as OUT:
+        OUT.write("not a waveform")
+    good = os.path.join(DATA, "obspyread.mseed")
+    out = str(tmp_path / "picks.jsonl")
+    if BCLI.main([good, bad, "-c", CONFIG, "-o", out, "-j", "1"]) != 1:
+        errors.append("Failed file not reported by the exit status")
+    if BCLI._readCheckpoint(out + ".ckpt") != {good, bad}:
+        errors.append("Bad file not checkpointed")
+    if BCLI.runPick([good, bad], CONFIG, out) != 0:
+        errors.append("Bad file picked again")
+    # the file is fixed: picked again on request, the error is dropped
+    shutil.copy(good, bad)
+    if BCLI.main([good, bad, "-c", CONFIG, "-o", out,
+                  "--retry-failed"]) != 0:
+        errors.append("Wrong exit status after the retry")
+    recs = {_rr['file']: _rr for _rr in _records(out)}
+    if len(_records(out)) != 2 or recs[bad]['error'] is not None:
+        errors.append("Error record not replaced")
+    # --- I/O errors may be transient: not checkpointed
+    _read = BCLI.read
+
+    def _flakyRead(path):
+        if path == bad:
+            raise OSError("device not ready")
+        return _read(path)
+
+    monkeypatch.setattr(BCLI, "read", _flakyRead)
+    BCLI.runPick([good, bad], CONFIG, out, processes=1, restart=True)
+    if BCLI._readCheckpoint(out + ".ckpt") != {good}:
+        errors.append("I/O error checkpointed")
+    monkeypatch.undo()
+    if BCLI.runPick([good, bad], CONFIG, out, processes=1) != 1:
+        errors.append("I/O error not retried")
+    # --- AIC picks without pickAIC: refused before any file is read
+    _cfg = str(tmp_path / "noaic.yml")
+    with open(CONFIG, "r") as IN, open(_cfg, "w") as OUT:
+        OUT.write(IN.read().replace("pickAIC: true", "pickAIC: false"))
+    try:
+        BCLI.runPick([good], _cfg, str(tmp_path / "aic.jsonl"),
+                     picker="AIC")
+        errors.append("AIC picker accepted without pickAIC")
+    except BE.InvalidParameter:
+        pass
+    if os.path.isfile(str(tmp_path / "aic.jsonl")):
+        errors.append("Files picked with AIC and no pickAIC")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
@@ -0,0 +1,88 @@
+from bait.bait import BaIt
+from bait import bait_continuous as BC
+from obspy import Trace, Stream, UTCDateTime
+import numpy as np
+import tracemalloc
+#
+from test_bait import BAIT_PAR_DICT
+
+
+CONF = dict(BAIT_PAR_DICT, max_iter=50, pickAIC=False)
+EVENTS = [100.0, 700.0, 1195.5, 1799.99, 2500.0, 3300.0]
+
+
+def _synthetic(duration=3600.0, df=50.0, seed=0):
+    """ White noise plus long-lasting wave-trains at EVENTS [s] """
+    rng = np.random.default_rng(seed)
+    npts = int(duration * df)
+    data = rng.standard_normal(npts)
+    _tt = np.arange(int(8 * df)) / df
+    _burst = 40.0 * np.exp(-_tt / 3.0) * np.sin(2 * np.pi * 8.0 * _tt)
+    for _ev in EVENTS:
+        _idx = int(_ev * df)
+        _end = min(_idx + len(_burst), npts)
+        data[_idx:_end] += _burst[:_end - _idx]
+    return Trace(data=data, header={'network': "XX", 'station': "CONT",
+                                    'channel': "HHZ", 'sampling_rate': df,
+                                    'starttime': UTCDateTime(2020, 1, 1)})
+
+
+def test_chunked_picks():
+    """ Every event once, same picks of the whole-trace run """
+    errors = []
+    tr = _synthetic()
+    picks = BC.pickContinuous(Stream(traces=[tr]), chunk_len=600.0,
+                              overlap=30.0, **CONF)
+    times = [_pp[0] - tr.stats.starttime for _pp in picks]
+    #
+    for _ev in EVENTS:
+        if sum(1 for _tt in times if 0 <= _tt - _ev < 0.2) != 1:
+            errors.append("Event %.2f not picked once: %s" % (_ev, times))
+    if len(times) != len(EVENTS):
+        errors.append("Spurious or duplicated picks: %s" % times)
+    if times != sorted(times):
+        errors.append("Picks not sorted in time")
+    #
+    BP = BaIt(Stream(traces=[tr]), channel="*Z", **CONF)
+    BP.CatchEmAll()
+    # *** NB: bk_info may differ (each chunk restarts with opbk_main)
+    if [_pp[0] for _pp in BP.extract_true_pick(
+            idx="all", picker="BK", compact_format=True)] != [
+            _pp[0] for _pp in picks]:
+        errors.append("Chunked picks differ from the whole-trace run")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_chunked_memory_and_files(tmp_path):
+    errors = []
+    tr = _synthetic(duration=7200.0)
+    #
+    def _peak(func):
+        tracemalloc.start()
+        try:
+            out = func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return out, peak
+    #
+    def _whole():
+        BP = BaIt(Stream(traces=[tr]), channel="*Z", **CONF)
+        BP.CatchEmAll()
+        return BP.extract_true_pick(idx="all", compact_format=True)
+    #
+    picks, chunk_peak = _peak(lambda: BC.pickContinuous(
+                    tr, chunk_len=300.0, overlap=20.0, **CONF))
+    _, whole_peak = _peak(_whole)
+    if chunk_peak > 0.25 * whole_peak:
+        errors.append("Peak memory not bounded: %d vs %d bytes" % (
+                      chunk_peak, whole_peak))
+    # --- lazy reading from file
+    _file = str(tmp_path / "continuous.mseed")
+    tr.write(_file, format="MSEED")
+    if BC.pickContinuous(_file, stream_raw=_file, chunk_len=300.0,
+                         overlap=20.0, **CONF) != picks:
+        errors.append("File (lazy) picks differ from in-memory ones")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
@@ -0,0 +1,82 @@
+from bait import bait_kernels as KRN
+from bait import bait_errors as BE
+from bait.bait import _AICcf_reference
+import numpy as np
+import pytest
+import types
+
+
+def _check(errors, backend):
+    rng = np.random.default_rng(11)
+    with np.errstate(all='ignore'):
+        for _ in range(200):
+            _nn = int(rng.integers(2, 2000))
+            data = rng.standard_normal(_nn) * rng.uniform(1e-6, 1e6)
+            # ---- AIC
+            if _nn < 300:
+                _idx, _aic = KRN.aic(data)
+                _ridx, _raic = _AICcf_reference(data)
+                if _idx != _ridx or not np.allclose(_aic, _raic, rtol=1e-6,
+                                                    atol=1e-6):
+                    errors.append("%s: AIC mismatch (%d)" % (backend, _nn))
+            # ---- windows (edges and empty windows too)
+            _st = np.sort(rng.integers(0, _nn, 6))
+            _en = _st + rng.integers(0, 300, 6)
+            for _mode, _func in (("mean", np.mean), ("max", np.max)):
+                _ref = np.array([_func(data[_ss:_ee]) if _ee > _ss and
+                                 _ss < _nn else np.nan
+                                 for _ss, _ee in zip(_st, _en)])
+                if not np.array_equal(KRN.windowStats(data, _st, _en, _mode),
+                                      _ref, equal_nan=True):
+                    errors.append("%s: windowStats %s mismatch" % (backend,
+                                                                  _mode))
+            # ---- sign counts
+            _sign = np.sign(np.diff(data.astype(np.float32)))
+            if KRN.signCounts(data.astype(np.float32)) != (
+                    np.sum(_sign > 0), np.sum(_sign < 0), len(_sign)):
+                errors.append("%s: signCounts mismatch" % backend)
+            # ---- normalize (in-place)
+            for _dt in (np.float64, np.float32):
+                _xx = data.astype(_dt)
+                _ref = ((_xx - _xx.min()) / (_xx.max() - _xx.min())) * \
+                    _dt(2) + _dt(-1)
+                _out = KRN.normalize(_xx, -1, 1)
+                if _out is not _xx or not np.array_equal(_out, _ref):
+                    errors.append("%s: normalize mismatch" % backend)
+
+
+def test_kernels_numpy():
+    errors = []
+    _old = KRN.getBackend()
+    try:
+        if KRN.setBackend("numpy") != "numpy":
+            errors.append("NumPy backend not selected")
+        _check(errors, "numpy")
+    finally:
+        KRN.setBackend(_old)
+    try:
+        KRN.setBackend("cuda")
+        errors.append("Wrong backend not raised")
+    except BE.InvalidParameter:
+        pass
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_kernels_numba():
+    pytest.importorskip("numba")
+    errors = []
+    _old = KRN.getBackend()
+    try:
+        if KRN.setBackend("numba") != "numba":
+            errors.append("Numba backend not selected")
+        _check(errors, "numba")
+        if not all(isinstance(_ff, types.FunctionType)
+                   for _ff in (KRN._blockSum, KRN._pairwiseSum)):
+            errors.append("Module-level helpers replaced by numba")
+        KRN.setBackend("numpy")
+        _check(errors, "numpy after numba")
+    finally:
+        KRN.setBackend(_old)
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
@@ -0,0 +1,101 @@
+from bait.bait import BaIt
+from bait.bait_picks import PICK_KEYS, NOSAMPLE
+import bait.bait_errors as BE
+from obspy import UTCDateTime
+import numpy as np
+import pickle
+#
+from test_bait import stproc, straw, BAIT_PAR_DICT
+
+
+def _run(**kwargs):
+    BP = BaIt(stproc, stream_raw=straw, channel="*Z",
+              **dict(BAIT_PAR_DICT, **kwargs))
+    BP.CatchEmAll()
+    return BP
+
+
+def test_baitdict_compatibility():
+    errors = []
+    BP = _run()
+    bd = BP.baitdict
+    #
+    if sorted(bd.keys(), key=int) != [str(_ii) for _ii in
+                                      range(1, len(bd) + 1)]:
+        errors.append("Wrong iteration keys")
+    for _kk, _vv in bd.items():
+        if tuple(_vv.keys()) != PICK_KEYS:
+            errors.append("Wrong record keys")
+        if _vv['iteration'] != int(_kk):
+            errors.append("Wrong iteration %s" % _kk)
+        if _vv['pickUTC'] is not None:
+            if not isinstance(_vv['pickUTC'], UTCDateTime):
+                errors.append("pickUTC must be UTCDateTime")
+            if _vv.sample != BP._utc2sample(_vv['pickUTC']):
+                errors.append("Wrong sample index %s" % _kk)
+            if set(_vv['evaluatePick_tests']) != set(
+                                    BAIT_PAR_DICT['test_pickvalidation']):
+                errors.append("Missing tests in %s" % _kk)
+    if bd["1"]["pickUTC"] != UTCDateTime(2009, 8, 24, 0, 20, 7, 720000):
+        errors.append("Wrong first pick")
+    if bd.todict()["1"]["bk_info"] != bd["1"]["bk_info"]:
+        errors.append("todict mismatch")
+    try:
+        bd["1"]["pick"] = None
+        errors.append("MissingKey not raised")
+    except BE.MissingKey:
+        pass
+    try:
+        bd["1"]["evaluatePick_tests"]["SignalAmp"] = (False, 0.0)
+        errors.append("Write to the tests view not raised")
+    except TypeError:
+        pass
+    if not isinstance(bd.todict()["1"]["evaluatePick_tests"], dict):
+        errors.append("todict tests must be a dict")
+    # extract_true_pick (all formats) still works on records
+    full = BP.extract_true_pick(idx="all", picker="AIC", compact_format=False)
+    comp = BP.extract_true_pick(idx="all", picker="AIC", compact_format=True)
+    if [_ff[1]['pickUTC_AIC'] for _ff in full] != [_cc[0] for _cc in comp]:
+        errors.append("extract_true_pick formats mismatch")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_toarray_and_aiccf():
+    errors = []
+    BP = _run()
+    arr = BP.picks.toarray()
+    #
+    if len(arr) != len(BP.picks):
+        errors.append("Wrong number of rows")
+    for _row in arr:
+        _rec = BP.picks[int(_row['iteration'])]
+        if _rec.pickUTC is None:
+            if _row['sample'] != NOSAMPLE or not np.isnat(_row['pick_time']):
+                errors.append("Missing pick not flagged")
+            continue
+        if _row['pick_time'].astype('i8') != _rec.pick_ns:
+            errors.append("Wrong pick time")
+        if bool(_row['evaluatePick']) != bool(_rec.evaluatePick):
+            errors.append("Wrong verdict")
+        if _row['SignalAmp_metric'] != _rec.evaluatePick_tests[
+                                                        'SignalAmp'][1]:
+            errors.append("Wrong SignalAmp metric")
+    if np.sum(arr['evaluatePick'] == 1) != len(BP.picks.valid()):
+        errors.append("Wrong number of valid picks")
+    #
+    if all(_rr.AICcf is None for _rr in BP.picks.valid()):
+        errors.append("AICcf not stored by default")
+    BPn = _run(keep_aiccf=False)
+    if any(_rr.AICcf is not None for _rr in BPn.picks.values()):
+        errors.append("AICcf stored with keep_aiccf=False")
+    if (BPn.extract_true_pick(idx="all", picker="AIC", compact_format=True)
+       != BP.extract_true_pick(idx="all", picker="AIC",
+                               compact_format=True)):
+        errors.append("keep_aiccf changed the picks")
+    #
+    BPp = pickle.loads(pickle.dumps(BP.picks))
+    if BPp.todict()["1"]["pickUTC"] != BP.picks["1"]["pickUTC"]:
+        errors.append("Store not picklable")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
@@ -0,0 +1,62 @@
+from bait import bait_plot as BPL
+from obspy import Trace, UTCDateTime
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.dates import date2num
+import numpy as np
+
+
+def _longTrace(npts=1000000):
+    rng = np.random.default_rng(42)
+    tr = Trace(data=rng.standard_normal(npts))
+    tr.stats.sampling_rate = 100.0
+    tr.stats.starttime = UTCDateTime("2020-01-01T00:00:00")
+    tr.data[654321] = 50.0      # spike
+    return tr
+
+
+def test_minmax_decimation():
+    errors = []
+    tr = _longTrace()
+    cf = tr.copy()
+    cf.data = np.abs(cf.data)
+    pick = tr.stats.starttime + 6543.21
+    baitdict = {'1': {'pickUTC': pick, 'evaluatePick': True,
+                      'pickUTC_AIC': None}}
+    fig = Figure(figsize=(8, 4.5), dpi=100)
+    FigureCanvasAgg(fig)
+    fig, (ax1, ax2) = BPL.plotBait(tr, cf, baitdict, fig=fig)
+    line = ax1.get_lines()[0]
+    _width = int(ax1.bbox.width)
+    if len(line.get_xdata()) > 2 * _width + 2:
+        errors.append("Not decimated: %d points" % len(line.get_xdata()))
+    if line.get_ydata().max() != 50.0 or (
+       line.get_ydata().min() != tr.data.min()):
+        errors.append("Envelope extremes lost")
+    _full = tr.times("matplotlib")
+    if not np.all(np.isin(line.get_xdata(), _full)):
+        errors.append("Envelope times are not sample times")
+    # pick markers exact
+    _pk = [_ll for _ll in ax1.get_lines() if _ll.get_label() == 'BK'][0]
+    if _pk.get_xdata()[0] != pick.datetime:
+        errors.append("Pick marker moved")
+    # zoom: full resolution (both shared axes)
+    ax1.set_xlim((pick - 2).datetime, (pick + 2).datetime)
+    _sel = np.flatnonzero((_full >= date2num((pick - 2).datetime)) &
+                          (_full <= date2num((pick + 2).datetime)))
+    for _ax, _tr in ((ax1, tr), (ax2, cf)):
+        _ll = _ax.get_lines()[0]
+        _idx = np.searchsorted(_full, _ll.get_xdata())
+        if (np.any(np.diff(_idx) != 1) or _idx[0] > _sel[0] or
+           _idx[-1] < _sel[-1] or len(_idx) > len(_sel) + 4):
+            errors.append("Zoom is not at full resolution")
+        elif (not np.array_equal(_ll.get_xdata(), _full[_idx]) or
+              not np.array_equal(_ll.get_ydata(), _tr.data[_idx])):
+            errors.append("Zoom samples differ from the trace")
+    fig.canvas.draw()
+    # no decimation
+    fig, (ax1, ax2) = BPL.plotBait(tr, cf, baitdict, fig=fig, decimate=False)
+    if len(ax1.get_lines()[0].get_xdata()) != tr.stats.npts:
+        errors.append("decimate=False still decimates")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
@@ -0,0 +1,69 @@
+from bait import bait_qc as BQ
+from bait.bait import BaIt
+import os
+import re
+import sys
+
+from test_bait import stproc, straw, BAIT_PAR_DICT
+from test_bait_batch import _multistation
+
+
+def _pdfpages(path):
+    with open(path, "rb") as IN:
+        return len(re.findall(rb"/Type\s*/Page\b", IN.read()))
+
+
+def test_renderer_reuses_figures(tmp_path):
+    errors = []
+    _nfigs = (len(sys.modules['matplotlib.pyplot'].get_fignums())
+              if 'matplotlib.pyplot' in sys.modules else None)
+    BP = BaIt(stproc, stream_raw=straw, channel="*Z", **BAIT_PAR_DICT)
+    BP.CatchEmAll()
+    rnd = BQ.QCRenderer()
+    files = rnd.render(BP, str(tmp_path / "first"), fmt="pdf", tests="all")
+    figs = dict(rnd._figs)
+    # 1 picks page + 3 tests x 2 evaluated picks
+    if _pdfpages(files[0]) != 7:
+        errors.append("Wrong number of pages: %d" % _pdfpages(files[0]))
+    files = rnd.render(BP, str(tmp_path / "second"), fmt="png")
+    if len(files) != 7 or not all(os.path.isfile(_ff) for _ff in files):
+        errors.append("Missing PNG pages: %s" % files)
+    if any(rnd.figure(_kk) is not _ff for _kk, _ff in figs.items()):
+        errors.append("Figures not reused")
+    if len(figs) != 4:
+        errors.append("Wrong number of figures: %s" % list(figs))
+    if _nfigs is not None and (
+       len(sys.modules['matplotlib.pyplot'].get_fignums()) != _nfigs):
+        errors.append("A pyplot figure was created")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_qcreport_parallel(tmp_path, monkeypatch):
+    errors = []
+    st, stR = _multistation()
+    results = BQ.qcReport(st, str(tmp_path), stream_raw=stR, processes=2,
+                          **BAIT_PAR_DICT)
+    if [_rr['id'] for _rr in results] != sorted(_rr['id'] for _rr in results):
+        errors.append("Results not sorted by station")
+    for _rr in results:
+        if len(_rr['files']) != 1 or not os.path.isfile(_rr['files'][0]):
+            errors.append("%s: missing report" % _rr['id'])
+        elif _rr['error'] is None and _pdfpages(_rr['files'][0]) < 2:
+            errors.append("%s: no test page" % _rr['id'])
+    # --- serial: same reports, no renderer left in this process
+    _closed, _close = [], BQ.QCRenderer.close
+
+    def _countClose(self):
+        _closed.append(self)
+        _close(self)
+
+    monkeypatch.setattr(BQ.QCRenderer, "close", _countClose)
+    serial = BQ.qcReport(st, str(tmp_path / "serial"), stream_raw=stR,
+                         processes=1, **BAIT_PAR_DICT)
+    if [_rr['error'] for _rr in serial] != [_rr['error'] for _rr in results]:
+        errors.append("Serial reports differ from the parallel ones")
+    if BQ._RENDERER or len(_closed) != 1:
+        errors.append("Serial renderer not released")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
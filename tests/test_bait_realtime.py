@@ -0,0 +1,136 @@
+from bait.bait import BaIt
+from bait import bait_realtime as BRT
+from bait import bait_customtests as BCT
+import bait.bait_errors as BE
+from bait.bait_realtime import BaItRealTime, packetSource, _RingBuffer
+from test_bait import stproc, BAIT_PAR_DICT
+import numpy as np
+
+
+def test_ringbuffer():
+    errors = []
+    rb = _RingBuffer(10)
+    rb.append(np.arange(7))
+    rb.append(np.arange(7, 12))
+    if rb.first != 2 or rb.nwritten != 12:
+        errors.append("Wrong ring buffer indexes")
+    if not np.array_equal(rb.get(2, 12), np.arange(2, 12)):
+        errors.append("Wrong ring buffer wrapping")
+    if rb.absrange() != (2, 11):
+        errors.append("Wrong |data| range: %s" % (rb.absrange(),))
+    rb.append(np.arange(12, 40))
+    if not np.array_equal(rb.get(35, 40), np.arange(35, 40)):
+        errors.append("Wrong ring buffer with packets longer than buffer")
+    rb.append(-np.arange(40, 43))
+    if rb.absrange() != (33, 42):
+        errors.append("Wrong |data| range: %s" % (rb.absrange(),))
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_realtime_replay():
+    """ Replaying the test trace packet by packet must return the same
+        picks of the offline BaIt (AIC on processed data).
+    """
+    errors = []
+    #
+    BP = BaIt(stproc, channel="*Z", **BAIT_PAR_DICT)
+    BP.CatchEmAll()
+    offline = BP.extract_true_pick(idx="all", picker="BK",
+                                   compact_format=True)
+    offline_aic = BP.extract_true_pick(idx="all", picker="AIC",
+                                       compact_format=True)
+    #
+    RT = BaItRealTime(buffer_len=60.0, **BAIT_PAR_DICT)
+    emitted = []
+    for _pkt in packetSource(stproc.select(channel="*Z")[0],
+                             packet_npts=128):
+        emitted.extend(RT.feed(_pkt))
+    emitted.extend(RT.flush())
+    #
+    detected = [_pp for _pp in emitted if _pp['status'] == "detected"]
+    if len(detected) != len(RT.picks):
+        errors.append("Some detected picks have not been evaluated")
+    valid = [_pp for _pp in RT.picks if _pp['evaluatePick']]
+    # LowFreqTrend (whole trace offline) only sees the evaluation window
+    if not all(_pp['bk_info'].endswith(BRT.PARTIAL_WINDOW)
+               for _pp in RT.picks):
+        errors.append("Partial window evaluation not flagged")
+    if [(_pp['pickUTC'], _pp['bk_info'].rstrip(BRT.PARTIAL_WINDOW))
+            for _pp in valid] != offline:
+        errors.append("Streaming BK picks differ from offline ones")
+    if [_pp['pickUTC_AIC'] for _pp in valid] != [_pp[0] for _pp in
+                                                 offline_aic]:
+        errors.append("Streaming AIC picks differ from offline ones")
+    for _pp in RT.picks:
+        if _pp['latency'] < 0 or _pp['data_latency'] < RT.post_pick_time:
+            errors.append("Wrong latency for pick %s" % _pp['pickUTC'])
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_realtime_bounded_cost(monkeypatch):
+    """ Picker scans and evaluation windows must not grow with the
+        ring buffer length.
+    """
+    errors = []
+    scans, windows = [], []
+    _pk_baer, _get = BRT._pk_baer, BRT._RingBuffer.get
+
+    def _countPicker(data, *args):
+        scans.append(len(data))
+        return _pk_baer(data, *args)
+
+    def _countGet(self, idx_start, idx_end):
+        windows.append(idx_end - idx_start)
+        return _get(self, idx_start, idx_end)
+
+    monkeypatch.setattr(BRT, "_pk_baer", _countPicker)
+    tr = stproc.select(channel="*Z")[0].copy()
+    tr.data = np.tile(tr.data, 4)
+    RT = BaItRealTime(buffer_len=600.0, **BAIT_PAR_DICT)
+    _pkts = list(packetSource(tr, packet_npts=128))
+    for _pkt in _pkts[:len(_pkts) // 2]:
+        RT.feed(_pkt)
+    monkeypatch.setattr(BRT._RingBuffer, "get", _countGet)
+    for _pkt in _pkts[len(_pkts) // 2:]:
+        RT.feed(_pkt)
+    RT.flush()
+    # 120 s of data in a 600 s buffer: nothing close to the buffer size
+    _bound = 10 * int(tr.stats.sampling_rate)
+    if max(scans) > _bound:
+        errors.append("Picker re-scans the buffer: %d" % max(scans))
+    if not windows or max(windows) > _bound:
+        errors.append("Copies larger than the evaluation window: %s" %
+                      max(windows or [0]))
+    if not any(_pp['evaluatePick'] for _pp in RT.picks):
+        errors.append("No valid pick")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_realtime_test_windows():
+    """ The data windows come from the test registry """
+    errors = []
+    _conf = dict(BAIT_PAR_DICT, pickAIC=False,
+                 test_pickvalidation={'SignalAmp': [0.5, 0.05],
+                                      'UserTest': [3.0]})
+    BCT.registerTest("UserTest", lambda wt, bpd, span: (True, span))
+    try:
+        try:
+            BaItRealTime(**_conf)
+            errors.append("Test without a window accepted")
+        except BE.MissingAttribute:
+            pass
+        BCT.registerTest("UserTest", lambda wt, bpd, span: (True, span),
+                         window=lambda span: (span / 2, span))
+        RT = BaItRealTime(**_conf)
+        if (RT.pre_pick_time, RT.post_pick_time) != (1.5, 3.0):
+            errors.append("Wrong data window: %s" % (
+                          (RT.pre_pick_time, RT.post_pick_time),))
+        if RT._partial:
+            errors.append("Tests wrongly flagged as whole-trace")
+    finally:
+        BCT.unregisterTest("UserTest")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
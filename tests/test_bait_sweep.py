@@ -0,0 +1,63 @@
+from bait import bait_sweep as BS
+from obspy import UTCDateTime
+import numpy as np
+#
+from test_bait import stproc, straw, BAIT_PAR_DICT
+
+
+DATASET = [(stproc, straw, UTCDateTime(2009, 8, 24, 0, 20, 7, 720000)),
+           {'stream': stproc, 'stream_raw': None,
+            'pick': UTCDateTime(2009, 8, 24, 0, 20, 7, 700000)}]
+
+
+def test_parameter_grid():
+    errors = []
+    combos = BS.parameterGrid({'opbk_main.thr1': [4, 6],
+                               'opbk_aux.thr2': [6, 10, 20]})
+    if len(combos) != 6 or combos[1] != {'opbk_main.thr1': 4,
+                                         'opbk_aux.thr2': 10}:
+        errors.append("Wrong grid expansion")
+    conf = BS._applyParams(BAIT_PAR_DICT, combos[-1])
+    if conf['opbk_main']['thr1'] != 6 or conf['opbk_aux']['thr2'] != 20:
+        errors.append("Parameters not applied")
+    if BAIT_PAR_DICT['opbk_main']['thr1'] != 6.0 or \
+       BAIT_PAR_DICT['opbk_aux']['thr2'] != 6:
+        errors.append("Base configuration modified")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_sweep(monkeypatch):
+    errors = []
+    grid = {'opbk_main.thr2': [10.0, 1000.0]}
+    cached, _run = [], BS._runCombination
+
+    def _countCF(idx):
+        out = _run(idx)
+        cached.append(len(BS._SHARED['cf_cache']))
+        return out
+
+    monkeypatch.setattr(BS, "_runCombination", _countCF)
+    res = BS.sweep(DATASET, grid, BAIT_PAR_DICT, processes=1,
+                   tolerance=0.015)
+    monkeypatch.undo()          # the pool pickles the worker function
+    #
+    if cached != [1, 1]:
+        errors.append("CF not shared among traces/combinations")
+    if BS._SHARED:
+        errors.append("Shared data not released after the serial sweep")
+    _ok, _none = res
+    if _ok['acceptance_rate'] != 1.0 or _ok['n_within_tolerance'] != 1:
+        errors.append("Wrong acceptance/tolerance: %s" % _ok)
+    if not np.allclose(_ok['errors'], [0.0, 0.02]) or \
+       not np.isclose(_ok['mae'], 0.01):
+        errors.append("Wrong pick errors: %s" % _ok['errors'])
+    if _none['acceptance_rate'] != 0.0 or not np.isnan(_none['mae']):
+        errors.append("Impossible threshold must not pick")
+    # --- same results on the process pool
+    _par = BS.sweep(DATASET, grid, BAIT_PAR_DICT, processes=2,
+                    tolerance=0.015)
+    if [_rr['errors'] for _rr in _par] != [_rr['errors'] for _rr in res]:
+        errors.append("Pool results differ from the serial ones")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
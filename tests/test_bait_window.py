@@ -0,0 +1,62 @@
+from bait.bait_window import TraceWindow, sliceBounds, windowBounds
+from obspy.core.compatibility import round_away
+from bait.bait_window import _roundAway
+from obspy import read
+import numpy as np
+
+
+tr = read("./tests_data/obspyread.mseed").select(channel="*Z")[0]
+
+
+def test_window_slice():
+    """ Windows must select the same samples of obspy.Trace.slice,
+        without copying the data.
+    """
+    errors = []
+    win = TraceWindow(tr)
+    t0 = tr.stats.starttime
+    for (_ss, _ee) in ((t0 + 7.72, t0 + 8.72), (t0 + 7.7249, t0 + 7.7251),
+                       (t0 - 5.0, t0 + 1.0), (t0 + 29.0, t0 + 40.0),
+                       (t0 + 40.0, t0 + 50.0), (t0 + 3.0, None),
+                       (None, t0 + 3.0), (t0 + 3.0, t0 + 3.0)):
+        _tr, _win = tr.slice(_ss, _ee), win.slice(_ss, _ee)
+        if not np.array_equal(_tr.data, _win.data):
+            errors.append("Wrong samples for [%s, %s]" % (_ss, _ee))
+        if _tr.stats.npts and _tr.stats.starttime != _win.stats.starttime:
+            errors.append("Wrong starttime for [%s, %s]" % (_ss, _ee))
+        if _win.npts and not np.shares_memory(_win.data, tr.data):
+            errors.append("Window data copied for [%s, %s]" % (_ss, _ee))
+    #
+    if win.data.flags.writeable:
+        errors.append("Window data are not read-only")
+    _cp = win.slice(t0 + 1.0, t0 + 2.0).copy()
+    _cp.data[:] = 0
+    if not tr.data.any() or _cp.stats.starttime != t0 + 1.0:
+        errors.append("Window copy is not independent")
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))
+
+
+def test_window_bounds():
+    """ Index bounds (no objects) must match obspy.Trace.slice """
+    errors = []
+    rng = np.random.default_rng(42)
+    t0, t1 = tr.stats.starttime, tr.stats.endtime
+    for _ in range(500):
+        _ss = t0 + rng.uniform(-2.0, (t1 - t0) + 2.0)
+        _tw = float(rng.choice([0.013, 0.2, 0.33333]))
+        _times = [_ss + _nn * _tw for _nn in range(6)]
+        for (_bs, _be), _tt in zip(windowBounds(tr, _times),
+                                   zip(_times[:-1], _times[1:])):
+            if not np.array_equal(tr.data[_bs:_be], tr.slice(*_tt).data):
+                errors.append("Wrong window bounds for %s" % str(_tt))
+            if (_bs, _be) != sliceBounds(TraceWindow(tr), *_tt):
+                errors.append("Wrong slice bounds for %s" % str(_tt))
+    #
+    for _vv in (list(rng.uniform(-1e3, 1e3, 1000)) +
+                [_xx / 2.0 for _xx in range(-20, 20)] +
+                [-0.49999999999999994, 0.49999999999999994]):
+        if _roundAway(float(_vv)) != round_away(float(_vv)):
+            errors.append("Wrong rounding of %r" % _vv)
+    #
+    assert not errors, "Errors occured:\n{}".format("\n".join(errors))